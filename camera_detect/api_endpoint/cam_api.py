@@ -1,23 +1,33 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, File, HTTPException, UploadFile
 from fastapi.responses import StreamingResponse, JSONResponse
 from contextlib import asynccontextmanager
 import uvicorn
 import asyncio
 import cv2
 import json
-from model_cam import OpenCam
+import numpy as np
+from frame_pipeline import CAM_TARGET_FPS
+from model_cam import OpenCam, create_face_mesh
+from sessions import ModelPool, SessionLimitError, SessionManager
+
+# The server camera feeds this session; /api/face/* and /api/camera/* act on it
+CAMERA_SESSION = "default"
 
 camera_instance = None
+session_manager = None
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    """Manage camera lifecycle"""
-    global camera_instance
+    """Manage camera and session lifecycle"""
+    global camera_instance, session_manager
+    session_manager = SessionManager(ModelPool(create_face_mesh))
     try:
-        camera_instance = OpenCam()
+        camera_session = session_manager.create(CAMERA_SESSION, pinned=True, target_fps=CAM_TARGET_FPS)
+        camera_instance = OpenCam(session=camera_session)
         print("Camera initialized successfully")
     except Exception as e:
         print(f"Failed to initialize camera: {e}")
+        session_manager.delete(CAMERA_SESSION)
         camera_instance = None
     
     yield
@@ -29,6 +39,7 @@ async def lifespan(app: FastAPI):
             print("Camera released successfully")
         except Exception as e:
             print(f"Error releasing camera: {e}")
+    session_manager.close()
 
 app = FastAPI(
     title="Face Recognition API",
@@ -64,13 +75,7 @@ async def get_login_status():
     if camera_instance is None:
         raise HTTPException(status_code=503, detail="Camera not available")
     
-    return {
-        "current_step": camera_instance.current_step,
-        "total_steps": len(camera_instance.login_seq),
-        "current_pose_required": camera_instance.login_seq[camera_instance.current_step] if camera_instance.current_step < len(camera_instance.login_seq) else None,
-        "login_finished": camera_instance.login_finished,
-        "progress_percentage": (camera_instance.current_step / len(camera_instance.login_seq)) * 100
-    }
+    return camera_instance.login_status()
 
 @app.post("/api/face/reset")
 async def reset_login():
@@ -82,9 +87,7 @@ async def reset_login():
     if camera_instance is None:
         raise HTTPException(status_code=503, detail="Camera not available")
     
-    camera_instance.current_step = 0
-    camera_instance.login_finished = False
-    camera_instance.pose_start_time = None
+    camera_instance.reset_login()
     
     return {"message": "Login process reset successfully"}
 
@@ -113,13 +116,112 @@ async def camera_info():
     if camera_instance is None:
         raise HTTPException(status_code=503, detail="Camera not available")
     
+    pipeline = camera_instance.pipeline
     return {
         "camera_available": True,
         "detection_confidence": 0.5,
         "tracking_confidence": 0.5,
-        "status": "ready"
+        "status": "ready",
+        "target_fps": camera_instance.target_fps,
+        "inference": {
+            "width": camera_instance.session.framer.inference_width,
+            "crop": camera_instance.session.framer.crop,
+            "region": camera_instance.session.framer.region
+        },
+        "pipeline": pipeline.stats() if pipeline is not None else None,
+        "detection": camera_instance.session.scheduler.stats(),
+        "sessions": session_manager.stats()
     }
 
+def get_session(session_id):
+    try:
+        return session_manager.get(session_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Session not found or expired")
+
+def decode_frame(data):
+    image = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+    if image is None:
+        raise ValueError("Frame is not a readable image")
+    return image
+
+@app.post("/api/sessions", status_code=201)
+async def create_session():
+    """
+    Start a liveness session with its own pose challenge
+    """
+    try:
+        session = session_manager.create()
+    except SessionLimitError as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    
+    return {
+        **session.status(),
+        "sequence": session.login_seq,
+        "hold_time": session.hold_time
+    }
+
+@app.get("/api/sessions")
+async def sessions_info():
+    """
+    Active session count, the session cap and model pool usage
+    """
+    return session_manager.stats()
+
+@app.get("/api/sessions/{session_id}")
+async def get_session_status(session_id: str):
+    """
+    Get a session's login verification status
+    """
+    return get_session(session_id).status()
+
+@app.post("/api/sessions/{session_id}/frame")
+async def submit_frame(session_id: str, file: UploadFile = File(...)):
+    """
+    Analyse one camera frame sent by the client and return the updated status
+    """
+    session = get_session(session_id)
+    if session_id == CAMERA_SESSION:
+        raise HTTPException(status_code=409, detail="The camera session is fed by the server camera")
+    
+    data = await file.read()
+    try:
+        image = await asyncio.to_thread(decode_frame, data)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return await asyncio.to_thread(session.submit_frame, image)
+
+@app.post("/api/sessions/{session_id}/reset")
+async def reset_session(session_id: str):
+    """
+    Reset one session's login verification process
+    """
+    get_session(session_id).reset()
+    
+    return {"message": "Login process reset successfully"}
+
+@app.get("/api/sessions/{session_id}/stream")
+async def stream_session(session_id: str):
+    """
+    Stream a session's frames with its pose detection overlay
+    """
+    session = get_session(session_id)
+    frames = camera_instance.generate_frames() if session_id == CAMERA_SESSION else session.generate_frames()
+    return StreamingResponse(frames, media_type="multipart/x-mixed-replace; boundary=frame")
+
+@app.delete("/api/sessions/{session_id}")
+async def delete_session(session_id: str):
+    """
+    End a session and free its slot
+    """
+    if session_id == CAMERA_SESSION:
+        raise HTTPException(status_code=409, detail="The camera session cannot be deleted")
+    if not session_manager.delete(session_id):
+        raise HTTPException(status_code=404, detail="Session not found or expired")
+    
+    return {"message": "Session deleted"}
+
 @app.get("/")
 async def root():
     """
@@ -132,7 +234,8 @@ async def root():
             "status": "/api/face/status", 
             "reset": "/api/face/reset",
             "sequence": "/api/face/sequence",
-            "info": "/api/camera/info"
+            "info": "/api/camera/info",
+            "sessions": "/api/sessions"
         }
     }
 
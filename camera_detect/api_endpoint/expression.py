@@ -0,0 +1,97 @@
+import math
+import os
+
+import cv2
+import numpy as np
+
+CAM_SMILE_WIDTH = float(os.getenv("CAM_SMILE_WIDTH", "0.1"))
+CAM_SMILE_LIFT = float(os.getenv("CAM_SMILE_LIFT", "0.02"))
+CAM_SMILE_MAX_MAR = float(os.getenv("CAM_SMILE_MAX_MAR", "0.6"))
+CAM_HAAR_FALLBACK = os.getenv("CAM_HAAR_FALLBACK", "0") == "1"
+
+# FaceMesh indices: eye outer corners, mouth corners, inner upper and lower lip
+MOUTH_LANDMARKS = (33, 263, 61, 291, 13, 14)
+
+
+def mouth_features(points):
+    """Mouth width, lip-corner lift and mouth aspect ratio from (6, 2) MOUTH_LANDMARKS.
+
+    Width and lift are relative to the distance between the eye corners, and
+    lift is measured along the face's own vertical axis so head roll and a
+    mirrored image don't change it. Lift is positive when the mouth corners
+    sit above the middle of the lips.
+    """
+    eye_a, eye_b, corner_a, corner_b, upper, lower = points
+    across = eye_b - eye_a
+    eye_distance = math.hypot(*across)
+    down = np.array([-across[1], across[0]]) / eye_distance
+    if down[1] < 0:
+        down = -down
+    mouth_width = math.dist(corner_a, corner_b)
+    lift = float(np.dot((upper + lower) / 2 - (corner_a + corner_b) / 2, down)) / eye_distance
+    return mouth_width / eye_distance, lift, math.dist(upper, lower) / mouth_width
+
+
+class SmileDetector:
+    """Smile classifier on FaceMesh mouth landmarks.
+
+    A smile widens the mouth and lifts its corners relative to the person's
+    own neutral expression. That baseline starts from the first face seen and
+    keeps adapting while the face is frontal and not smiling, moving quickly
+    towards a more neutral mouth and slowly away from it. A wide open mouth
+    (a high mouth aspect ratio) is not a smile.
+    """
+
+    def __init__(self, width_gain=CAM_SMILE_WIDTH, lift_gain=CAM_SMILE_LIFT, max_mar=CAM_SMILE_MAX_MAR,
+                 adapt=0.02, release=0.6):
+        self.width_gain = width_gain
+        self.lift_gain = lift_gain
+        self.max_mar = max_mar
+        self.adapt = adapt
+        self.release = release
+        self.baseline = None
+        self.smiling = False
+
+    def update(self, points, frontal=True):
+        """Classify one frame's mouth; returns True while smiling"""
+        width, lift, mar = mouth_features(points)
+        if self.baseline is None:
+            self.baseline = [width, lift]
+        base_width, base_lift = self.baseline
+        # Once smiling, a smaller change keeps the smile so the hold timer isn't reset by jitter
+        scale = self.release if self.smiling else 1.0
+        self.smiling = (
+            width >= base_width * (1 + self.width_gain * scale)
+            and lift - base_lift >= self.lift_gain * scale
+            and mar <= self.max_mar
+        )
+        if frontal and not self.smiling:
+            rate = self.adapt * 10 if width < base_width else self.adapt
+            self.baseline = [base_width + rate * (width - base_width), base_lift + rate * (lift - base_lift)]
+        return self.smiling
+
+    def reset(self):
+        self.baseline = None
+        self.smiling = False
+
+
+class HaarSmileDetector:
+    """Haar cascade smile check for frames where FaceMesh finds no face"""
+
+    def __init__(self):
+        self.face_cascade = None
+        self.smile_cascade = None
+
+    def detect(self, image):
+        if self.face_cascade is None:
+            self.face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+            self.smile_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_smile.xml')
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        faces = self.face_cascade.detectMultiScale(gray, scaleFactor=1.3, minNeighbors=5)
+        for (x, y, w, h) in faces:
+            smiles = self.smile_cascade.detectMultiScale(
+                gray[y:y + h, x:x + w], scaleFactor=1.8, minNeighbors=20, minSize=(25, 25)
+            )
+            if len(smiles) > 0:
+                return True
+        return False
@@ -0,0 +1,74 @@
+import asyncio
+import threading
+
+
+class FrameBuffer:
+    """Latest published frame, written by one thread and read by many subscribers.
+
+    Subscribers that fall behind skip straight to the newest frame, so a slow
+    viewer never holds back the producer or the other viewers.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._frame = None
+        self._seq = 0
+        self._closed = False
+        self._waiters = set()
+
+    @staticmethod
+    def _wake(future):
+        if not future.done():
+            future.set_result(None)
+
+    def _notify(self):
+        waiters, self._waiters = self._waiters, set()
+        for loop, future in waiters:
+            loop.call_soon_threadsafe(self._wake, future)
+
+    def publish(self, frame):
+        """Replace the latest frame and wake every waiting subscriber"""
+        with self._lock:
+            self._frame = frame
+            self._seq += 1
+            self._notify()
+
+    def close(self):
+        """Wake subscribers for good; `next` returns None from now on"""
+        with self._lock:
+            self._closed = True
+            self._notify()
+
+    def reopen(self):
+        with self._lock:
+            self._closed = False
+
+    @property
+    def seq(self):
+        return self._seq
+
+    def latest(self):
+        """Return (seq, frame) without waiting"""
+        with self._lock:
+            return self._seq, self._frame
+
+    async def next(self, after_seq=0, timeout=None):
+        """Wait for a frame newer than `after_seq`; returns (seq, frame).
+
+        Returns None once the buffer is closed, and raises TimeoutError if
+        nothing new arrives within `timeout` seconds.
+        """
+        while True:
+            with self._lock:
+                if self._closed:
+                    return None
+                if self._seq > after_seq:
+                    return self._seq, self._frame
+                loop = asyncio.get_running_loop()
+                waiter = (loop, loop.create_future())
+                self._waiters.add(waiter)
+            try:
+                await asyncio.wait_for(waiter[1], timeout)
+            finally:
+                with self._lock:
+                    self._waiters.discard(waiter)
@@ -0,0 +1,182 @@
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+CAM_TARGET_FPS = float(os.getenv("CAM_TARGET_FPS", "30"))
+CAM_QUEUE_SIZE = int(os.getenv("CAM_QUEUE_SIZE", "1"))
+
+
+class DropOldestQueue:
+    """Bounded hand-off between two pipeline stages.
+
+    Putting into a full queue discards the oldest item, so a slow consumer
+    always works on recent frames and the producer never blocks.
+    """
+
+    def __init__(self, maxsize=1):
+        self._items = deque(maxlen=max(1, maxsize))
+        self._cond = threading.Condition()
+        self._closed = False
+        self.dropped = 0
+
+    def put(self, item):
+        with self._cond:
+            if len(self._items) == self._items.maxlen:
+                self.dropped += 1
+            self._items.append(item)
+            self._cond.notify()
+
+    def get(self, timeout=None):
+        """Return the oldest item, or None once the queue is closed and empty"""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._items or self._closed, timeout):
+                return None
+            return self._items.popleft() if self._items else None
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+
+class FramePipeline:
+    """Capture, inference and encode stages on worker threads.
+
+    `read()` returns (ok, frame) like cv2.VideoCapture.read, `process(frame)`
+    runs detection and returns an item for `render(item)`, which returns the
+    encoded bytes handed to `publish`. Capture runs at the camera's pace;
+    inference takes the newest frame at most `target_fps` times a second.
+    Capture pauses once no viewer has been attached for `idle_timeout` seconds.
+    """
+
+    def __init__(self, read, process, render, publish, on_end=None,
+                 target_fps=CAM_TARGET_FPS, queue_size=CAM_QUEUE_SIZE, idle_timeout=5.0):
+        self.read = read
+        self.process = process
+        self.render = render
+        self.publish = publish
+        self.on_end = on_end
+        self.target_fps = target_fps
+        self.idle_timeout = idle_timeout
+        self.captured = DropOldestQueue(queue_size)
+        self.processed = DropOldestQueue(queue_size)
+        self.counts = {"captured": 0, "processed": 0, "encoded": 0, "errors": 0}
+        self.timings = {"process": 0.0, "encode": 0.0}
+        self.finished = False
+        self._viewers = 0
+        self._idle_since = time.monotonic()
+        self._has_viewers = threading.Event()
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def start(self):
+        self._executor = ThreadPoolExecutor(max_workers=3, thread_name_prefix="camera")
+        for stage in (self._capture_stage, self._process_stage, self._encode_stage):
+            self._executor.submit(stage)
+
+    def stop(self):
+        self._stop.set()
+        self._has_viewers.set()
+        self.captured.close()
+        self.processed.close()
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+
+    def add_viewer(self):
+        with self._lock:
+            self._viewers += 1
+            self._has_viewers.set()
+
+    def remove_viewer(self):
+        with self._lock:
+            self._viewers -= 1
+            if self._viewers == 0:
+                self._idle_since = time.monotonic()
+
+    def _wait_for_viewers(self):
+        with self._lock:
+            idle = self._viewers == 0 and time.monotonic() - self._idle_since >= self.idle_timeout
+            if idle:
+                self._has_viewers.clear()
+        self._has_viewers.wait()
+
+    def _record(self, stage, started):
+        # Exponential moving average of each stage's duration, in seconds
+        elapsed = time.perf_counter() - started
+        self.timings[stage] += 0.1 * (elapsed - self.timings[stage])
+
+    def _capture_stage(self):
+        try:
+            while not self._stop.is_set():
+                self._wait_for_viewers()
+                if self._stop.is_set():
+                    break
+                success, frame = self.read()
+                if not success:
+                    break
+                self.counts["captured"] += 1
+                self.captured.put(frame)
+        finally:
+            self.finished = True
+            self.captured.close()
+
+    def _process_stage(self):
+        interval = 1.0 / self.target_fps if self.target_fps > 0 else 0.0
+        next_due = time.monotonic()
+        try:
+            while True:
+                # Pace to the target FPS instead of sleeping a fixed time after the work
+                delay = next_due - time.monotonic()
+                if delay > 0 and self._stop.wait(delay):
+                    break
+                frame = self.captured.get()
+                if frame is None:
+                    break
+                next_due = max(next_due + interval, time.monotonic())
+                started = time.perf_counter()
+                try:
+                    item = self.process(frame)
+                except Exception:
+                    self.counts["errors"] += 1
+                    continue
+                self._record("process", started)
+                self.counts["processed"] += 1
+                self.processed.put(item)
+        finally:
+            self.processed.close()
+
+    def _encode_stage(self):
+        try:
+            while True:
+                item = self.processed.get()
+                if item is None:
+                    break
+                started = time.perf_counter()
+                try:
+                    data = self.render(item)
+                except Exception:
+                    self.counts["errors"] += 1
+                    continue
+                self._record("encode", started)
+                if data is not None:
+                    self.counts["encoded"] += 1
+                    self.publish(data)
+        finally:
+            if self.on_end is not None:
+                self.on_end()
+
+    def stats(self):
+        """Frame counts, drops and average stage times for monitoring"""
+        return {
+            **self.counts,
+            "dropped_before_process": self.captured.dropped,
+            "dropped_before_encode": self.processed.dropped,
+            "process_ms": round(self.timings["process"] * 1000, 1),
+            "encode_ms": round(self.timings["encode"] * 1000, 1),
+            "target_fps": self.target_fps,
+            "viewers": self._viewers,
+            "running": not self.finished,
+        }
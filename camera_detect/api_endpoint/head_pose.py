@@ -0,0 +1,148 @@
+import math
+import os
+from collections import namedtuple
+
+import cv2
+import numpy as np
+
+CAM_YAW_THRESHOLD = float(os.getenv("CAM_YAW_THRESHOLD", "15"))
+CAM_PITCH_THRESHOLD = float(os.getenv("CAM_PITCH_THRESHOLD", "10"))
+CAM_MAX_FACES = int(os.getenv("CAM_MAX_FACES", "1"))
+
+# FaceMesh indices: eye outer corners, nose tip, mouth corners and chin
+POSE_LANDMARKS = (33, 263, 1, 61, 291, 199)
+NOSE = 2
+
+# The same six points on MediaPipe's canonical face model (cm), in camera axes:
+# x to the image right, y down and z away from the camera
+FACE_MODEL = np.array([
+    [-4.445859, -2.663991, -3.173422],
+    [4.445859, -2.663991, -3.173422],
+    [0.0, 3.406404, -5.979507],
+    [-2.456206, 4.342621, -4.283884],
+    [2.456206, 4.342621, -4.283884],
+    [0.0, 7.942194, -5.181173],
+])
+
+REFINE_CRITERIA = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_COUNT, 5, 1e-4)
+
+FacePose = namedtuple("FacePose", "label yaw pitch nose size index")
+
+
+def landmark_points(face_landmarks, indices, width, height, origin=(0, 0)):
+    """Pixel (x, y) of the given FaceMesh landmarks, gathered without touching the others.
+
+    `width`, `height` and `origin` describe the frame region the landmarks were
+    detected in, so points from a cropped or scaled view map back to the frame.
+    """
+    points = face_landmarks.landmark
+    normalised = np.array([(points[i].x, points[i].y) for i in indices], dtype=np.float64)
+    return normalised * (width, height) + origin
+
+
+def pose_angles(rvec):
+    """Yaw and pitch (degrees) of the direction the face points in.
+
+    Yaw is negative when the nose points to the image left, pitch positive
+    when it points up.
+    """
+    rmat, _ = cv2.Rodrigues(rvec)
+    forward = -rmat[:, 2]
+    yaw = math.degrees(math.atan2(forward[0], -forward[2]))
+    pitch = math.degrees(math.atan2(-forward[1], -forward[2]))
+    return yaw, pitch
+
+
+class HeadPoseEngine:
+    """Head pose from six landmarks per face, tracked between frames.
+
+    Camera intrinsics are cached per resolution. A new face is solved with
+    SQPnP; a face already seen on the previous frame is refined from the
+    rotation and translation found for it then, which is cheaper and keeps
+    the pose stable.
+    """
+
+    def __init__(self, yaw_threshold=CAM_YAW_THRESHOLD, pitch_threshold=CAM_PITCH_THRESHOLD,
+                 match_distance=0.2, max_refine_error=0.15):
+        self.yaw_threshold = yaw_threshold
+        self.pitch_threshold = pitch_threshold
+        self.match_distance = match_distance
+        self.max_refine_error = max_refine_error
+        self._cameras = {}
+        self._tracks = []
+        self._no_distortion = np.zeros((4, 1))
+
+    def camera_matrix(self, width, height):
+        """Pinhole intrinsics with the focal length approximated by the image width"""
+        matrix = self._cameras.get((width, height))
+        if matrix is None:
+            matrix = np.array([[width, 0, width / 2],
+                               [0, width, height / 2],
+                               [0, 0, 1]], dtype=np.float64)
+            self._cameras[(width, height)] = matrix
+        return matrix
+
+    def classify(self, yaw, pitch):
+        if yaw < -self.yaw_threshold:
+            return "Looking Left"
+        if yaw > self.yaw_threshold:
+            return "Looking Right"
+        if pitch > self.pitch_threshold:
+            return "Looking Up"
+        return "Unknown"
+
+    def frontal(self, pose):
+        """Whether a face is turned less than the thresholds in every direction"""
+        return abs(pose.yaw) < self.yaw_threshold and abs(pose.pitch) < self.pitch_threshold
+
+    def _previous(self, nose, width, tracks):
+        """Pop the previous frame's track nearest to this face's nose, if close enough"""
+        best, best_distance = None, self.match_distance * width
+        for i, (tracked_nose, _, _) in enumerate(tracks):
+            distance = math.dist(nose, tracked_nose)
+            if distance < best_distance:
+                best, best_distance = i, distance
+        return tracks.pop(best) if best is not None else None
+
+    def _fits(self, points, matrix, rvec, tvec):
+        """Whether the refined pose reprojects close to the landmarks (it may not after a fast turn)"""
+        projected, _ = cv2.projectPoints(FACE_MODEL, rvec, tvec, matrix, self._no_distortion)
+        error = np.abs(projected.reshape(-1, 2) - points).max()
+        return error <= self.max_refine_error * math.dist(points[0], points[1])
+
+    def _solve(self, points, matrix, track):
+        if track is not None:
+            # A few refinement steps from last frame's pose instead of a full solve
+            rvec, tvec = track[1].copy(), track[2].copy()
+            cv2.solvePnPRefineVVS(FACE_MODEL, points, matrix, self._no_distortion, rvec, tvec, REFINE_CRITERIA)
+            if tvec[2, 0] > 0 and self._fits(points, matrix, rvec, tvec):
+                return rvec, tvec
+        ok, rvec, tvec = cv2.solvePnP(FACE_MODEL, points, matrix, self._no_distortion, flags=cv2.SOLVEPNP_SQPNP)
+        if not ok or tvec[2, 0] <= 0:
+            return None, None
+        return rvec, tvec
+
+    def estimate(self, faces, width, height):
+        """Return a FacePose per face from their (6, 2) pixel POSE_LANDMARKS arrays"""
+        matrix = self.camera_matrix(width, height)
+        previous, tracks, poses = list(self._tracks), [], []
+        for index, points in enumerate(faces):
+            nose = tuple(points[NOSE])
+            track = self._previous(nose, width, previous)
+            rvec, tvec = self._solve(points, matrix, track)
+            if rvec is None:
+                continue
+            tracks.append((nose, rvec, tvec))
+            yaw, pitch = pose_angles(rvec)
+            size = math.dist(points[0], points[1])
+            poses.append(FacePose(self.classify(yaw, pitch), yaw, pitch, nose, size, index))
+        self._tracks = tracks
+        return poses
+
+    def reset(self):
+        self._tracks = []
+
+
+def primary_face(poses):
+    """The face closest to the camera, judged by the distance between its eye corners"""
+    return max(poses, key=lambda pose: pose.size, default=None)
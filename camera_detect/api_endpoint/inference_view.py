@@ -0,0 +1,68 @@
+import math
+import os
+from collections import namedtuple
+
+import cv2
+import numpy as np
+
+CAM_STREAM_WIDTH = int(os.getenv("CAM_STREAM_WIDTH", "640"))
+CAM_STREAM_HEIGHT = int(os.getenv("CAM_STREAM_HEIGHT", "480"))
+CAM_INFERENCE_WIDTH = int(os.getenv("CAM_INFERENCE_WIDTH", "320"))
+CAM_INFERENCE_CROP = os.getenv("CAM_INFERENCE_CROP", "0") == "1"
+
+# The image detection runs on, and the frame region it covers in frame pixels
+InferenceView = namedtuple("InferenceView", "image origin width height")
+
+
+class InferenceFramer:
+    """Picks the part of each frame detection runs on and shrinks it to the inference width.
+
+    Without cropping the whole frame is downscaled. With cropping, frames
+    after a detected face are cut to a region around it, `face_widths` eye
+    distances wide with the frame's aspect ratio. The region only moves once
+    the face drifts out of its central half or changes size noticeably, so
+    FaceMesh keeps seeing a stable image between frames.
+    """
+
+    def __init__(self, inference_width=CAM_INFERENCE_WIDTH, crop=CAM_INFERENCE_CROP, face_widths=5.0):
+        self.inference_width = inference_width
+        self.crop = crop
+        self.face_widths = face_widths
+        self.region = None
+
+    def view(self, frame):
+        frame_h, frame_w = frame.shape[:2]
+        x, y, w, h = self.region if self.crop and self.region is not None else (0, 0, frame_w, frame_h)
+        image = frame[y:y + h, x:x + w]
+        if 0 < self.inference_width < w:
+            size = (self.inference_width, max(1, round(h * self.inference_width / w)))
+            image = cv2.resize(image, size, interpolation=cv2.INTER_LINEAR)
+        return InferenceView(image, (x, y), w, h)
+
+    def track(self, points, frame_w, frame_h):
+        """Update the crop from a face's POSE_LANDMARKS in frame pixels, or None when no face was found"""
+        if not self.crop:
+            return
+        if points is None:
+            self.region = None
+            return
+        centre = points.mean(axis=0)
+        w = math.dist(points[0], points[1]) * self.face_widths
+        w = min(frame_w, max(w, self.inference_width))
+        h = min(frame_h, w * frame_h / frame_w)
+        if self.region is not None and self._still_fits(centre, w):
+            return
+        if w >= frame_w:
+            self.region = None
+            return
+        x = int(np.clip(centre[0] - w / 2, 0, frame_w - w))
+        y = int(np.clip(centre[1] - h / 2, 0, frame_h - h))
+        self.region = (x, y, int(w), int(h))
+
+    def _still_fits(self, centre, w):
+        x, y, region_w, region_h = self.region
+        inside = abs(centre[0] - (x + region_w / 2)) < region_w / 4 and abs(centre[1] - (y + region_h / 2)) < region_h / 4
+        return inside and 0.8 < w / region_w < 1.25
+
+    def reset(self):
+        self.region = None
@@ -1,165 +1,111 @@
-import numpy as np
 import cv2
 import mediapipe as mp
-import time
-import asyncio
+import threading
+from frame_hub import FrameBuffer
+from frame_pipeline import CAM_TARGET_FPS, FramePipeline
+from head_pose import CAM_MAX_FACES
+from inference_view import CAM_STREAM_HEIGHT, CAM_STREAM_WIDTH
+from sessions import LivenessSession, ModelPool
+
+def create_face_mesh():
+    """FaceMesh instance for the shared model pool"""
+    return mp.solutions.face_mesh.FaceMesh(
+        max_num_faces=CAM_MAX_FACES,
+        min_detection_confidence=0.5, 
+        min_tracking_confidence=0.5
+    )
 
 class OpenCam:
-    def __init__(self, camera_index=0):
+    def __init__(self, camera_index=0, idle_timeout=5.0, target_fps=CAM_TARGET_FPS, session=None):
         self.cap = cv2.VideoCapture(camera_index)
         if not self.cap.isOpened():
             raise Exception("Cannot open camera")
             
         # Set camera properties for better performance
-        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-        self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
+        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, CAM_STREAM_WIDTH)
+        self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, CAM_STREAM_HEIGHT)
         self.cap.set(cv2.CAP_PROP_FPS, 30)
         
-        self.mp_face_mesh = mp.solutions.face_mesh
-        self.face_mesh = self.mp_face_mesh.FaceMesh(
-            min_detection_confidence=0.5, 
-            min_tracking_confidence=0.5
-        )
-        self.face_cascade = cv2.CascadeClassifier(
-            cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
-        )
-        self.smile_cascade = cv2.CascadeClassifier(
-            cv2.data.haarcascades + 'haarcascade_smile.xml'
-        )
+        # Login state and detectors live in the session the camera feeds
+        if session is None:
+            session = LivenessSession("camera", ModelPool(create_face_mesh, size=1), target_fps=target_fps)
+        self.session = session
         
-        self.login_seq = ["Looking Left", "Looking Right", "Looking Up", "Smile"]
-        self.current_step = 0
-        self.login_finished = False
-        self.hold_time = 1.0  
-        self.pose_start_time = None
+        # One capture/inference/encode pipeline feeds every stream client
+        self.frames = FrameBuffer()
+        self.idle_timeout = idle_timeout
+        self.target_fps = target_fps
+        self.pipeline = None
+        self._lock = threading.Lock()
+    
+    @property
+    def login_seq(self):
+        return self.session.login_seq
+    
+    @property
+    def hold_time(self):
+        return self.session.hold_time
     
     def detect_pose(self, image):
         """Detect face pose from image"""
-        img_h, img_w, _ = image.shape
-        rgb_image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-        results = self.face_mesh.process(rgb_image)
-        
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-        faces = self.face_cascade.detectMultiScale(gray, scaleFactor=1.3, minNeighbors=5)
-        
-        pose = "Unknown"
-        
-        if results.multi_face_landmarks:
-            for face_landmarks in results.multi_face_landmarks:
-                face_2d, face_3d = [], []
-                
-                for idx, lm in enumerate(face_landmarks.landmark):
-                    if idx in [33, 263, 1, 61, 291, 199]:
-                        if idx == 1:
-                            nose_2d = (lm.x * img_w, lm.y * img_h)
-                            nose_3d = (lm.x * img_w, lm.y * img_h, lm.z * 3000)
-                        x, y = int(lm.x * img_w), int(lm.y * img_h)
-                        face_2d.append([x, y])
-                        face_3d.append([x, y, lm.z])
-                
-                if len(face_2d) >= 6:  # Ensure we have enough points
-                    face_2d = np.array(face_2d, dtype=np.float64)
-                    face_3d = np.array(face_3d, dtype=np.float64)
-                    
-                    focal_length = img_w
-                    cam_matrix = np.array([[focal_length, 0, img_h / 2],
-                                         [0, focal_length, img_w / 2],
-                                         [0, 0, 1]])
-                    distortion_matrix = np.zeros((4, 1), dtype=np.float64)
-                    
-                    success, rotation_vec, translation_vec = cv2.solvePnP(
-                        face_3d, face_2d, cam_matrix, distortion_matrix
-                    )
-                    
-                    if success:
-                        rmat, _ = cv2.Rodrigues(rotation_vec)
-                        angles, _, _, _, _, _ = cv2.RQDecomp3x3(rmat)
-                        
-                        x_angle = angles[0] * 360
-                        y_angle = angles[1] * 360
-                        
-                        if y_angle < -3:
-                            pose = "Looking Left"
-                        elif y_angle > 3:
-                            pose = "Looking Right"
-                        elif x_angle > 3:   
-                            pose = "Looking Up"
-        
-        for (x, y, w, h) in faces:
-            roi_gray = gray[y:y + h, x:x + w]
-            smiles = self.smile_cascade.detectMultiScale(
-                roi_gray, scaleFactor=1.8, minNeighbors=20, minSize=(25, 25)
-            )
-            if len(smiles) > 0:
-                pose = "Smile"
-        
-        return pose
+        return self.session.detect_pose(image)
     
     def process_login_step(self, pose):
         """Process current login step"""
-        if not self.login_finished:
-            expected = self.login_seq[self.current_step]
-            
-            if pose == expected:
-                if self.pose_start_time is None:
-                    self.pose_start_time = time.time()
-                elif time.time() - self.pose_start_time >= self.hold_time:
-                    self.current_step += 1
-                    self.pose_start_time = None
-                    if self.current_step >= len(self.login_seq):
-                        self.login_finished = True
-            else:
-                self.pose_start_time = None
+        self.session.process_login_step(pose)
+    
+    def reset_login(self):
+        """Restart the login sequence"""
+        self.session.reset()
+    
+    def login_status(self):
+        """Consistent snapshot of the login progress"""
+        return self.session.status()
     
     def add_overlay_text(self, image, pose):
         """Add text overlay to image"""
-        if not self.login_finished:
-            expected = self.login_seq[self.current_step]
-            cv2.putText(image, f"Do: {expected}", (20, 50),
-                       cv2.FONT_HERSHEY_SIMPLEX, 1.2, (0, 255, 0), 2)
-            
-            # Show progress
-            progress = f"{self.current_step}/{len(self.login_seq)}"
-            cv2.putText(image, f"Progress: {progress}", (20, 90),
-                       cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 0), 2)
-        else:
-            cv2.putText(image, "Login Successful!", (20, 50),
-                       cv2.FONT_HERSHEY_SIMPLEX, 1.2, (0, 255, 0), 3)
-        
-        cv2.putText(image, f"Pose: {pose}", (20, 420),
-                   cv2.FONT_HERSHEY_SIMPLEX, 1.0, (0, 255, 255), 2)
-        
-        return image
+        return self.session.add_overlay_text(image, pose)
+    
+    def subscribe(self):
+        """Register a stream client, starting the frame pipeline if needed"""
+        with self._lock:
+            if self.pipeline is None or self.pipeline.finished:
+                if self.pipeline is not None:
+                    self.pipeline.stop()  # let the old encode stage finish before reopening
+                self.frames.reopen()
+                self.pipeline = FramePipeline(
+                    self.cap.read, self.session.analyse_frame, self.session.render_frame, self.frames.publish,
+                    on_end=self.frames.close, target_fps=self.target_fps, idle_timeout=self.idle_timeout
+                )
+                self.pipeline.start()
+            pipeline = self.pipeline
+            pipeline.add_viewer()
+        return pipeline
     
     async def generate_frames(self):
         """Generate frames for FastAPI streaming"""
-        while True:
-            success, image = self.cap.read()
-            if not success:
-                break
-            
-            image = cv2.flip(image, 1)
-            
-            pose = self.detect_pose(image)
-            
-            self.process_login_step(pose)
-            
-            image = self.add_overlay_text(image, pose)
-            
-            ret, buffer = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, 70])
-            if not ret:
-                continue
+        pipeline = self.subscribe()
+        try:
+            seq = 0
+            while True:
+                item = await self.frames.next(seq)
+                if item is None:  # camera stopped delivering frames
+                    break
+                seq, frame = item
                 
-            frame = buffer.tobytes()
-            
-            # Yield frame in multipart format
-            yield (b'--frame\r\n'
-                   b'Content-Type: image/jpeg\r\n\r\n' + frame + b'\r\n')
-            
-            await asyncio.sleep(0.033) 
+                # Yield frame in multipart format
+                yield (b'--frame\r\n'
+                       b'Content-Type: image/jpeg\r\n\r\n' + frame + b'\r\n')
+        finally:
+            pipeline.remove_viewer()
     
     def release(self):
         """Release camera resources"""
+        with self._lock:
+            pipeline, self.pipeline = self.pipeline, None
+        if pipeline is not None:
+            pipeline.stop()
+        self.frames.close()
         if self.cap:
             self.cap.release()
         cv2.destroyAllWindows()
@@ -0,0 +1,128 @@
+import math
+import os
+import time
+
+import cv2
+
+CAM_DETECT_EVERY = int(os.getenv("CAM_DETECT_EVERY", "3"))
+CAM_MOTION_THRESHOLD = float(os.getenv("CAM_MOTION_THRESHOLD", "0.02"))
+CAM_MAX_STALENESS = float(os.getenv("CAM_MAX_STALENESS", "0.25"))
+CAM_MAX_STRIDE = int(os.getenv("CAM_MAX_STRIDE", "6"))
+
+THUMBNAIL_SIZE = (80, 60)
+PIXEL_CHANGE = 25
+
+
+class DetectionScheduler:
+    """Runs full inference on some frames and reuses the last result on the others.
+
+    A frame is inferred when the last result is `every` frames old, older than
+    `max_staleness` seconds, or when more than `motion_threshold` of a small
+    grayscale thumbnail changed since the last inferred frame. Apart from
+    staleness, which always triggers, inference never runs more often than
+    every `stride` frames. The stride grows when inference takes longer than
+    the frame budget, so a busy CPU keeps the stream at full rate and detects
+    less often. The budget is the observed gap between frames, excluding time
+    spent in inference, and at least 1 / `target_fps` when that is set.
+    """
+
+    def __init__(self, every=CAM_DETECT_EVERY, motion_threshold=CAM_MOTION_THRESHOLD,
+                 max_staleness=CAM_MAX_STALENESS, max_stride=CAM_MAX_STRIDE, target_fps=30.0,
+                 clock=time.monotonic):
+        self.every = max(1, every)
+        self.motion_threshold = motion_threshold
+        self.max_staleness = max_staleness
+        self.max_stride = max(1, max_stride)
+        self.frame_budget = 1.0 / target_fps if target_fps > 0 else 0.0
+        self.clock = clock
+        self.stride = 1
+        self.inference_time = None
+        self.frame_interval = None
+        self.result = None
+        self.counts = {"inferred": 0, "reused": 0, "motion": 0, "stale": 0}
+        self._since = 0
+        self._last_run = 0.0
+        self._last_frame = None
+        self._last_elapsed = 0.0
+        self._reference = None
+
+    @staticmethod
+    def thumbnail(frame):
+        small = cv2.resize(frame, THUMBNAIL_SIZE, interpolation=cv2.INTER_AREA)
+        return cv2.cvtColor(small, cv2.COLOR_BGR2GRAY) if small.ndim == 3 else small
+
+    def moved(self, thumbnail):
+        """Whether enough of the thumbnail changed since the last inferred frame"""
+        if self._reference is None:
+            return True
+        changed = cv2.absdiff(thumbnail, self._reference) > PIXEL_CHANGE
+        return changed.mean() > self.motion_threshold
+
+    def run(self, frame, infer):
+        """Return infer(frame), or the last result when this frame can skip inference"""
+        now = self.clock()
+        self._observe(now)
+        self._since += 1
+        stale = now - self._last_run >= self.max_staleness
+        if self.result is not None and self._since < self.stride and not stale:
+            return self._reuse()
+        thumbnail = self.thumbnail(frame)
+        moved = self.moved(thumbnail)
+        if self.result is not None and self._since < self.every and not stale and not moved:
+            return self._reuse()
+        if self.result is not None and moved:
+            self.counts["motion"] += 1
+        elif self.result is not None and stale:
+            self.counts["stale"] += 1
+
+        started = time.perf_counter()
+        self.result = infer(frame)
+        self._last_elapsed = time.perf_counter() - started
+        self._adapt(self._last_elapsed)
+        self.counts["inferred"] += 1
+        self._since = 0
+        self._last_run = self.clock()
+        self._reference = thumbnail
+        return self.result
+
+    def _reuse(self):
+        self._last_elapsed = 0.0
+        self.counts["reused"] += 1
+        return self.result
+
+    def _observe(self, now):
+        # Gap between frames the source imposes; inference in the previous call
+        # is left out, as it is what the stride is spreading
+        if self._last_frame is not None:
+            interval = max(0.0, now - self._last_frame - self._last_elapsed)
+            if self.frame_interval is None:
+                self.frame_interval = interval
+            else:
+                self.frame_interval += 0.2 * (interval - self.frame_interval)
+        self._last_frame = now
+
+    def _adapt(self, elapsed):
+        # Stretch the stride until inference's share of each frame fits the frame budget
+        if self.inference_time is None:
+            self.inference_time = elapsed
+        else:
+            self.inference_time += 0.2 * (elapsed - self.inference_time)
+        if self.frame_interval is None:
+            return  # no gap between frames seen yet
+        budget = max(self.frame_interval, self.frame_budget)
+        if budget > 0:
+            self.stride = min(self.max_stride, max(1, math.ceil(self.inference_time / budget)))
+
+    def reset(self):
+        """Forget the last result so the next frame is inferred"""
+        self.result = None
+        self._reference = None
+
+    def stats(self):
+        return {
+            **self.counts,
+            "every": self.every,
+            "stride": self.stride,
+            "frame_ms": round((self.frame_interval or 0.0) * 1000, 1),
+            "inference_ms": round((self.inference_time or 0.0) * 1000, 1),
+        }
@@ -0,0 +1,379 @@
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+import cv2
+
+from expression import CAM_HAAR_FALLBACK, MOUTH_LANDMARKS, HaarSmileDetector, SmileDetector
+from frame_hub import FrameBuffer
+from head_pose import POSE_LANDMARKS, HeadPoseEngine, landmark_points, primary_face
+from inference_view import InferenceFramer
+from scheduler import DetectionScheduler
+
+CAM_MAX_SESSIONS = int(os.getenv("CAM_MAX_SESSIONS", "8"))
+CAM_SESSION_IDLE_TIMEOUT = float(os.getenv("CAM_SESSION_IDLE_TIMEOUT", "300"))
+CAM_MODEL_POOL_SIZE = int(os.getenv("CAM_MODEL_POOL_SIZE", "2"))
+
+LOGIN_SEQUENCE = ["Looking Left", "Looking Right", "Looking Up", "Smile"]
+HOLD_TIME = 1.0
+
+
+class SessionLimitError(Exception):
+    """Raised when creating a session would exceed the concurrent session cap"""
+
+
+class ModelPool:
+    """A fixed set of FaceMesh instances shared by every session.
+
+    Instances are created by `factory` when first needed, up to `size`.
+    FaceMesh tracks a face from one call to the next, so a session gets the
+    instance it used last whenever that one is free, and only borrows another
+    when it is busy. A borrowed instance is reset first, so it detects the
+    face afresh instead of tracking the previous session's face region.
+    """
+
+    def __init__(self, factory, size=CAM_MODEL_POOL_SIZE):
+        self.factory = factory
+        self.size = max(1, size)
+        self.counts = {"acquired": 0, "sticky": 0, "waited": 0}
+        self._models = []
+        self._owners = {}
+        self._free = []
+        self._creating = 0
+        self._cond = threading.Condition()
+
+    @contextmanager
+    def acquire(self, owner):
+        """Borrow a model for `owner` (a session id) for the duration of the block"""
+        index = self._take(owner)
+        try:
+            yield self._models[index]
+        finally:
+            with self._cond:
+                self._owners[index] = owner
+                self._free.append(index)
+                self._cond.notify()
+
+    def _take(self, owner):
+        index, handed_over = self._reserve(owner)
+        if index is None:
+            # Loading a model is slow; other sessions keep acquiring meanwhile
+            try:
+                model = self.factory()
+            except BaseException:
+                with self._cond:
+                    self._creating -= 1
+                    self._cond.notify()
+                raise
+            with self._cond:
+                self._creating -= 1
+                self._models.append(model)
+                return len(self._models) - 1
+        if handed_over:
+            reset = getattr(self._models[index], "reset", None)
+            if reset is not None:
+                reset()
+        return index
+
+    def _reserve(self, owner):
+        """Return (index, handed_over) of a free model, or (None, False) after reserving a new one"""
+        with self._cond:
+            self.counts["acquired"] += 1
+            waited = False
+            while True:
+                for index in self._free:
+                    if self._owners.get(index) == owner:
+                        self._free.remove(index)
+                        self.counts["sticky"] += 1
+                        return index, False
+                if len(self._models) + self._creating < self.size:
+                    self._creating += 1
+                    return None, False
+                if self._free:
+                    # The model released longest ago is the least likely to be wanted back
+                    return self._free.pop(0), True
+                if not waited:
+                    self.counts["waited"] += 1
+                    waited = True
+                self._cond.wait()
+
+    def stats(self):
+        with self._cond:
+            return {**self.counts, "size": self.size, "created": len(self._models), "free": len(self._free)}
+
+    def close(self):
+        with self._cond:
+            models, self._models = self._models, []
+            self._owners, self._free = {}, []
+        for model in models:
+            close = getattr(model, "close", None)
+            if close is not None:
+                close()
+
+
+class LivenessSession:
+    """One person's liveness check: the pose challenge and the detectors tracking their face.
+
+    Frames come either from the server camera's pipeline or from the client
+    through `submit_frame`. FaceMesh is borrowed from the shared pool; head
+    pose tracks, the smile baseline, the inference crop and the detection
+    schedule belong to the session.
+    """
+
+    def __init__(self, session_id, pool, login_seq=LOGIN_SEQUENCE, hold_time=HOLD_TIME,
+                 target_fps=0, clock=time.monotonic):
+        self.id = session_id
+        self.pool = pool
+        self.clock = clock
+        self.created_at = time.time()
+        self.last_seen = clock()
+
+        self.login_seq = list(login_seq)
+        self.current_step = 0
+        self.login_finished = False
+        self.hold_time = hold_time
+        self.pose_start_time = None
+        self.pose = "Unknown"
+
+        # Login state is advanced by inference and read or reset by the API
+        self._state_lock = threading.Lock()
+        # Detector state is only ever advanced by one frame at a time
+        self._detect_lock = threading.Lock()
+
+        self.framer = InferenceFramer()
+        self.head_pose = HeadPoseEngine()
+        self.smile = SmileDetector()
+        self.haar_smile = HaarSmileDetector() if CAM_HAAR_FALLBACK else None
+        # Without a target rate the frame budget is the observed gap between uploads
+        self.scheduler = DetectionScheduler(target_fps=target_fps)
+
+        # Annotated client frames for /api/sessions/{id}/stream viewers
+        self.frames = FrameBuffer()
+        self.viewers = 0
+
+    def touch(self):
+        self.last_seen = self.clock()
+
+    def detect_pose(self, image):
+        """Detect face pose from image"""
+        img_h, img_w, _ = image.shape
+        view = self.framer.view(image)
+        rgb_image = cv2.cvtColor(view.image, cv2.COLOR_BGR2RGB)
+        with self.pool.acquire(self.id) as face_mesh:
+            results = face_mesh.process(rgb_image)
+
+        # Pose of the face nearest the camera; tracks of faces that left are dropped
+        landmarks = results.multi_face_landmarks or []
+        points = [landmark_points(face, POSE_LANDMARKS, view.width, view.height, view.origin) for face in landmarks]
+        primary = primary_face(self.head_pose.estimate(points, img_w, img_h))
+        self.framer.track(points[primary.index] if primary is not None else None, img_w, img_h)
+
+        if primary is None:
+            if self.haar_smile is not None and self.haar_smile.detect(image):
+                return "Smile"
+            return "Unknown"
+
+        # Smile from the same face's mouth landmarks, no extra detector pass
+        mouth = landmark_points(landmarks[primary.index], MOUTH_LANDMARKS, view.width, view.height, view.origin)
+        if self.smile.update(mouth, frontal=self.head_pose.frontal(primary)):
+            return "Smile"
+        return primary.label
+
+    def analyse_frame(self, image):
+        """Mirror the frame, detect the pose and advance the login sequence"""
+        image = cv2.flip(image, 1)
+        with self._detect_lock:
+            pose = self.scheduler.run(image, self.detect_pose)
+        self.process_login_step(pose)
+        self.pose = pose
+        self.touch()
+        return image, pose
+
+    def render_frame(self, item):
+        """Draw the overlay and JPEG-encode the frame"""
+        image, pose = item
+        image = self.add_overlay_text(image, pose)
+        ret, buffer = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, 70])
+        return buffer.tobytes() if ret else None
+
+    def submit_frame(self, image):
+        """Analyse a frame sent by the client; annotated frames are only encoded while someone watches"""
+        item = self.analyse_frame(image)
+        if self.viewers > 0:
+            data = self.render_frame(item)
+            if data is not None:
+                self.frames.publish(data)
+        return self.status()
+
+    async def generate_frames(self):
+        """Multipart JPEG stream of the frames submitted to this session"""
+        self.viewers += 1
+        try:
+            seq = 0
+            while True:
+                item = await self.frames.next(seq)
+                if item is None:  # session closed
+                    break
+                seq, frame = item
+                yield (b'--frame\r\n'
+                       b'Content-Type: image/jpeg\r\n\r\n' + frame + b'\r\n')
+        finally:
+            self.viewers -= 1
+
+    def process_login_step(self, pose):
+        """Process current login step"""
+        with self._state_lock:
+            self._advance_login(pose)
+
+    def _advance_login(self, pose):
+        if not self.login_finished:
+            expected = self.login_seq[self.current_step]
+
+            if pose == expected:
+                if self.pose_start_time is None:
+                    self.pose_start_time = time.time()
+                elif time.time() - self.pose_start_time >= self.hold_time:
+                    self.current_step += 1
+                    self.pose_start_time = None
+                    if self.current_step >= len(self.login_seq):
+                        self.login_finished = True
+            else:
+                self.pose_start_time = None
+
+    def reset(self):
+        """Restart the login sequence"""
+        with self._state_lock:
+            self.current_step = 0
+            self.login_finished = False
+            self.pose_start_time = None
+        self.touch()
+
+    def status(self):
+        """Consistent snapshot of the login progress"""
+        with self._state_lock:
+            step, finished = self.current_step, self.login_finished
+        total = len(self.login_seq)
+        return {
+            "session_id": self.id,
+            "current_step": step,
+            "total_steps": total,
+            "current_pose_required": self.login_seq[step] if step < total else None,
+            "login_finished": finished,
+            "progress_percentage": (step / total) * 100,
+            "pose": self.pose
+        }
+
+    def add_overlay_text(self, image, pose):
+        """Add text overlay to image"""
+        with self._state_lock:
+            step, finished = self.current_step, self.login_finished
+
+        # Layout is designed for 480 lines and scaled to the stream height
+        scale = image.shape[0] / 480
+
+        def text(message, y, size, color, thickness):
+            cv2.putText(image, message, (round(20 * scale), round(y * scale)),
+                        cv2.FONT_HERSHEY_SIMPLEX, size * scale, color, max(1, round(thickness * scale)))
+
+        if not finished:
+            expected = self.login_seq[step]
+            text(f"Do: {expected}", 50, 1.2, (0, 255, 0), 2)
+
+            # Show progress
+            progress = f"{step}/{len(self.login_seq)}"
+            text(f"Progress: {progress}", 90, 0.8, (255, 255, 0), 2)
+        else:
+            text("Login Successful!", 50, 1.2, (0, 255, 0), 3)
+
+        text(f"Pose: {pose}", 420, 1.0, (0, 255, 255), 2)
+
+        return image
+
+    def close(self):
+        self.frames.close()
+
+
+class SessionManager:
+    """Live sessions by id, capped at `max_sessions` and dropped after `idle_timeout` seconds unused.
+
+    Pinned sessions, like the one bound to the server camera, never expire and
+    do not count toward the cap.
+    """
+
+    def __init__(self, pool, max_sessions=CAM_MAX_SESSIONS, idle_timeout=CAM_SESSION_IDLE_TIMEOUT,
+                 clock=time.monotonic, **session_options):
+        self.pool = pool
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.clock = clock
+        self.session_options = session_options
+        self._sessions = {}
+        self._pinned = set()
+        self._lock = threading.Lock()
+
+    def create(self, session_id=None, pinned=False, **options):
+        """Start a new session; raises SessionLimitError when the cap is reached.
+
+        `options` override the manager's session options for this session.
+        """
+        self.expire()
+        with self._lock:
+            if not pinned and len(self._sessions) - len(self._pinned) >= self.max_sessions:
+                raise SessionLimitError(f"Too many active sessions (limit {self.max_sessions})")
+            session_id = session_id or uuid.uuid4().hex
+            if session_id in self._sessions:
+                raise ValueError(f"Session {session_id} already exists")
+            options = {**self.session_options, **options}
+            session = LivenessSession(session_id, self.pool, clock=self.clock, **options)
+            self._sessions[session_id] = session
+            if pinned:
+                self._pinned.add(session_id)
+        return session
+
+    def get(self, session_id):
+        """Return a live session and mark it as used; raises KeyError for unknown or expired ids"""
+        self.expire()
+        with self._lock:
+            session = self._sessions[session_id]
+        session.touch()
+        return session
+
+    def delete(self, session_id):
+        with self._lock:
+            session = self._sessions.pop(session_id, None)
+            self._pinned.discard(session_id)
+        if session is None:
+            return False
+        session.close()
+        return True
+
+    def expire(self):
+        """Drop sessions idle for longer than idle_timeout; returns their ids"""
+        now = self.clock()
+        with self._lock:
+            expired = [
+                session for session_id, session in self._sessions.items()
+                if session_id not in self._pinned and now - session.last_seen > self.idle_timeout
+            ]
+            for session in expired:
+                del self._sessions[session.id]
+        for session in expired:
+            session.close()
+        return [session.id for session in expired]
+
+    def __len__(self):
+        with self._lock:
+            return len(self._sessions)
+
+    def stats(self):
+        return {"active": len(self), "max_sessions": self.max_sessions, "models": self.pool.stats()}
+
+    def close(self):
+        with self._lock:
+            sessions, self._sessions = list(self._sessions.values()), {}
+            self._pinned = set()
+        for session in sessions:
+            session.close()
+        self.pool.close()
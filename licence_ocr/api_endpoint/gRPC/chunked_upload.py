@@ -0,0 +1,113 @@
+"""Reassemble client-streamed image uploads into one preallocated buffer."""
+
+import os
+
+import ocr_pb2
+
+GRPC_MAX_UPLOAD_MB = int(os.getenv("GRPC_MAX_UPLOAD_MB", "32"))
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+
+class UploadBuffer:
+    """Byte buffer that chunks are copied into once, with a hard size cap.
+
+    When the client announces the total size, the buffer is allocated up
+    front and each chunk lands in place. The finished buffer is handed to
+    `np.frombuffer` as is, without copying it to `bytes`.
+    """
+
+    def __init__(self, total_size: int = 0, max_bytes: int = GRPC_MAX_UPLOAD_MB * 1024 * 1024):
+        if total_size > max_bytes:
+            raise ValueError(f"Upload of {total_size} bytes exceeds the {max_bytes} byte limit.")
+        self.total_size = total_size
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._buffer = bytearray(total_size)
+
+    def write(self, data: bytes):
+        """Append one chunk."""
+        end = self.size + len(data)
+        if end > self.max_bytes:
+            raise ValueError(f"Upload exceeds the {self.max_bytes} byte limit.")
+        # Same-length slice assignment copies in place; past the end it grows.
+        self._buffer[self.size : end] = data
+        self.size = end
+
+    def finish(self) -> bytearray:
+        """Return the assembled image."""
+        if self.total_size and self.size != self.total_size:
+            raise ValueError(f"Upload ended after {self.size} of {self.total_size} bytes.")
+        if not self.size:
+            raise ValueError("Upload contained no image data.")
+        return self._buffer
+
+
+def _start(chunk):
+    if chunk is None or chunk.WhichOneof("part") != "header":
+        raise ValueError("Upload must start with a header.")
+    return chunk.header, UploadBuffer(chunk.header.total_size)
+
+
+def _write(upload, chunk):
+    if chunk.WhichOneof("part") != "data":
+        raise ValueError("Upload header sent twice.")
+    upload.write(chunk.data)
+
+
+def receive_upload(chunks):
+    """Read a DocumentChunk stream; returns (header, image buffer)."""
+    chunks = iter(chunks)
+    header, upload = _start(next(chunks, None))
+    for chunk in chunks:
+        _write(upload, chunk)
+    return header, upload.finish()
+
+
+async def receive_upload_async(chunks):
+    """Read a DocumentChunk stream from grpc.aio; returns (header, image buffer)."""
+    header = upload = None
+    async for chunk in chunks:
+        if upload is None:
+            header, upload = _start(chunk)
+        else:
+            _write(upload, chunk)
+    if upload is None:
+        _start(None)
+    return header, upload.finish()
+
+
+def _remaining_size(source) -> int:
+    """Bytes left in a file object, or 0 (unknown) when it cannot seek."""
+    try:
+        if not source.seekable():
+            return 0
+        start = source.tell()
+        end = source.seek(0, os.SEEK_END)
+        source.seek(start)
+    except (AttributeError, OSError):
+        return 0
+    return end - start
+
+
+def iter_upload(source, class_name: str, correlation_id: str = "", chunk_size: int = UPLOAD_CHUNK_SIZE):
+    """Yield DocumentChunk messages for image bytes or a binary file object.
+
+    File objects are read one chunk at a time, so the client never holds the
+    whole image in memory. Any seekable file works, in-memory ones included;
+    for pipes and sockets the size is sent as unknown and the server grows
+    its buffer instead.
+    """
+    if hasattr(source, "read"):
+        total_size = _remaining_size(source)
+        chunks = iter(lambda: source.read(chunk_size), b"")
+    else:
+        total_size = len(source)
+        view = memoryview(source)
+        chunks = (bytes(view[i : i + chunk_size]) for i in range(0, total_size, chunk_size))
+    yield ocr_pb2.DocumentChunk(
+        header=ocr_pb2.UploadHeader(
+            correlation_id=correlation_id, class_name=class_name, total_size=total_size
+        )
+    )
+    for data in chunks:
+        yield ocr_pb2.DocumentChunk(data=data)
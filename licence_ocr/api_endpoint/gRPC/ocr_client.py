@@ -1,14 +1,339 @@
+"""Client library for the OCR gRPC service.
+
+`OCRClient` (blocking) and `AsyncOCRClient` (grpc.aio) keep a small pool of
+long-lived channels and reuse them for every call. Each call has one
+deadline covering all of its attempts. Transient failures are retried with
+jittered backoff, and a slow attempt can be hedged with a second copy on
+another channel. OCR requests are idempotent and cached by the server, so
+duplicate attempts are safe.
+
+    with OCRClient("ocr:50051") as client:
+        nrc = client.licence(image_bytes)
+        results = client.ocr_many([(a, "licence"), (b, "passport")])
+"""
+
+import asyncio
+import itertools
+import os
+import queue
+import random
+import sys
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+
 import grpc
 import ocr_pb2, ocr_pb2_grpc
+from chunked_upload import iter_upload
+
+OCR_GRPC_TARGET = os.getenv("OCR_GRPC_TARGET", "localhost:50051")
+OCR_GRPC_CHANNELS = int(os.getenv("OCR_GRPC_CHANNELS", "2"))
+OCR_GRPC_TIMEOUT = float(os.getenv("OCR_GRPC_TIMEOUT", "30"))
+OCR_GRPC_RETRIES = int(os.getenv("OCR_GRPC_RETRIES", "3"))
+# Seconds to wait on an attempt before hedging it; 0 disables hedging.
+OCR_GRPC_HEDGE_DELAY = float(os.getenv("OCR_GRPC_HEDGE_DELAY", "0"))
+OCR_GRPC_COMPRESSION = os.getenv("OCR_GRPC_COMPRESSION", "none")
+
+RETRYABLE = {
+    grpc.StatusCode.UNAVAILABLE,
+    grpc.StatusCode.RESOURCE_EXHAUSTED,
+    grpc.StatusCode.ABORTED,
+}
+COMPRESSION = {
+    "none": grpc.Compression.NoCompression,
+    "gzip": grpc.Compression.Gzip,
+    "deflate": grpc.Compression.Deflate,
+}
+BACKOFF_BASE = 0.1
+BACKOFF_MAX = 2.0
+MAX_MESSAGE_BYTES = 16 * 1024 * 1024
+
+CHANNEL_OPTIONS = [
+    ("grpc.keepalive_time_ms", 30000),
+    ("grpc.keepalive_timeout_ms", 10000),
+    ("grpc.keepalive_permit_without_calls", 1),
+    ("grpc.http2.max_pings_without_data", 0),
+    ("grpc.max_receive_message_length", MAX_MESSAGE_BYTES),
+    ("grpc.max_send_message_length", MAX_MESSAGE_BYTES),
+    # Otherwise channels with identical options share one connection.
+    ("grpc.use_local_subchannel_pool", 1),
+]
+
+
+def backoff(attempt: int) -> float:
+    """Full-jitter exponential backoff before retry number `attempt + 1`."""
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2**attempt))
+
+
+def build_request(image: bytes, class_name: str):
+    """Return the (method name, request) pair for a unary OCR call."""
+    if class_name == "licence":
+        return "AddLicenceOCR", ocr_pb2.AddLICENCEOCR(licence=image)
+    if class_name == "passport":
+        return "AddLicencePassport", ocr_pb2.AddLICENCEPASSPORT(passport=image)
+    raise ValueError(f"Unknown class_name: {class_name}")
+
+
+def _output(response):
+    """Unary RPCs answer with output_nrc, the streaming ones with output."""
+    if isinstance(response, ocr_pb2.AddOutputNRC):
+        return response.output_nrc or None
+    return response.output or None
+
+
+class _BaseClient(ABC):
+    """Settings and channel pool shared by the sync and async clients."""
+
+    def __init__(
+        self,
+        target: str = OCR_GRPC_TARGET,
+        channels: int = OCR_GRPC_CHANNELS,
+        timeout: float = OCR_GRPC_TIMEOUT,
+        retries: int = OCR_GRPC_RETRIES,
+        hedge_delay: float = OCR_GRPC_HEDGE_DELAY,
+        compression: str = OCR_GRPC_COMPRESSION,
+        credentials: grpc.ChannelCredentials = None,
+    ):
+        if compression not in COMPRESSION:
+            raise ValueError(f"Unknown compression: {compression}")
+        self.target = target
+        self.timeout = timeout
+        self.retries = retries
+        self.hedge_delay = hedge_delay
+        self._channels = [
+            self._open_channel(target, credentials, COMPRESSION[compression])
+            for _ in range(max(1, channels))
+        ]
+        self._stubs = [ocr_pb2_grpc.nrc_ocr_serviceStub(channel) for channel in self._channels]
+        self._next_stub = itertools.cycle(self._stubs)
+
+    @abstractmethod
+    def _open_channel(self, target, credentials, compression):
+        """Open one channel of the pool."""
+
+    def _method(self, name: str):
+        """Bound RPC method on the next channel in the pool."""
+        return getattr(next(self._next_stub), name)
+
+    def _deadline(self, timeout):
+        return time.monotonic() + (self.timeout if timeout is None else timeout)
+
+    @staticmethod
+    def _remaining(deadline: float) -> float:
+        """Seconds left of the call's deadline; each attempt and hedge gets only this."""
+        return max(0.0, deadline - time.monotonic())
+
+    def _hedge_wait(self, attempts: int, deadline: float):
+        """Seconds to wait before hedging, or None when no hedge would help."""
+        if self.hedge_delay <= 0 or attempts >= 2:
+            return None
+        # A hedge started at the deadline would only fail
+        return self.hedge_delay if self.hedge_delay < deadline - time.monotonic() else None
+
+    def _retry_delay(self, error, attempt: int, deadline: float):
+        """Seconds to wait before retrying, or None to give up."""
+        if error.code() not in RETRYABLE or attempt >= self.retries:
+            return None
+        delay = backoff(attempt)
+        return delay if time.monotonic() + delay < deadline else None
+
+
+class OCRClient(_BaseClient):
+    """Blocking OCR client; safe to share between threads."""
+
+    def _open_channel(self, target, credentials, compression):
+        if credentials is not None:
+            return grpc.secure_channel(target, credentials, CHANNEL_OPTIONS, compression)
+        return grpc.insecure_channel(target, CHANNEL_OPTIONS, compression)
+
+    def _attempt(self, method: str, make_request, deadline: float):
+        """Run one attempt, hedged on another channel if it is slow."""
+        done = queue.Queue()
+        calls = []
+
+        def start():
+            call = self._method(method).future(make_request(), timeout=self._remaining(deadline))
+            call.add_done_callback(done.put)
+            calls.append(call)
+
+        start()
+        pending = 1
+        try:
+            while True:
+                try:
+                    call = done.get(timeout=self._hedge_wait(len(calls), deadline))
+                except queue.Empty:
+                    start()
+                    pending += 1
+                    continue
+                pending -= 1
+                try:
+                    return call.result()
+                except grpc.RpcError as e:
+                    if e.code() not in RETRYABLE or not pending:
+                        raise
+        finally:
+            for call in calls:
+                call.cancel()
+
+    def _call(self, method: str, make_request, timeout: float = None):
+        deadline = self._deadline(timeout)
+        for attempt in itertools.count():
+            try:
+                return self._attempt(method, make_request, deadline)
+            except grpc.RpcError as e:
+                delay = self._retry_delay(e, attempt, deadline)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+
+    def ocr(self, image: bytes, class_name: str, timeout: float = None):
+        """Read one document; returns the NRC / passport number or None."""
+        method, request = build_request(image, class_name)
+        return _output(self._call(method, lambda: request, timeout))
+
+    def licence(self, image: bytes, timeout: float = None):
+        return self.ocr(image, "licence", timeout)
+
+    def passport(self, image: bytes, timeout: float = None):
+        return self.ocr(image, "passport", timeout)
+
+    def upload(self, image: bytes, class_name: str, timeout: float = None):
+        """Like `ocr`, but streams the image in chunks for large scans."""
+        response = self._call(
+            "UploadDocumentOCR", lambda: iter_upload(image, class_name), timeout
+        )
+        return _output(response)
+
+    def ocr_many(self, documents, concurrency: int = 8, timeout: float = None, return_exceptions=False):
+        """Read (image, class_name) pairs concurrently; results keep input order.
+
+        With `return_exceptions`, failed documents yield their exception
+        instead of raising the first one.
+        """
+
+        def read(document):
+            try:
+                return self.ocr(*document, timeout=timeout)
+            except Exception as e:
+                if not return_exceptions:
+                    raise
+                return e
+
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            return list(pool.map(read, documents))
+
+    def close(self):
+        for channel in self._channels:
+            channel.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class AsyncOCRClient(_BaseClient):
+    """grpc.aio OCR client; create and use it inside one event loop."""
+
+    def _open_channel(self, target, credentials, compression):
+        if credentials is not None:
+            return grpc.aio.secure_channel(target, credentials, CHANNEL_OPTIONS, compression)
+        return grpc.aio.insecure_channel(target, CHANNEL_OPTIONS, compression)
+
+    async def _attempt(self, method: str, make_request, deadline: float):
+        """Run one attempt, hedged on another channel if it is slow."""
+        calls = set()
+
+        started = 0
+
+        def start():
+            nonlocal started
+            call = self._method(method)(make_request(), timeout=self._remaining(deadline))
+            calls.add(asyncio.ensure_future(call))
+            started += 1
+
+        start()
+        try:
+            while True:
+                done, _ = await asyncio.wait(
+                    calls,
+                    timeout=self._hedge_wait(started, deadline),
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                if not done:
+                    start()
+                    continue
+                for call in done:
+                    calls.discard(call)
+                    try:
+                        return call.result()
+                    except grpc.RpcError as e:
+                        if e.code() not in RETRYABLE or not calls:
+                            raise
+        finally:
+            for call in calls:
+                call.cancel()
+
+    async def _call(self, method: str, make_request, timeout: float = None):
+        deadline = self._deadline(timeout)
+        for attempt in itertools.count():
+            try:
+                return await self._attempt(method, make_request, deadline)
+            except grpc.RpcError as e:
+                delay = self._retry_delay(e, attempt, deadline)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+
+    async def ocr(self, image: bytes, class_name: str, timeout: float = None):
+        """Read one document; returns the NRC / passport number or None."""
+        method, request = build_request(image, class_name)
+        return _output(await self._call(method, lambda: request, timeout))
+
+    async def licence(self, image: bytes, timeout: float = None):
+        return await self.ocr(image, "licence", timeout)
+
+    async def passport(self, image: bytes, timeout: float = None):
+        return await self.ocr(image, "passport", timeout)
+
+    async def upload(self, image: bytes, class_name: str, timeout: float = None):
+        """Like `ocr`, but streams the image in chunks for large scans."""
+        response = await self._call(
+            "UploadDocumentOCR", lambda: iter_upload(image, class_name), timeout
+        )
+        return _output(response)
+
+    async def ocr_many(self, documents, concurrency: int = 8, timeout: float = None, return_exceptions=False):
+        """Read (image, class_name) pairs concurrently; results keep input order."""
+        limit = asyncio.Semaphore(concurrency)
+
+        async def read(document):
+            async with limit:
+                return await self.ocr(*document, timeout=timeout)
+
+        return await asyncio.gather(
+            *(read(document) for document in documents), return_exceptions=return_exceptions
+        )
+
+    async def close(self):
+        await asyncio.gather(*(channel.close() for channel in self._channels))
+
+    async def __aenter__(self):
+        return self
 
-# Connect to gRPC server
-channel = grpc.insecure_channel("localhost:50051")
-stub = ocr_pb2_grpc.nrc_ocr_serviceStub(channel)
+    async def __aexit__(self, *exc):
+        await self.close()
 
-# Licence OCR
-with open("/Users/yebhonelin/Documents/github/ai-banking-app-backend/IMG_6805.jpg", "rb") as f:
-    licence_bytes = f.read()
-request = ocr_pb2.AddLICENCEOCR(licence=licence_bytes)
-response = stub.AddLicenceOCR(request)
-print("Detected NRC:", response.output_nrc)
 
+if __name__ == "__main__":
+    # python ocr_client.py licence|passport IMAGE [IMAGE ...]
+    class_name, paths = sys.argv[1], sys.argv[2:]
+    images = []
+    for path in paths:
+        with open(path, "rb") as f:
+            images.append((f.read(), class_name))
+    with OCRClient() as client:
+        for path, result in zip(paths, client.ocr_many(images, return_exceptions=True)):
+            print(f"{path}: {result}")
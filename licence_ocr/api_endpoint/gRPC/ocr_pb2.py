@@ -24,7 +24,7 @@ _sym_db = _symbol_database.Default()
 
 
 
-DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\tocr.proto\x12\x07nrc_ocr\" \n\rAddLICENCEOCR\x12\x0f\n\x07licence\x18\x01 \x01(\x0c\"&\n\x12\x41\x64\x64LICENCEPASSPORT\x12\x10\n\x08passport\x18\x01 \x01(\x0c\"\"\n\x0c\x41\x64\x64OutputNRC\x12\x12\n\noutput_nrc\x18\x01 \x01(\t2\x9b\x01\n\x0fnrc_ocr_service\x12>\n\rAddLicenceOCR\x12\x16.nrc_ocr.AddLICENCEOCR\x1a\x15.nrc_ocr.AddOutputNRC\x12H\n\x12\x41\x64\x64LicencePassport\x12\x1b.nrc_ocr.AddLICENCEPASSPORT\x1a\x15.nrc_ocr.AddOutputNRCb\x06proto3')
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\tocr.proto\x12\x07nrc_ocr\" \n\rAddLICENCEOCR\x12\x0f\n\x07licence\x18\x01 \x01(\x0c\"&\n\x12\x41\x64\x64LICENCEPASSPORT\x12\x10\n\x08passport\x18\x01 \x01(\x0c\"\"\n\x0c\x41\x64\x64OutputNRC\x12\x12\n\noutput_nrc\x18\x01 \x01(\t\"K\n\x0e\x41\x64\x64\x44ocumentOCR\x12\x16\n\x0e\x63orrelation_id\x18\x01 \x01(\t\x12\x12\n\nclass_name\x18\x02 \x01(\t\x12\r\n\x05image\x18\x03 \x01(\x0c\"J\n\x11\x41\x64\x64OutputDocument\x12\x16\n\x0e\x63orrelation_id\x18\x01 \x01(\t\x12\x0e\n\x06output\x18\x02 \x01(\t\x12\r\n\x05\x65rror\x18\x03 \x01(\t\"N\n\x0cUploadHeader\x12\x16\n\x0e\x63orrelation_id\x18\x01 \x01(\t\x12\x12\n\nclass_name\x18\x02 \x01(\t\x12\x12\n\ntotal_size\x18\x03 \x01(\x04\"P\n\rDocumentChunk\x12\'\n\x06header\x18\x01 \x01(\x0b\x32\x15.nrc_ocr.UploadHeaderH\x00\x12\x0e\n\x04\x64\x61ta\x18\x02 \x01(\x0cH\x00\x42\x06\n\x04part2\xb4\x02\n\x0fnrc_ocr_service\x12>\n\rAddLicenceOCR\x12\x16.nrc_ocr.AddLICENCEOCR\x1a\x15.nrc_ocr.AddOutputNRC\x12H\n\x12\x41\x64\x64LicencePassport\x12\x1b.nrc_ocr.AddLICENCEPASSPORT\x1a\x15.nrc_ocr.AddOutputNRC\x12L\n\x11StreamDocumentOCR\x12\x17.nrc_ocr.AddDocumentOCR\x1a\x1a.nrc_ocr.AddOutputDocument(\x01\x30\x01\x12I\n\x11UploadDocumentOCR\x12\x16.nrc_ocr.DocumentChunk\x1a\x1a.nrc_ocr.AddOutputDocument(\x01\x62\x06proto3')
 
 _globals = globals()
 _builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, _globals)
@@ -37,6 +37,14 @@ if not _descriptor._USE_C_DESCRIPTORS:
   _globals['_ADDLICENCEPASSPORT']._serialized_end=94
   _globals['_ADDOUTPUTNRC']._serialized_start=96
   _globals['_ADDOUTPUTNRC']._serialized_end=130
-  _globals['_NRC_OCR_SERVICE']._serialized_start=133
-  _globals['_NRC_OCR_SERVICE']._serialized_end=288
+  _globals['_ADDDOCUMENTOCR']._serialized_start=132
+  _globals['_ADDDOCUMENTOCR']._serialized_end=207
+  _globals['_ADDOUTPUTDOCUMENT']._serialized_start=209
+  _globals['_ADDOUTPUTDOCUMENT']._serialized_end=283
+  _globals['_UPLOADHEADER']._serialized_start=285
+  _globals['_UPLOADHEADER']._serialized_end=363
+  _globals['_DOCUMENTCHUNK']._serialized_start=365
+  _globals['_DOCUMENTCHUNK']._serialized_end=445
+  _globals['_NRC_OCR_SERVICE']._serialized_start=448
+  _globals['_NRC_OCR_SERVICE']._serialized_end=756
 # @@protoc_insertion_point(module_scope)
@@ -44,6 +44,16 @@ class nrc_ocr_serviceStub(object):
                 request_serializer=ocr__pb2.AddLICENCEPASSPORT.SerializeToString,
                 response_deserializer=ocr__pb2.AddOutputNRC.FromString,
                 _registered_method=True)
+        self.StreamDocumentOCR = channel.stream_stream(
+                '/nrc_ocr.nrc_ocr_service/StreamDocumentOCR',
+                request_serializer=ocr__pb2.AddDocumentOCR.SerializeToString,
+                response_deserializer=ocr__pb2.AddOutputDocument.FromString,
+                _registered_method=True)
+        self.UploadDocumentOCR = channel.stream_unary(
+                '/nrc_ocr.nrc_ocr_service/UploadDocumentOCR',
+                request_serializer=ocr__pb2.DocumentChunk.SerializeToString,
+                response_deserializer=ocr__pb2.AddOutputDocument.FromString,
+                _registered_method=True)
 
 
 class nrc_ocr_serviceServicer(object):
@@ -61,6 +71,21 @@ class nrc_ocr_serviceServicer(object):
         context.set_details('Method not implemented!')
         raise NotImplementedError('Method not implemented!')
 
+    def StreamDocumentOCR(self, request_iterator, context):
+        """Pipeline many documents over one stream; responses arrive in completion
+        order and carry the request's correlation_id.
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def UploadDocumentOCR(self, request_iterator, context):
+        """Upload one large document in chunks: a header first, then the image data.
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
 
 def add_nrc_ocr_serviceServicer_to_server(servicer, server):
     rpc_method_handlers = {
@@ -74,6 +99,16 @@ def add_nrc_ocr_serviceServicer_to_server(servicer, server):
                     request_deserializer=ocr__pb2.AddLICENCEPASSPORT.FromString,
                     response_serializer=ocr__pb2.AddOutputNRC.SerializeToString,
             ),
+            'StreamDocumentOCR': grpc.stream_stream_rpc_method_handler(
+                    servicer.StreamDocumentOCR,
+                    request_deserializer=ocr__pb2.AddDocumentOCR.FromString,
+                    response_serializer=ocr__pb2.AddOutputDocument.SerializeToString,
+            ),
+            'UploadDocumentOCR': grpc.stream_unary_rpc_method_handler(
+                    servicer.UploadDocumentOCR,
+                    request_deserializer=ocr__pb2.DocumentChunk.FromString,
+                    response_serializer=ocr__pb2.AddOutputDocument.SerializeToString,
+            ),
     }
     generic_handler = grpc.method_handlers_generic_handler(
             'nrc_ocr.nrc_ocr_service', rpc_method_handlers)
@@ -138,3 +173,57 @@ class nrc_ocr_service(object):
             timeout,
             metadata,
             _registered_method=True)
+
+    @staticmethod
+    def StreamDocumentOCR(request_iterator,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.stream_stream(
+            request_iterator,
+            target,
+            '/nrc_ocr.nrc_ocr_service/StreamDocumentOCR',
+            ocr__pb2.AddDocumentOCR.SerializeToString,
+            ocr__pb2.AddOutputDocument.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def UploadDocumentOCR(request_iterator,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.stream_unary(
+            request_iterator,
+            target,
+            '/nrc_ocr.nrc_ocr_service/UploadDocumentOCR',
+            ocr__pb2.DocumentChunk.SerializeToString,
+            ocr__pb2.AddOutputDocument.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
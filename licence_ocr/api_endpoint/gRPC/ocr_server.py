@@ -1,31 +1,298 @@
-import grpc
+import asyncio
+import os
+import sys
+import threading
+import time
 from concurrent import futures
+
+import grpc
 import ocr_pb2, ocr_pb2_grpc
-from licence_ocr.api_endpoint.ocr_grpc_model import OCR_Model
+from chunked_upload import receive_upload, receive_upload_async
+
+# Share the REST service's modules (OCR pipeline, result cache, worker pool)
+# from licence_ocr/api_endpoint.
+API_ENDPOINT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if API_ENDPOINT_DIR not in sys.path:
+    sys.path.insert(0, API_ENDPOINT_DIR)
+
+from ocr_cache import cache_key, get_cache  # noqa: E402
+from ocr_metrics import (  # noqa: E402
+    record_document,
+    start_metrics_server,
+    watch_cache,
+    watch_executor,
+)
+from ocr_worker import (  # noqa: E402
+    OCR_WARMUP,
+    OCR_WARMUP_TIMEOUT,
+    OCRExecutor,
+    OCRQueueFullError,
+    run_ocr,
+    warm_up,
+)
+
+try:
+    from grpc_health.v1 import health, health_pb2, health_pb2_grpc
+except ImportError:  # optional: grpcio-health-checking
+    health = None
+
+GRPC_MODE = os.getenv("GRPC_MODE", "sync")
+GRPC_PORT = int(os.getenv("GRPC_PORT", "50051"))
+GRPC_THREADS = int(os.getenv("GRPC_THREADS", "10"))
+GRPC_MAX_MESSAGE_MB = int(os.getenv("GRPC_MAX_MESSAGE_MB", "16"))
+GRPC_STREAM_WINDOW = int(os.getenv("GRPC_STREAM_WINDOW", "8"))
+# Port for the Prometheus /metrics endpoint, next to GRPC_PORT (9100 belongs to
+# node_exporter); 0 disables it.
+GRPC_METRICS_PORT = int(os.getenv("GRPC_METRICS_PORT", "50052"))
+
+SERVICE_NAME = "nrc_ocr.nrc_ocr_service"
+SERVER_OPTIONS = [
+    ("grpc.max_receive_message_length", GRPC_MAX_MESSAGE_MB * 1024 * 1024),
+    ("grpc.max_send_message_length", GRPC_MAX_MESSAGE_MB * 1024 * 1024),
+]
+
+
+def error_status(error):
+    """Map OCR pipeline errors onto gRPC status codes."""
+    if isinstance(error, ValueError):
+        return grpc.StatusCode.INVALID_ARGUMENT
+    if isinstance(error, OCRQueueFullError):
+        return grpc.StatusCode.RESOURCE_EXHAUSTED
+    if isinstance(error, TimeoutError):
+        return grpc.StatusCode.DEADLINE_EXCEEDED
+    return grpc.StatusCode.INTERNAL
+
+
+def output(result) -> str:
+    """The RPCs answer with the extracted text only."""
+    return result["data"] or ""
+
+
+def ocr_document(image_bytes, class_name):
+    started = time.perf_counter()
+    try:
+        result = get_cache().get_or_compute(
+            cache_key(image_bytes, class_name), lambda: run_ocr(image_bytes, class_name)
+        )
+    except Exception as e:
+        record_document("grpc", class_name, started, error=e)
+        raise
+    record_document("grpc", class_name, started, result)
+    return result
 
 
 class NrcOcrService(ocr_pb2_grpc.nrc_ocr_serviceServicer):
-    def AddLicenceOCR(self, request, context):
-        ocr = OCR_Model(image_bytes=request.licence)
-        gray = ocr.preprocess_image_for_licence_ocr()
-        nrc = ocr.licence_ocr_model(gray)
+    """Thread-pool servicer; OCR runs on the RPC thread."""
+
+    def _unary(self, image_bytes, class_name, context):
+        try:
+            return output(ocr_document(image_bytes, class_name))
+        except Exception as e:
+            context.abort(error_status(e), str(e))
 
-        return ocr_pb2.AddOutputNRC(output_nrc=nrc or "")
+    def AddLicenceOCR(self, request, context):
+        nrc = self._unary(request.licence, "licence", context)
+        return ocr_pb2.AddOutputNRC(output_nrc=nrc)
 
     def AddLicencePassport(self, request, context):
-        ocr = OCR_Model(image_bytes=request.passport)
-        gray = ocr.preprocess_image_for_passport_ocr()
-        passport_no = ocr.passport_ocr_model(gray)
-        return ocr_pb2.AddOutputNRC(output_nrc=passport_no or "")
+        passport_no = self._unary(request.passport, "passport", context)
+        return ocr_pb2.AddOutputNRC(output_nrc=passport_no)
+
+    def StreamDocumentOCR(self, request_iterator, context):
+        for request in request_iterator:
+            response = ocr_pb2.AddOutputDocument(correlation_id=request.correlation_id)
+            try:
+                response.output = output(ocr_document(request.image, request.class_name))
+            except Exception as e:
+                response.error = str(e)
+            yield response
+
+    def UploadDocumentOCR(self, request_iterator, context):
+        try:
+            header, image = receive_upload(request_iterator)
+            text = output(ocr_document(image, header.class_name))
+        except Exception as e:
+            context.abort(error_status(e), str(e))
+        return ocr_pb2.AddOutputDocument(correlation_id=header.correlation_id, output=text)
+
+
+class AsyncNrcOcrService(ocr_pb2_grpc.nrc_ocr_serviceServicer):
+    """grpc.aio servicer; OCR is offloaded to a bounded process pool."""
+
+    def __init__(self, executor: OCRExecutor):
+        self.executor = executor
+
+    async def ocr_document(self, image_bytes, class_name, timeout=None):
+        started = time.perf_counter()
+        try:
+            result = await get_cache().get_or_compute_async(
+                cache_key(image_bytes, class_name),
+                lambda: self.executor.run(run_ocr, image_bytes, class_name, timeout=timeout),
+            )
+        except Exception as e:
+            record_document("grpc", class_name, started, error=e)
+            raise
+        record_document("grpc", class_name, started, result)
+        return result
+
+    async def _unary(self, image_bytes, class_name, context):
+        try:
+            result = await self.ocr_document(
+                image_bytes, class_name, timeout=context.time_remaining()
+            )
+            return output(result)
+        except Exception as e:
+            await context.abort(error_status(e), str(e))
+
+    async def AddLicenceOCR(self, request, context):
+        nrc = await self._unary(request.licence, "licence", context)
+        return ocr_pb2.AddOutputNRC(output_nrc=nrc)
+
+    async def AddLicencePassport(self, request, context):
+        passport_no = await self._unary(request.passport, "passport", context)
+        return ocr_pb2.AddOutputNRC(output_nrc=passport_no)
+
+    async def StreamDocumentOCR(self, request_iterator, context):
+        """Process up to GRPC_STREAM_WINDOW documents of one stream at a time.
+
+        Requests are read while earlier ones are still running, and responses
+        are written in completion order.
+        """
+        responses = asyncio.Queue()
+        window = asyncio.Semaphore(GRPC_STREAM_WINDOW)
+
+        async def process(request):
+            response = ocr_pb2.AddOutputDocument(correlation_id=request.correlation_id)
+            try:
+                result = await self.ocr_document(request.image, request.class_name)
+                response.output = output(result)
+            except Exception as e:
+                response.error = str(e) or type(e).__name__
+            finally:
+                window.release()
+            await responses.put(response)
+
+        async def read():
+            tasks = set()
+            try:
+                async for request in request_iterator:
+                    await window.acquire()
+                    task = asyncio.create_task(process(request))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+                await asyncio.gather(*tasks)
+            finally:
+                await responses.put(None)
+
+        reader = asyncio.create_task(read())
+        try:
+            while (response := await responses.get()) is not None:
+                yield response
+            await reader
+        finally:
+            reader.cancel()
+
+    async def UploadDocumentOCR(self, request_iterator, context):
+        try:
+            header, image = await receive_upload_async(request_iterator)
+            result = await self.ocr_document(
+                image, header.class_name, timeout=context.time_remaining()
+            )
+        except Exception as e:
+            await context.abort(error_status(e), str(e))
+        return ocr_pb2.AddOutputDocument(
+            correlation_id=header.correlation_id, output=output(result)
+        )
+
+
+def start_metrics():
+    watch_cache(get_cache())
+    if GRPC_METRICS_PORT:
+        start_metrics_server(GRPC_METRICS_PORT)
+
+
+def warm_up_failed(error: Exception):
+    """Report a failed warm-up; health stays NOT_SERVING."""
+    print(f"OCR warm-up failed: {type(error).__name__}: {error}", file=sys.stderr, flush=True)
+
+
+def warm_up_threads(pool, threads: int, fn=run_ocr, timeout: float = OCR_WARMUP_TIMEOUT):
+    """Warm every RPC thread; tesserocr keeps one engine per thread.
+
+    Each job waits at a barrier until all are warm, so no thread runs two
+    of them while another stays cold.
+    """
+    barrier = threading.Barrier(threads)
+
+    def warm():
+        try:
+            return warm_up(fn)
+        finally:
+            try:
+                barrier.wait(timeout)
+            except threading.BrokenBarrierError:
+                pass
+
+    return [future.result() for future in [pool.submit(warm) for _ in range(threads)]]
 
 
 def serve():
-    server = grpc.server(futures.ThreadPoolExecutor(max_workers=10))
+    start_metrics()
+    pool = futures.ThreadPoolExecutor(max_workers=GRPC_THREADS)
+    server = grpc.server(pool, options=SERVER_OPTIONS)
     ocr_pb2_grpc.add_nrc_ocr_serviceServicer_to_server(NrcOcrService(), server)
-    server.add_insecure_port("[::]:50051")
+    if health is not None:
+        health_servicer = health.HealthServicer()
+        health_pb2_grpc.add_HealthServicer_to_server(health_servicer, server)
+        for service in ("", SERVICE_NAME):
+            health_servicer.set(service, health_pb2.HealthCheckResponse.NOT_SERVING)
+    server.add_insecure_port(f"[::]:{GRPC_PORT}")
     server.start()
+    try:
+        if OCR_WARMUP:
+            warm_up_threads(pool, GRPC_THREADS)
+    except Exception as e:
+        warm_up_failed(e)
+    else:
+        if health is not None:
+            for service in ("", SERVICE_NAME):
+                health_servicer.set(service, health_pb2.HealthCheckResponse.SERVING)
     server.wait_for_termination()
 
 
+async def serve_async():
+    executor = OCRExecutor()
+    start_metrics()
+    watch_executor(executor)
+    server = grpc.aio.server(options=SERVER_OPTIONS)
+    ocr_pb2_grpc.add_nrc_ocr_serviceServicer_to_server(
+        AsyncNrcOcrService(executor), server
+    )
+    if health is not None:
+        health_servicer = health.aio.HealthServicer()
+        health_pb2_grpc.add_HealthServicer_to_server(health_servicer, server)
+        for service in ("", SERVICE_NAME):
+            await health_servicer.set(service, health_pb2.HealthCheckResponse.NOT_SERVING)
+    server.add_insecure_port(f"[::]:{GRPC_PORT}")
+    await server.start()
+    try:
+        if OCR_WARMUP:
+            await executor.warm_up_async()
+    except Exception as e:
+        warm_up_failed(e)
+    else:
+        if health is not None:
+            for service in ("", SERVICE_NAME):
+                await health_servicer.set(service, health_pb2.HealthCheckResponse.SERVING)
+    try:
+        await server.wait_for_termination()
+    finally:
+        await server.stop(grace=5)
+        executor.shutdown()
+
+
 if __name__ == "__main__":
-    serve()
+    if GRPC_MODE == "aio":
+        asyncio.run(serve_async())
+    else:
+        serve()
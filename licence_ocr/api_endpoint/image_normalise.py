@@ -0,0 +1,130 @@
+"""Decode uploads straight to a normalised grayscale image for OCR."""
+
+import os
+import struct
+
+import cv2
+import numpy as np
+from ocr_metrics import STEP_SECONDS
+
+# Document pages have a fixed layout, so normalising the page width also
+# normalises the text height that tesseract sees.
+OCR_TARGET_WIDTH = int(os.getenv("OCR_TARGET_WIDTH", "1600"))
+
+REDUCED_GRAYSCALE = {
+    8: cv2.IMREAD_REDUCED_GRAYSCALE_8,
+    4: cv2.IMREAD_REDUCED_GRAYSCALE_4,
+    2: cv2.IMREAD_REDUCED_GRAYSCALE_2,
+    1: cv2.IMREAD_GRAYSCALE,
+}
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+# JPEG start-of-frame markers; C4 (DHT), C8 (JPG) and CC (DAC) are not frames.
+JPEG_SOF_MARKERS = set(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+JPEG_APP1 = 0xE1
+EXIF_ORIENTATION_TAG = 0x0112
+# EXIF orientations 5-8 are stored sideways; OpenCV turns them upright on decode.
+EXIF_TRANSPOSED = {5, 6, 7, 8}
+
+
+def exif_orientation(segment: bytes):
+    """Orientation (1-8) from a JPEG APP1 segment's payload, or None."""
+    if not segment.startswith(b"Exif\0\0") or len(segment) < 14:
+        return None
+    tiff = segment[6:]
+    order = {b"II": "<", b"MM": ">"}.get(tiff[:2])
+    if order is None:
+        return None
+    (ifd,) = struct.unpack(order + "I", tiff[4:8])
+    if ifd + 2 > len(tiff):
+        return None
+    (count,) = struct.unpack(order + "H", tiff[ifd : ifd + 2])
+    for entry in range(ifd + 2, min(ifd + 2 + 12 * count, len(tiff) - 11), 12):
+        tag, _, _, value = struct.unpack(order + "HHIH", tiff[entry : entry + 10])
+        if tag == EXIF_ORIENTATION_TAG:
+            return value
+    return None
+
+
+def read_image_size(image_bytes: bytes):
+    """Return (width, height) from a JPEG or PNG header without decoding.
+
+    JPEG sizes are as decoded, after the EXIF orientation is applied, so a
+    portrait phone photo stored sideways reports its upright width.
+    """
+    if image_bytes.startswith(PNG_SIGNATURE) and len(image_bytes) >= 24:
+        return struct.unpack(">II", image_bytes[16:24])
+
+    if not image_bytes.startswith(b"\xff\xd8"):
+        return None
+    offset = 2
+    orientation = None
+    while offset + 9 < len(image_bytes):
+        if image_bytes[offset] != 0xFF:
+            return None
+        marker = image_bytes[offset + 1]
+        if marker == 0xFF:  # fill byte
+            offset += 1
+            continue
+        (length,) = struct.unpack(">H", image_bytes[offset + 2 : offset + 4])
+        if marker == JPEG_APP1 and orientation is None:
+            orientation = exif_orientation(image_bytes[offset + 4 : offset + 2 + length])
+        if marker in JPEG_SOF_MARKERS:
+            height, width = struct.unpack(">HH", image_bytes[offset + 5 : offset + 9])
+            return (height, width) if orientation in EXIF_TRANSPOSED else (width, height)
+        offset += 2 + length
+    return None
+
+
+def reduction_factor(width: int, target_width: int = OCR_TARGET_WIDTH) -> int:
+    """Largest decoder reduction that still leaves at least `target_width` pixels."""
+    for factor in (8, 4, 2):
+        if width // factor >= target_width:
+            return factor
+    return 1
+
+
+def resize_to_width(gray, target_width: int = OCR_TARGET_WIDTH):
+    """Shrink a grayscale page to the target width, keeping the aspect ratio.
+
+    Narrower pages are left as they are: upscaling adds no detail for
+    tesseract, only pixels to process.
+    """
+    height, width = gray.shape[:2]
+    if width <= target_width:
+        return gray
+    scale = target_width / width
+    return cv2.resize(
+        gray, (target_width, max(1, int(round(height * scale)))), interpolation=cv2.INTER_AREA
+    )
+
+
+def decode_gray(image_bytes: bytes, target_width: int = OCR_TARGET_WIDTH):
+    """Decode to grayscale at reduced scale, then shrink to the target width.
+
+    The JPEG decoder can skip most of the work for 1/2, 1/4 or 1/8 scale, so
+    a 4000px phone photo never exists as a full-size BGR array.
+    """
+    with STEP_SECONDS.time(step="decode"):
+        size = read_image_size(image_bytes)
+        factor = reduction_factor(size[0], target_width) if size else 1
+        nparr = np.frombuffer(image_bytes, np.uint8)
+        gray = cv2.imdecode(nparr, REDUCED_GRAYSCALE[factor])
+        if gray is None:
+            raise ValueError("Image could not be decoded.")
+        return resize_to_width(gray, target_width)
+
+
+def brightness_contrast_lut(contrast: float, brightness: float):
+    """Precompute `clip(pixel * contrast + brightness)` for every 8-bit value."""
+    values = np.arange(256, dtype=np.float32) * contrast + brightness
+    return np.clip(values, 0, 255).astype(np.uint8)
+
+
+# Licence preprocessing: contrast 2, brightness +10.
+LICENCE_LUT = brightness_contrast_lut(2, 10)
+
+
+def apply_lut(gray, lut=LICENCE_LUT):
+    """Apply a precomputed brightness/contrast table in place of a blend."""
+    return cv2.LUT(gray, lut)
@@ -1,88 +1,260 @@
 """API endpoint for OCR processing of licences and passports."""
 
+import asyncio
 import os
-import shutil
-import uuid
-from contextlib import asynccontextmanager
-from typing import Literal
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import List, Literal
 
-import sentry_sdk
-import uvicorn
 from dotenv import load_dotenv
 from fastapi import FastAPI, File, Form, HTTPException, UploadFile
-from ocr_model import OCR_Model
-from sentry_sdk.integrations.fastapi import FastApiIntegration
-from sentry_sdk.integrations.starlette import StarletteIntegration
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from ocr_batch import iter_archive, spool, stream_batch
+from ocr_cache import cache_key, get_cache
+from ocr_jobs import JobStore, OCRJobRunner, validate_callback_url
+from ocr_metrics import REGISTRY, record_document, watch_cache, watch_executor, watch_jobs
+from ocr_worker import OCR_RETRY_AFTER, OCR_WARMUP, OCRExecutor, OCRQueueFullError, run_ocr
 
 load_dotenv()
 
-ocr_model = {}
+SENTRY_DSN = os.getenv("SENTRY_DSN")
+
+ocr_executor = {}
+ocr_jobs = {}
+ocr_warmup = {"status": "starting"}
+sentry = {}
+
+
+def init_sentry():
+    """Import and start Sentry only when a DSN is configured."""
+    if not SENTRY_DSN:
+        return
+    import sentry_sdk
+    from sentry_sdk.integrations.fastapi import FastApiIntegration
+    from sentry_sdk.integrations.starlette import StarletteIntegration
+
+    sentry_sdk.init(
+        dsn=SENTRY_DSN,
+        integrations=[
+            StarletteIntegration(transaction_style="endpoint"),
+            FastApiIntegration(transaction_style="endpoint"),
+        ],
+        # Full tracing costs a transaction and spans per request; lower this to sample it.
+        traces_sample_rate=float(os.getenv("SENTRY_TRACES_SAMPLE_RATE", "1.0")),
+        send_default_pii=True,
+    )
+    sentry["sdk"] = sentry_sdk
+
+
+@contextmanager
+def trace_ocr(class_name: str):
+    """Sentry transaction and span around one OCR request, when Sentry is on."""
+    sentry_sdk = sentry.get("sdk")
+    if sentry_sdk is None:
+        yield
+        return
+    with sentry_sdk.start_transaction(op="task", name=f"OCR-{class_name}"):
+        with sentry_sdk.start_span(op="model", description=f"OCR {class_name}"):
+            yield
+
+
+def capture_exception(error: Exception):
+    if "sdk" in sentry:
+        sentry["sdk"].capture_exception(error)  # send detailed error to Sentry
+
+
+async def warm_up(executor: OCRExecutor):
+    """Run a synthetic document through every worker, then report ready."""
+    ocr_warmup.update(status="warming_up")
+    started = time.perf_counter()
+    try:
+        workers = await executor.warm_up_async()
+    except Exception as e:
+        capture_exception(e)
+        ocr_warmup.update(status="failed", error=f"{type(e).__name__}: {e}")
+        return
+    ocr_warmup.update(
+        status="ready",
+        seconds=round(time.perf_counter() - started, 3),
+        workers={str(pid): timings for pid, timings in workers.items()},
+    )
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    """Initialize the OCR model on startup and clean up on shutdown."""
-    ocr_model_worker = OCR_Model()
-    ocr_model["OCR_Model"] = ocr_model_worker
+    """Start the OCR worker pool and job runner on startup, stop them on shutdown.
+
+    Warm-up runs in the background: the service answers `/healthz` at once
+    and `/readyz` once every worker is warm.
+    """
+    executor = ocr_executor["OCRExecutor"] = OCRExecutor()
+    runner = ocr_jobs["OCRJobRunner"] = OCRJobRunner(JobStore(), executor, cache=get_cache())
+    runner.start()
+    watch_executor(executor)
+    watch_cache(get_cache())
+    watch_jobs(runner)
+    if OCR_WARMUP:
+        warmup = asyncio.create_task(warm_up(executor))
+    else:
+        warmup = None
+        ocr_warmup.update(status="ready")
     yield
-    ocr_model.clear()
+    ocr_warmup.clear()
+    ocr_warmup.update(status="stopping")
+    if warmup is not None:
+        warmup.cancel()
+    await ocr_jobs.pop("OCRJobRunner").stop()
+    ocr_executor.pop("OCRExecutor").shutdown()
 
 
-app = FastAPI(lifespan=lifespan)
+init_sentry()
 
-sentry_sdk.init(
-    dsn=os.getenv("SENTRY_DSN"),
-    integrations=[
-        StarletteIntegration(transaction_style="endpoint"),
-        FastApiIntegration(transaction_style="endpoint"),
-    ],
-    traces_sample_rate=1.0,
-    send_default_pii=True,
-)
+app = FastAPI(lifespan=lifespan)
 
 
 @app.post("/ocr")
-def ocr_endpoint(
-    file: UploadFile = File(...), class_name: Literal["passport", "licence"] = Form(...)
+async def ocr_endpoint(
+    file: UploadFile = File(...), class_name: Literal["passport", "licence", "auto"] = Form(...)
 ):
     """Endpoint to handle OCR requests."""
+    started = time.perf_counter()
     try:
-        temp_file = f"temp_{uuid.uuid4()}.jpg"
-        with open(temp_file, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-
-        ocr = ocr_model["OCR_Model"]
-        ocr.image_path = temp_file
-
-        with sentry_sdk.start_transaction(op="task", name=f"OCR-{class_name}"):
-            if class_name == "passport":
-                with sentry_sdk.start_span(
-                    op="preprocess", description="Preprocess Passport"
-                ):
-                    gray = ocr.preprocess_image_for_passport_ocr()
-
-                with sentry_sdk.start_span(
-                    op="model", description="Passport OCR Model"
-                ):
-                    result = ocr.passport_ocr_model(gray)
-                    os.remove(temp_file)
-
-            elif class_name == "licence":
-                with sentry_sdk.start_span(
-                    op="preprocess", description="Preprocess Licence"
-                ):
-                    gray = ocr.preprocess_image_for_licence_ocr()
-
-                with sentry_sdk.start_span(op="model", description="Licence OCR Model"):
-                    result = ocr.licence_ocr_model(gray)
-                    os.remove(temp_file)
-
-        return {"data": result}
+        image_bytes = await file.read()
+        executor = ocr_executor["OCRExecutor"]
 
+        with trace_ocr(class_name):
+            try:
+                result = await get_cache().get_or_compute_async(
+                    cache_key(image_bytes, class_name),
+                    lambda: executor.run(run_ocr, image_bytes, class_name),
+                )
+            except Exception as e:
+                record_document("rest", class_name, started, error=e)
+                raise
+
+        record_document("rest", class_name, started, result)
+        return result
+
+    except OCRQueueFullError as e:
+        raise HTTPException(
+            status_code=429,
+            detail=str(e),
+            headers={"Retry-After": str(OCR_RETRY_AFTER)},
+        )
+    except TimeoutError:
+        raise HTTPException(status_code=504, detail="OCR processing timed out")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        sentry_sdk.capture_exception(e)  # send detailed error to Sentry
+        capture_exception(e)
         raise HTTPException(status_code=500, detail="OCR processing failed")
 
 
+@app.post("/ocr/batch")
+async def ocr_batch_endpoint(
+    files: List[UploadFile] = File(None),
+    archive: UploadFile = File(None),
+    class_name: List[Literal["passport", "licence", "auto"]] = Form(...),
+):
+    """Endpoint to OCR many documents, streaming NDJSON results as they finish.
+
+    Send either several `files` with one `class_name` each (or a single
+    `class_name` for all), or a zip/tar `archive`. Archive members under a
+    `passport/` or `licence/` folder use that class, others use `class_name`.
+    """
+    if not files and archive is None:
+        raise HTTPException(status_code=400, detail="No files or archive provided")
+    if files and len(class_name) not in (1, len(files)):
+        raise HTTPException(
+            status_code=400, detail="Provide one class_name, or one per file"
+        )
+
+    # Copy the uploads first: FastAPI closes them before the response streams
+    uploads = [await asyncio.to_thread(spool, upload.file) for upload in files or ()]
+    spooled = list(uploads)
+    archive_items = ()
+    if archive is not None:
+        spooled.append(await asyncio.to_thread(spool, archive.file))
+        try:
+            archive_items = iter_archive(spooled[-1], archive.filename, class_name[0])
+        except ValueError as e:
+            for fileobj in spooled:
+                fileobj.close()
+            raise HTTPException(status_code=400, detail=str(e))
+
+    def items():
+        for index, (upload, fileobj) in enumerate(zip(files or (), uploads)):
+            item_class = class_name[index if len(class_name) > 1 else 0]
+            yield upload.filename, item_class, fileobj.read()
+        yield from archive_items
+
+    async def body():
+        try:
+            async for line in stream_batch(executor, items(), cache=get_cache()):
+                yield line
+        finally:
+            for fileobj in spooled:
+                fileobj.close()
+
+    executor = ocr_executor["OCRExecutor"]
+    return StreamingResponse(body(), media_type="application/x-ndjson")
+
+
+@app.post("/ocr/jobs", status_code=202)
+async def create_ocr_job(
+    file: UploadFile = File(...),
+    class_name: Literal["passport", "licence", "auto"] = Form(...),
+    callback_url: str = Form(None),
+):
+    """Queue a document for OCR and return its job id without waiting.
+
+    Poll `GET /ocr/jobs/{id}`, or pass `callback_url` to have the finished
+    job POSTed to it.
+    """
+    if callback_url:
+        try:
+            # Resolving the host is blocking DNS
+            await asyncio.to_thread(validate_callback_url, callback_url)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    image_bytes = await file.read()
+    if not image_bytes:
+        raise HTTPException(status_code=400, detail="Empty file")
+
+    runner = ocr_jobs["OCRJobRunner"]
+    job_id = await asyncio.to_thread(runner.store.enqueue, image_bytes, class_name, callback_url)
+    runner.notify()
+    return {"id": job_id, "status": "queued"}
+
+
+@app.get("/ocr/jobs/{job_id}")
+async def get_ocr_job(job_id: str):
+    """Return a job's status and, once done, its result."""
+    job = await asyncio.to_thread(ocr_jobs["OCRJobRunner"].store.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus metrics for this process and its OCR workers."""
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/healthz")
+async def healthz():
+    """Liveness probe: the process is up and its event loop is responsive."""
+    return {"status": "ok"}
+
+
+@app.get("/readyz")
+async def readyz():
+    """Readiness probe: 200 once the OCR workers are warm, otherwise 503."""
+    return JSONResponse(ocr_warmup, status_code=200 if ocr_warmup["status"] == "ready" else 503)
+
+
 if __name__ == "__main__":
+    import uvicorn
+
     uvicorn.run(app, host="0.0.0.0", port=5001)
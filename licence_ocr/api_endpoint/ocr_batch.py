@@ -0,0 +1,197 @@
+"""Batch OCR: fan documents out over the worker pool and stream NDJSON results."""
+
+import asyncio
+import json
+import os
+import shutil
+import tarfile
+import tempfile
+import time
+import zipfile
+
+from ocr_cache import MISSING, OCRCache, cache_key
+from ocr_metrics import record_document
+from ocr_worker import OCRExecutor, OCRQueueFullError, run_ocr
+
+CLASS_NAMES = ("passport", "licence")
+OCR_BATCH_WINDOW = int(os.getenv("OCR_BATCH_WINDOW", "0"))
+# Uncompressed size limits for archive members, so a small archive cannot
+# inflate into gigabytes.
+OCR_BATCH_MAX_IMAGE_MB = int(os.getenv("OCR_BATCH_MAX_IMAGE_MB", "32"))
+OCR_BATCH_MAX_TOTAL_MB = int(os.getenv("OCR_BATCH_MAX_TOTAL_MB", "512"))
+SPOOL_MEMORY = 1024 * 1024
+
+
+def spool(fileobj):
+    """Copy an upload into a temporary file the caller owns, rewound for reading.
+
+    Form uploads are closed once the endpoint returns, before a streaming
+    response has read them. Up to SPOOL_MEMORY bytes stay in memory, the rest
+    goes to disk.
+    """
+    spooled = tempfile.SpooledTemporaryFile(max_size=SPOOL_MEMORY)
+    fileobj.seek(0)
+    shutil.copyfileobj(fileobj, spooled)
+    spooled.seek(0)
+    return spooled
+
+
+def _class_from_path(name: str, default: str):
+    """Use a leading `passport/` or `licence/` folder as the item's class."""
+    head = name.replace("\\", "/").split("/", 1)[0].lower()
+    return head if head in CLASS_NAMES else default
+
+
+class _SizeLimit:
+    """Checks declared member sizes against the per-image and per-batch caps."""
+
+    def __init__(self, max_image: int, max_total: int):
+        self.max_image = max_image
+        self.max_total = max_total
+        self.total = 0
+
+    def check(self, name: str, size: int):
+        if size > self.max_image:
+            raise ValueError(f"{name} is {size} bytes uncompressed, over the {self.max_image} byte limit.")
+        self.total += size
+        if self.total > self.max_total:
+            raise ValueError(f"Archive is over the {self.max_total} byte uncompressed limit at {name}.")
+
+
+def iter_archive(
+    fileobj,
+    filename: str,
+    default_class: str,
+    max_image: int = OCR_BATCH_MAX_IMAGE_MB * 1024 * 1024,
+    max_total: int = OCR_BATCH_MAX_TOTAL_MB * 1024 * 1024,
+):
+    """Return an iterator of (name, class_name, bytes) for a zip or tar archive.
+
+    The archive format is checked eagerly so a bad upload fails before the
+    response starts streaming. Members are then read one at a time, so the
+    archive is never fully inflated in memory.
+
+    Uncompressed sizes are checked against `max_image` per member and
+    `max_total` per archive before decompressing: for a zip up front, for a
+    tar member by member, raising ValueError from the iterator.
+    """
+    limit = _SizeLimit(max_image, max_total)
+    if zipfile.is_zipfile(fileobj):
+        fileobj.seek(0)
+        archive = zipfile.ZipFile(fileobj)
+        members = [info for info in archive.infolist() if not info.is_dir()]
+        try:
+            for info in members:
+                limit.check(info.filename, info.file_size)
+        except ValueError:
+            archive.close()
+            raise
+        return _iter_zip(archive, members, default_class)
+
+    fileobj.seek(0)
+    try:
+        archive = tarfile.open(fileobj=fileobj, mode="r|*")
+    except tarfile.TarError:
+        raise ValueError(f"{filename} is not a zip or tar archive.")
+    return _iter_tar(archive, limit, default_class)
+
+
+def _iter_zip(archive: zipfile.ZipFile, members, default_class: str):
+    with archive:
+        for info in members:
+            class_name = _class_from_path(info.filename, default_class)
+            try:
+                # Stops at the checked file_size; a member that inflates past it fails its CRC
+                image_bytes = archive.read(info)
+            except zipfile.BadZipFile as e:
+                raise ValueError(f"{info.filename}: {e}")
+            yield info.filename, class_name, image_bytes
+
+
+def _iter_tar(archive: tarfile.TarFile, limit: _SizeLimit, default_class: str):
+    with archive:
+        for info in archive:
+            if not info.isfile():
+                continue
+            limit.check(info.name, info.size)
+            class_name = _class_from_path(info.name, default_class)
+            yield info.name, class_name, archive.extractfile(info).read()
+
+
+async def stream_batch(
+    executor: OCRExecutor, items, window: int = None, cache: OCRCache = None
+):
+    """Run items through the executor and yield one NDJSON line per result.
+
+    At most `window` items are in flight at once, so memory stays bounded by
+    the window rather than the batch size. Lines are emitted in completion
+    order and carry the item's `index` for correlation. Cached results are
+    emitted without touching the pool.
+    """
+    window = window or OCR_BATCH_WINDOW or executor.workers
+    pending = {}
+    items = iter(items)
+
+    async def drain():
+        done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            index, name, class_name, key, started = pending.pop(task)
+            line = {"index": index, "filename": name, "class_name": class_name}
+            try:
+                result = task.result()
+                line.update(result)
+                if cache is not None:
+                    await cache.set_async(key, result)
+            except TimeoutError:
+                line["error"] = "OCR processing timed out"
+            except ValueError as e:
+                line["error"] = str(e)
+            except Exception:
+                line["error"] = "OCR processing failed"
+            record_document("batch", class_name, started, line, line.get("error"))
+            yield json.dumps(line) + "\n"
+
+    index = -1
+    while True:
+        # Reading an upload or inflating an archive member is blocking I/O
+        try:
+            item = await asyncio.to_thread(next, items, None)
+        except ValueError as e:
+            # An archive member over the size limits, or corrupt, ends the batch
+            yield json.dumps({"index": index + 1, "error": str(e)}) + "\n"
+            break
+        if item is None:
+            break
+        index += 1
+        name, class_name, image_bytes = item
+        started = time.perf_counter()
+        key = cache_key(image_bytes, class_name)
+        cached = await cache.get_async(key) if cache is not None else MISSING
+        if cached is not MISSING:
+            line = {"index": index, "filename": name, "class_name": class_name}
+            line.update(cached)
+            record_document("batch", class_name, started, cached)
+            yield json.dumps(line) + "\n"
+            continue
+
+        while True:
+            if len(pending) < window:
+                try:
+                    future = executor.submit(run_ocr, image_bytes, class_name)
+                    break
+                except OCRQueueFullError:
+                    if not pending:
+                        # Other requests hold every slot; wait for one to free up.
+                        await asyncio.sleep(0.05)
+                        continue
+            async for line in drain():
+                yield line
+
+        task = asyncio.ensure_future(
+            asyncio.wait_for(asyncio.wrap_future(future), executor.timeout)
+        )
+        pending[task] = (index, name, class_name, key, started)
+
+    while pending:
+        async for line in drain():
+            yield line
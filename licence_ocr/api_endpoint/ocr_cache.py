@@ -0,0 +1,282 @@
+"""Content-addressed OCR result cache shared by the REST and gRPC services."""
+
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+OCR_CACHE_BACKEND = os.getenv("OCR_CACHE_BACKEND", "memory")
+OCR_CACHE_TTL = float(os.getenv("OCR_CACHE_TTL", "600"))
+OCR_CACHE_MAX_ENTRIES = int(os.getenv("OCR_CACHE_MAX_ENTRIES", "10000"))
+OCR_CACHE_MAX_BYTES = int(os.getenv("OCR_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+OCR_CACHE_PATH = os.getenv("OCR_CACHE_PATH", "ocr_cache.sqlite3")
+
+# Bump when a pipeline's result shape changes, so disk caches drop old entries
+CACHE_SCHEMA = 2
+
+MISSING = object()
+
+
+def cache_key(image_bytes: bytes, doc_type: str) -> str:
+    """Key a result by the document type and a hash of the image.
+
+    REST and gRPC run the same pipeline, so a retry through either interface
+    hits the other's entry.
+    """
+    digest = hashlib.sha256(image_bytes).hexdigest()
+    return f"v{CACHE_SCHEMA}:{doc_type}:{digest}"
+
+
+class MemoryCacheBackend:
+    """In-process LRU with TTL expiry, an entry cap and a memory cap."""
+
+    blocking = False
+
+    def __init__(
+        self,
+        ttl: float = OCR_CACHE_TTL,
+        max_entries: int = OCR_CACHE_MAX_ENTRIES,
+        max_bytes: int = OCR_CACHE_MAX_BYTES,
+    ):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        """Return the cached value, or MISSING if absent or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return MISSING
+            value, expires, size = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                self.size -= size
+                return MISSING
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value):
+        """Store a value, evicting least recently used entries over the caps."""
+        size = len(key) + len(json.dumps(value))
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.size -= old[2]
+            self._entries[key] = (value, time.monotonic() + self.ttl, size)
+            self.size += size
+            while self._entries and (
+                len(self._entries) > self.max_entries or self.size > self.max_bytes
+            ):
+                _, (_, _, evicted_size) = self._entries.popitem(last=False)
+                self.size -= evicted_size
+
+
+class DiskCacheBackend:
+    """SQLite-backed LRU with TTL expiry, shareable by several worker processes."""
+
+    # Lookups wait on SQLite I/O and locks, so async callers use a thread
+    blocking = True
+
+    def __init__(
+        self,
+        path: str = OCR_CACHE_PATH,
+        ttl: float = OCR_CACHE_TTL,
+        max_entries: int = OCR_CACHE_MAX_ENTRIES,
+    ):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS ocr_cache ("
+                "key TEXT PRIMARY KEY, value TEXT, expires REAL, accessed REAL)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS ocr_cache_accessed ON ocr_cache (accessed)"
+            )
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str):
+        """Return the cached value, or MISSING if absent or expired."""
+        conn = self._connect()
+        now = time.time()
+        row = conn.execute(
+            "SELECT value FROM ocr_cache WHERE key = ? AND expires >= ?", (key, now)
+        ).fetchone()
+        if row is None:
+            return MISSING
+        conn.execute("UPDATE ocr_cache SET accessed = ? WHERE key = ?", (now, key))
+        return json.loads(row[0])
+
+    def set(self, key: str, value):
+        """Store a value, then drop expired and least recently used rows."""
+        conn = self._connect()
+        now = time.time()
+        conn.execute(
+            "INSERT OR REPLACE INTO ocr_cache VALUES (?, ?, ?, ?)",
+            (key, json.dumps(value), now + self.ttl, now),
+        )
+        conn.execute("DELETE FROM ocr_cache WHERE expires < ?", (now,))
+        conn.execute(
+            "DELETE FROM ocr_cache WHERE key IN (SELECT key FROM ocr_cache "
+            "ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+
+
+class NullCacheBackend:
+    """Backend that stores nothing, used when caching is disabled."""
+
+    blocking = False
+
+    def get(self, key: str):
+        """Always miss."""
+        return MISSING
+
+    def set(self, key: str, value):
+        """Discard the value."""
+
+
+class OCRCache:
+    """Result cache with hit/miss counters and single-flight deduplication.
+
+    Concurrent lookups for the same key share one computation instead of
+    each running OCR on an identical image.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._inflight = {}
+        self._inflight_async = {}
+
+    def get(self, key: str):
+        """Return the cached value or MISSING, updating the counters."""
+        value = self.backend.get(key)
+        with self._lock:
+            if value is MISSING:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def set(self, key: str, value):
+        """Store a computed result."""
+        self.backend.set(key, value)
+
+    def get_or_compute(self, key: str, compute):
+        """Return the cached value or call `compute()` once for all waiters."""
+        value = self.get(key)
+        if value is not MISSING:
+            return value
+        with self._lock:
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = {"done": threading.Event()}
+        if not leader:
+            flight["done"].wait()
+            if "error" in flight:
+                raise flight["error"]
+            return flight["value"]
+        try:
+            flight["value"] = compute()
+            self.set(key, flight["value"])
+            return flight["value"]
+        except Exception as e:
+            flight["error"] = e
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+            flight["done"].set()
+
+    async def get_async(self, key: str):
+        """`get` for event-loop callers; blocking backends run in a thread."""
+        if self.backend.blocking:
+            return await asyncio.to_thread(self.get, key)
+        return self.get(key)
+
+    async def set_async(self, key: str, value):
+        """`set` for event-loop callers; blocking backends run in a thread."""
+        if self.backend.blocking:
+            await asyncio.to_thread(self.set, key, value)
+        else:
+            self.set(key, value)
+
+    async def get_or_compute_async(self, key: str, compute):
+        """Async variant of `get_or_compute`; `compute()` returns an awaitable.
+
+        The computation runs as its own task and every caller awaits it
+        shielded, so cancelling one caller (the first included) leaves the
+        others waiting on a live result instead of a CancelledError.
+        """
+        value = await self.get_async(key)
+        if value is not MISSING:
+            return value
+        flight = self._inflight_async.get(key)
+        if flight is None:
+            flight = asyncio.ensure_future(self._compute_async(key, compute))
+            self._inflight_async[key] = flight
+            # Retrieve the error even if every caller was cancelled, so it is not logged
+            flight.add_done_callback(lambda task: task.cancelled() or task.exception())
+        return await asyncio.shield(flight)
+
+    async def _compute_async(self, key: str, compute):
+        try:
+            value = await compute()
+            await self.set_async(key, value)
+            return value
+        finally:
+            del self._inflight_async[key]
+
+    def stats(self):
+        """Return hit/miss counters and the hit rate."""
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+
+CACHE_BACKENDS = {
+    "memory": MemoryCacheBackend,
+    "disk": DiskCacheBackend,
+    "none": NullCacheBackend,
+}
+
+_cache = None
+
+
+def create_cache(backend: str = OCR_CACHE_BACKEND) -> OCRCache:
+    """Build a cache with the named backend."""
+    if backend not in CACHE_BACKENDS:
+        raise ValueError(f"Unknown OCR cache backend: {backend}")
+    return OCRCache(CACHE_BACKENDS[backend]())
+
+
+def get_cache() -> OCRCache:
+    """Return the process-wide cache, creating it on first use."""
+    global _cache
+    if _cache is None:
+        _cache = create_cache()
+    return _cache
@@ -0,0 +1,381 @@
+"""Durable asynchronous OCR jobs: a SQLite queue drained by background workers."""
+
+import asyncio
+import ipaddress
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import urllib.request
+import uuid
+from urllib.parse import urlparse
+
+from ocr_cache import cache_key
+from ocr_metrics import record_document
+from ocr_worker import OCR_RETRY_AFTER, OCRQueueFullError, run_ocr
+
+OCR_JOBS_PATH = os.getenv("OCR_JOBS_PATH", "ocr_jobs.sqlite3")
+OCR_JOB_CONCURRENCY = int(os.getenv("OCR_JOB_CONCURRENCY", "2"))
+OCR_JOB_MAX_ATTEMPTS = int(os.getenv("OCR_JOB_MAX_ATTEMPTS", "3"))
+OCR_JOB_LEASE = float(os.getenv("OCR_JOB_LEASE", "300"))
+OCR_JOB_RETENTION = float(os.getenv("OCR_JOB_RETENTION", "86400"))
+OCR_JOB_POLL_INTERVAL = float(os.getenv("OCR_JOB_POLL_INTERVAL", "1"))
+# Seconds before a failed job is retried, doubling with each attempt.
+OCR_JOB_RETRY_BACKOFF = float(os.getenv("OCR_JOB_RETRY_BACKOFF", "5"))
+OCR_WEBHOOK_TIMEOUT = float(os.getenv("OCR_WEBHOOK_TIMEOUT", "10"))
+OCR_WEBHOOK_ATTEMPTS = int(os.getenv("OCR_WEBHOOK_ATTEMPTS", "3"))
+# Comma-separated hosts callbacks may target; empty allows any host with only
+# public addresses.
+OCR_WEBHOOK_HOSTS = {h for h in os.getenv("OCR_WEBHOOK_HOSTS", "").split(",") if h}
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+
+def validate_callback_url(url: str, allowed_hosts=OCR_WEBHOOK_HOSTS):
+    """Reject callback URLs that are not http(s) or may reach internal services.
+
+    With an allow-list only its hosts are accepted. Without one the host must
+    resolve to public addresses only, so callbacks cannot target loopback,
+    private ranges or link-local metadata endpoints.
+    """
+    parsed = urlparse(url)
+    if parsed.scheme not in ("http", "https") or not parsed.hostname:
+        raise ValueError("callback_url must be an http or https URL")
+    if allowed_hosts:
+        if parsed.hostname not in allowed_hosts:
+            raise ValueError(f"callback_url host {parsed.hostname} is not allowed")
+        return
+    try:
+        infos = socket.getaddrinfo(parsed.hostname, parsed.port or 80, proto=socket.IPPROTO_TCP)
+    except (socket.gaierror, UnicodeError):
+        raise ValueError(f"callback_url host {parsed.hostname} does not resolve")
+    for info in infos:
+        address = ipaddress.ip_address(info[4][0].split("%")[0])
+        if not address.is_global or address.is_multicast:
+            raise ValueError(f"callback_url host {parsed.hostname} is not a public address")
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    """Turn redirects into errors, so a callback cannot bounce to another host."""
+
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+
+_callback_opener = urllib.request.build_opener(_NoRedirect)
+
+
+def post_callback(
+    url: str, payload: dict, timeout: float = OCR_WEBHOOK_TIMEOUT, allowed_hosts=OCR_WEBHOOK_HOSTS
+):
+    """POST a JSON payload; raises on connection errors and non-2xx replies.
+
+    The URL is checked again at delivery, as its host may resolve differently
+    from when the job was accepted.
+    """
+    validate_callback_url(url, allowed_hosts)
+    request = urllib.request.Request(
+        url,
+        data=json.dumps(payload).encode(),
+        headers={"Content-Type": "application/json"},
+        method="POST",
+    )
+    with _callback_opener.open(request, timeout=timeout) as response:
+        return response.status
+
+
+class JobStore:
+    """SQLite job table shared by every process that opens the same path.
+
+    A worker claims a job by leasing it. If the worker dies, or the service
+    restarts mid-job, the lease runs out and another worker takes the job
+    over. Queued jobs simply wait in the file until a worker is running.
+    """
+
+    def __init__(self, path: str = OCR_JOBS_PATH, lease: float = OCR_JOB_LEASE):
+        self.path = path
+        self.lease = lease
+        self._local = threading.local()
+        conn = self._connect()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS ocr_jobs ("
+            "id TEXT PRIMARY KEY, class_name TEXT, image BLOB, status TEXT, "
+            "result TEXT, error TEXT, callback_url TEXT, callback_status TEXT, "
+            "attempts INTEGER DEFAULT 0, lease_until REAL, created_at REAL, updated_at REAL, "
+            "not_before REAL)"
+        )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS ocr_jobs_status ON ocr_jobs (status, created_at)"
+        )
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def enqueue(self, image_bytes: bytes, class_name: str, callback_url: str = None) -> str:
+        """Store an upload and return its job id."""
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        self._connect().execute(
+            "INSERT INTO ocr_jobs (id, class_name, image, status, callback_url, "
+            "created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (job_id, class_name, image_bytes, QUEUED, callback_url, now, now),
+        )
+        return job_id
+
+    def claim(self):
+        """Lease the oldest runnable job as a dict, or return None.
+
+        Queued jobs waiting out a retry backoff are skipped until `not_before`.
+        """
+        conn = self._connect()
+        now = time.time()
+        # IMMEDIATE takes the write lock up front, so two processes never
+        # claim the same row.
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "UPDATE ocr_jobs SET status = ?, attempts = attempts + 1, "
+                "lease_until = ?, updated_at = ? WHERE id = ("
+                "SELECT id FROM ocr_jobs WHERE (status = ? AND IFNULL(not_before, 0) <= ?) "
+                "OR (status = ? AND lease_until < ?) ORDER BY created_at LIMIT 1) "
+                "RETURNING id, class_name, image, callback_url, attempts",
+                (RUNNING, now + self.lease, now, QUEUED, now, RUNNING, now),
+            ).fetchone()
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        if row is None:
+            return None
+        keys = ("id", "class_name", "image", "callback_url", "attempts")
+        return dict(zip(keys, row))
+
+    def release(self, job_id: str, count_attempt: bool = True, delay: float = 0):
+        """Put a leased job back in the queue, claimable again after `delay` seconds."""
+        now = time.time()
+        self._connect().execute(
+            "UPDATE ocr_jobs SET status = ?, lease_until = NULL, updated_at = ?, "
+            "not_before = ?, attempts = attempts - ? WHERE id = ?",
+            (QUEUED, now, now + delay, 0 if count_attempt else 1, job_id),
+        )
+
+    def complete(self, job_id: str, result):
+        """Record a result and drop the stored image."""
+        self._finish(job_id, DONE, result=json.dumps(result))
+
+    def fail(self, job_id: str, error: str):
+        """Give up on a job and drop the stored image."""
+        self._finish(job_id, FAILED, error=error)
+
+    def _finish(self, job_id, status, result=None, error=None):
+        self._connect().execute(
+            "UPDATE ocr_jobs SET status = ?, result = ?, error = ?, image = NULL, "
+            "lease_until = NULL, updated_at = ? WHERE id = ?",
+            (status, result, error, time.time(), job_id),
+        )
+
+    def set_callback_status(self, job_id: str, callback_status: str):
+        self._connect().execute(
+            "UPDATE ocr_jobs SET callback_status = ? WHERE id = ?", (callback_status, job_id)
+        )
+
+    def undelivered(self, before: float):
+        """Jobs finished before `before` whose callback never recorded an outcome."""
+        rows = self._connect().execute(
+            "SELECT id, callback_url FROM ocr_jobs WHERE status IN (?, ?) "
+            "AND callback_url IS NOT NULL AND callback_status IS NULL AND updated_at < ?",
+            (DONE, FAILED, before),
+        ).fetchall()
+        return [dict(zip(("id", "callback_url"), row)) for row in rows]
+
+    def get(self, job_id: str):
+        """Return a job's public fields as a dict, or None if unknown."""
+        row = self._connect().execute(
+            "SELECT id, status, class_name, result, error, attempts, callback_status, "
+            "created_at, updated_at FROM ocr_jobs WHERE id = ?",
+            (job_id,),
+        ).fetchone()
+        if row is None:
+            return None
+        keys = (
+            "id", "status", "class_name", "result", "error", "attempts",
+            "callback_status", "created_at", "updated_at",
+        )
+        job = dict(zip(keys, row))
+        job["result"] = None if job["result"] is None else json.loads(job["result"])
+        return job
+
+    def purge(self, retention: float = OCR_JOB_RETENTION):
+        """Delete finished jobs last updated more than `retention` seconds ago."""
+        self._connect().execute(
+            "DELETE FROM ocr_jobs WHERE status IN (?, ?) AND updated_at < ?",
+            (DONE, FAILED, time.time() - retention),
+        )
+
+    def counts(self):
+        """Number of jobs per status."""
+        rows = self._connect().execute(
+            "SELECT status, COUNT(*) FROM ocr_jobs GROUP BY status"
+        ).fetchall()
+        return dict(rows)
+
+
+class OCRJobRunner:
+    """Background asyncio workers that drain a JobStore through the OCR pool.
+
+    Jobs go through the same bounded executor and result cache as `/ocr`. A
+    full pool puts the job back in the queue, so a burst of jobs never
+    crowds out synchronous requests.
+    """
+
+    def __init__(
+        self,
+        store: JobStore,
+        executor,
+        cache=None,
+        concurrency: int = OCR_JOB_CONCURRENCY,
+        max_attempts: int = OCR_JOB_MAX_ATTEMPTS,
+        poll_interval: float = OCR_JOB_POLL_INTERVAL,
+        retry_backoff: float = OCR_JOB_RETRY_BACKOFF,
+        webhook_hosts=OCR_WEBHOOK_HOSTS,
+    ):
+        self.store = store
+        self.executor = executor
+        self.cache = cache
+        self.concurrency = concurrency
+        self.max_attempts = max_attempts
+        self.poll_interval = poll_interval
+        self.retry_backoff = retry_backoff
+        self.webhook_hosts = webhook_hosts
+        self._wakeup = asyncio.Event()
+        self._tasks = []
+        self._callbacks = set()
+        self._next_purge = 0.0
+        # Jobs per status, refreshed by a background task for /metrics
+        self.counts = {}
+
+    def start(self):
+        started = time.time()
+        self._tasks = [asyncio.create_task(self._work()) for _ in range(self.concurrency)]
+        self._tasks.append(asyncio.create_task(self._count()))
+        self._tasks.append(asyncio.create_task(self._redeliver(started)))
+
+    async def stop(self):
+        """Cancel the workers; jobs they held go back to the queue."""
+        for task in self._tasks + list(self._callbacks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, *self._callbacks, return_exceptions=True)
+        self._tasks = []
+
+    def notify(self):
+        """Wake an idle worker after a job was enqueued."""
+        self._wakeup.set()
+
+    async def _work(self):
+        while True:
+            try:
+                job = await asyncio.to_thread(self.store.claim)
+            except sqlite3.OperationalError:  # database locked past the timeout
+                await asyncio.sleep(self.poll_interval)
+                continue
+            if job is None:
+                await self._idle()
+                continue
+            try:
+                await self.run_job(job)
+            except asyncio.CancelledError:
+                await asyncio.shield(
+                    asyncio.to_thread(self.store.release, job["id"], False)
+                )
+                raise
+
+    async def _count(self):
+        while True:
+            try:
+                self.counts = await asyncio.to_thread(self.store.counts)
+            except sqlite3.OperationalError:  # database locked past the timeout
+                pass
+            await asyncio.sleep(self.poll_interval)
+
+    async def _redeliver(self, before: float):
+        """Post callbacks lost when the service stopped between finishing a job and delivering it."""
+        for job in await asyncio.to_thread(self.store.undelivered, before):
+            self._notify_callback(job)
+
+    async def _idle(self):
+        if time.monotonic() >= self._next_purge:
+            self._next_purge = time.monotonic() + 60
+            await asyncio.to_thread(self.store.purge)
+        self._wakeup.clear()
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _ocr(self, image_bytes: bytes, class_name: str):
+        def compute():
+            return self.executor.run(run_ocr, image_bytes, class_name)
+
+        if self.cache is None:
+            return await compute()
+        return await self.cache.get_or_compute_async(cache_key(image_bytes, class_name), compute)
+
+    async def run_job(self, job: dict):
+        """OCR one claimed job and record the outcome."""
+        job_id = job["id"]
+        if job["attempts"] > self.max_attempts:
+            # The job was leased this often without finishing, e.g. it kills workers.
+            await asyncio.to_thread(self.store.fail, job_id, "Too many attempts")
+            return self._notify_callback(job)
+        started = time.perf_counter()
+        try:
+            result = await self._ocr(job["image"], job["class_name"])
+        except OCRQueueFullError:
+            await asyncio.to_thread(self.store.release, job_id, False)
+            await asyncio.sleep(OCR_RETRY_AFTER)
+            return
+        except ValueError as e:
+            record_document("job", job["class_name"], started, error=e)
+            await asyncio.to_thread(self.store.fail, job_id, str(e))
+        except Exception as e:
+            if job["attempts"] < self.max_attempts:
+                delay = self.retry_backoff * 2 ** (job["attempts"] - 1)
+                await asyncio.to_thread(self.store.release, job_id, True, delay)
+                return
+            record_document("job", job["class_name"], started, error=e)
+            await asyncio.to_thread(self.store.fail, job_id, str(e) or type(e).__name__)
+        else:
+            record_document("job", job["class_name"], started, result)
+            await asyncio.to_thread(self.store.complete, job_id, result)
+        self._notify_callback(job)
+
+    def _notify_callback(self, job: dict):
+        if job["callback_url"]:
+            task = asyncio.create_task(self._deliver(job["id"], job["callback_url"]))
+            self._callbacks.add(task)
+            task.add_done_callback(self._callbacks.discard)
+
+    async def _deliver(self, job_id: str, url: str):
+        """POST the finished job to its callback URL, retrying with backoff."""
+        payload = await asyncio.to_thread(self.store.get, job_id)
+        error = None
+        for attempt in range(OCR_WEBHOOK_ATTEMPTS):
+            try:
+                await asyncio.to_thread(
+                    post_callback, url, payload, allowed_hosts=self.webhook_hosts
+                )
+                status = "delivered"
+                break
+            except Exception as e:
+                error = e
+                await asyncio.sleep(2**attempt)
+        else:
+            status = f"failed: {error}"
+        await asyncio.to_thread(self.store.set_callback_status, job_id, status)
@@ -0,0 +1,293 @@
+"""Lightweight in-process metrics rendered in the Prometheus text format.
+
+Worker processes record into their own copy of the registry. The executor
+drains each worker's counts after every job and merges them into the
+parent, so one scrape of the serving process covers its whole pool.
+"""
+
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames=(), lock=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = lock or threading.Lock()
+        self._values = {}
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} takes labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _header(self):
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    """Monotonic count, optionally per label combination."""
+
+    kind = "counter"
+
+    def inc(self, value: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + value
+
+    def set(self, value: float, **labels):
+        """Mirror a total that is counted elsewhere (e.g. cache hits)."""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def _merge(self, key, value):
+        self._values[key] = self._values.get(key, 0) + value
+
+    def render(self):
+        lines = self._header()
+        for key, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class Gauge(Counter):
+    """Point-in-time value, usually set by a collector just before rendering."""
+
+    kind = "gauge"
+
+
+class Histogram(_Metric):
+    """Cumulative-bucket latency histogram."""
+
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS, lock=None):
+        super().__init__(name, documentation, labelnames, lock)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the wall time of the `with` block."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def _merge(self, key, value):
+        counts, total, count = value
+        state = self._values.get(key)
+        if state is None:
+            state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        state[0] = [a + b for a, b in zip(state[0], counts)]
+        state[1] += total
+        state[2] += count
+
+    def render(self):
+        lines = self._header()
+        for key, (counts, total, count) in sorted(self._values.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else _format_value(bound)
+                labels = _format_labels(self.labelnames, key, f'le="{le}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class Registry:
+    """Named metrics plus collectors that refresh gauges at scrape time."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics = {}
+        self._collectors = {}
+
+    def _add(self, metric):
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._add(Counter(name, documentation, labelnames, self._lock))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._add(Gauge(name, documentation, labelnames, self._lock))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._add(Histogram(name, documentation, labelnames, buckets, self._lock))
+
+    def collector(self, name: str, fn):
+        """Register `fn()` to run before each render; a same-named one is replaced."""
+        self._collectors[name] = fn
+
+    def render(self) -> str:
+        for fn in list(self._collectors.values()):
+            fn()
+        lines = []
+        with self._lock:
+            for metric in self._metrics.values():
+                lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        """Forget all recorded values, e.g. in a freshly forked worker."""
+        with self._lock:
+            for metric in self._metrics.values():
+                metric._values = {}
+
+    def drain(self):
+        """Return and clear counter and histogram values for merging elsewhere."""
+        with self._lock:
+            drained = {}
+            for name, metric in self._metrics.items():
+                if metric._values and not isinstance(metric, Gauge):
+                    drained[name] = metric._values
+                    metric._values = {}
+            return drained
+
+    def merge(self, drained):
+        """Add values drained from another process's registry."""
+        with self._lock:
+            for name, values in drained.items():
+                metric = self._metrics[name]
+                for key, value in values.items():
+                    metric._merge(key, value)
+
+
+REGISTRY = Registry()
+
+STEP_SECONDS = REGISTRY.histogram(
+    "ocr_step_seconds",
+    "Time spent in one OCR pipeline step (decode, preprocess, recognize, extract).",
+    ["step"],
+)
+REQUEST_SECONDS = REGISTRY.histogram(
+    "ocr_request_seconds",
+    "End-to-end time per document, including queueing and cache hits.",
+    ["interface", "class_name"],
+)
+DOCUMENTS = REGISTRY.counter(
+    "ocr_documents_total",
+    "Documents served, by outcome (match, no_match or error).",
+    ["interface", "class_name", "outcome"],
+)
+IN_FLIGHT = REGISTRY.gauge("ocr_in_flight", "OCR jobs admitted to the worker pool.")
+QUEUE_DEPTH = REGISTRY.gauge("ocr_queue_depth", "Admitted OCR jobs waiting for a worker.")
+QUEUE_CAPACITY = REGISTRY.gauge("ocr_queue_capacity", "Jobs the worker pool admits at once.")
+CACHE_HITS = REGISTRY.counter("ocr_cache_hits_total", "Result cache hits.")
+CACHE_MISSES = REGISTRY.counter("ocr_cache_misses_total", "Result cache misses.")
+CACHE_HIT_RATE = REGISTRY.gauge("ocr_cache_hit_rate", "Result cache hits / lookups.")
+JOBS = REGISTRY.gauge("ocr_jobs", "Asynchronous OCR jobs by status.", ["status"])
+
+
+def outcome(result=None, error=None) -> str:
+    """Classify a served document for ocr_documents_total."""
+    if error is not None:
+        return "error"
+    data = result.get("data") if isinstance(result, dict) else result
+    return "match" if data else "no_match"
+
+
+def record_document(interface: str, class_name: str, started: float, result=None, error=None):
+    """Count one served document and its latency since `started` (perf_counter)."""
+    REQUEST_SECONDS.observe(time.perf_counter() - started, interface=interface, class_name=class_name)
+    DOCUMENTS.inc(interface=interface, class_name=class_name, outcome=outcome(result, error))
+
+
+def watch_executor(executor):
+    """Export an OCRExecutor's admission state at scrape time."""
+
+    def collect():
+        IN_FLIGHT.set(executor.in_flight)
+        QUEUE_DEPTH.set(max(0, executor.in_flight - executor.workers))
+        QUEUE_CAPACITY.set(executor.capacity)
+
+    REGISTRY.collector("executor", collect)
+
+
+def watch_cache(cache):
+    """Export an OCRCache's hit and miss totals at scrape time."""
+
+    def collect():
+        stats = cache.stats()
+        CACHE_HITS.set(stats["hits"])
+        CACHE_MISSES.set(stats["misses"])
+        CACHE_HIT_RATE.set(stats["hit_rate"])
+
+    REGISTRY.collector("cache", collect)
+
+
+def watch_jobs(runner):
+    """Export the job queue's size per status, as last counted by an OCRJobRunner.
+
+    The runner refreshes its counts in the background, so a scrape never
+    waits on SQLite.
+    """
+
+    def collect():
+        counts = runner.counts
+        for status in ("queued", "running", "done", "failed"):
+            JOBS.set(counts.get(status, 0), status=status)
+
+    REGISTRY.collector("jobs", collect)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?", 1)[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = REGISTRY.render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_metrics_server(port: int, host: str = "0.0.0.0"):
+    """Serve /metrics from a daemon thread, for servers without an HTTP app."""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    return server
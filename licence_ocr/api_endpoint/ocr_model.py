@@ -1,56 +1,322 @@
 """OCR Model for extracting NRC and Passport from images."""
 
+import itertools
+import os
 import re
 
 import cv2
-import numpy as np
-import pytesseract
+from image_normalise import OCR_TARGET_WIDTH, apply_lut, decode_gray, read_image_size
+from ocr_metrics import STEP_SECONDS
+from recognizer import Recognizer, get_recognizer
+from text_regions import LINE_HEIGHT, crop_region, find_mrz_band, find_text_lines, stack_regions
+
+OCR_ROI = os.getenv("OCR_ROI", "1") == "1"
+OCR_ROI_MAX_REGIONS = int(os.getenv("OCR_ROI_MAX_REGIONS", "8"))
+OCR_MIN_CONFIDENCE = float(os.getenv("OCR_MIN_CONFIDENCE", "60"))
+OCR_HIRES_SCALE = float(os.getenv("OCR_HIRES_SCALE", "1.5"))
+OCR_ORIENTATION = os.getenv("OCR_ORIENTATION", "1") == "1"
+OCR_ORIENTATION_STAGES = int(os.getenv("OCR_ORIENTATION_STAGES", "3"))
+
+# Tesseract page segmentation modes: a block of stacked lines, sparse text.
+PSM_BLOCK = 6
+PSM_SPARSE = 11
+NRC_WHITELIST = "0123456789/()ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+MRZ_WHITELIST = "0123456789<ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+AUTO_WHITELIST = "0123456789/()<ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+MRZ_HEIGHT = 3 * LINE_HEIGHT
+
+NRC_PATTERN = re.compile(r"\d{1,2}/[A-Z ]+\(N\)[0-9O]{5,7}", re.IGNORECASE)
+PASSPORT_PATTERN = re.compile(r"\b[A-Z]{1,2}[0-9]{6,8}\b")
+PASSPORT_NUMBER_PATTERN = re.compile(r"[A-Z]{1,2}[0-9]{6,8}")
+# MRZ line 2 starts: 9-character document number, check digit, nationality.
+MRZ_NUMBER_PATTERN = re.compile(r"([A-Z0-9<]{9})([0-9])[A-Z<]{3}")
+
+
+def mrz_check_digit(value: str) -> str:
+    """Compute the ICAO 9303 check digit for an MRZ field."""
+    total = 0
+    for i, char in enumerate(value):
+        if char.isdigit():
+            digit = int(char)
+        elif char.isalpha():
+            digit = ord(char) - ord("A") + 10
+        else:
+            digit = 0
+        total += digit * (7, 3, 1)[i % 3]
+    return str(total % 10)
+
+
+# Clockwise rotations tried when an upright read finds nothing.
+ROTATIONS = {
+    90: cv2.ROTATE_90_CLOCKWISE,
+    180: cv2.ROTATE_180,
+    270: cv2.ROTATE_90_COUNTERCLOCKWISE,
+}
+
+
+def rotate(gray, degrees: int):
+    """Rotate an image clockwise by 0, 90, 180 or 270 degrees."""
+    return gray if degrees == 0 else cv2.rotate(gray, ROTATIONS[degrees])
+
+
+def binarise(gray):
+    """Global Otsu threshold, suited to small evenly lit crops."""
+    _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)
+    return binary
+
+
+def binarise_adaptive(gray):
+    """Local threshold, robust to glare and shadows across a whole photo."""
+    return cv2.adaptiveThreshold(
+        gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 31, 15
+    )
 
 
 class OCR_Model:
     """OCR Model for extracting NRC and Passport from images."""
 
-    def __init__(self, image_path: str = None):
+    def __init__(
+        self,
+        image_path: str = None,
+        image_bytes: bytes = None,
+        recognizer: Recognizer = None,
+        use_roi: bool = OCR_ROI,
+        min_confidence: float = OCR_MIN_CONFIDENCE,
+        orientation: bool = OCR_ORIENTATION,
+    ):
         self.image_path = image_path
+        self.image_bytes = image_bytes
+        self.recognizer = recognizer or get_recognizer()
+        self.use_roi = use_roi
+        self.min_confidence = min_confidence
+        self.orientation = orientation
+
+    def load_gray(self):
+        """Load a grayscale image normalised to the OCR target width."""
+        if self.image_bytes:
+            return decode_gray(self.image_bytes)
+        if self.image_path:
+            with open(self.image_path, "rb") as f:
+                return decode_gray(f.read())
+        raise ValueError("Image path is not provided.")
+
+    def load_hires_gray(self):
+        """Decode above the target width for the last cascade stage, or None.
+
+        Returns None when the source has no more detail than the normal decode.
+        """
+        if self.image_bytes:
+            image_bytes = self.image_bytes
+        elif self.image_path:
+            with open(self.image_path, "rb") as f:
+                image_bytes = f.read()
+        else:
+            return None
+        size = read_image_size(image_bytes)
+        if not size or size[0] <= OCR_TARGET_WIDTH:
+            return None
+        target_width = min(size[0], int(OCR_TARGET_WIDTH * OCR_HIRES_SCALE))
+        return decode_gray(image_bytes, target_width=target_width)
+
+    def run_oriented(self, doc_ocr, gray_img):
+        """Run `doc_ocr` upright, then on rotated copies if nothing matched.
+
+        Rotations are only tried when the upright cascade finds no value. The
+        recognizer's orientation detection, when available, picks the first
+        rotation to try; the others follow one at a time on the cheap stages,
+        stopping at the first match. They run on the calling thread so a
+        worker stays within its OCR_THREADS_PER_WORKER budget and reuses its
+        warm engine. The response records the clockwise `rotation` that was
+        applied.
+        """
+        result = doc_ocr(gray_img)
+        if result["data"] or not self.orientation:
+            return {**result, "rotation": 0}
+
+        detected = self.recognizer.detect_rotation(gray_img)
+        order = sorted(ROTATIONS, key=lambda degrees: degrees != detected)
+        for degrees in order:
+            rotated = doc_ocr(gray_img, degrees, OCR_ORIENTATION_STAGES)
+            if rotated["data"]:
+                return {**rotated, "rotation": degrees}
+        return {**result, "rotation": 0}
+
+    def run_cascade(self, stages, find):
+        """Read stages cheapest first and stop at the first confident match.
+
+        `stages` yields (stage, image, psm, whitelist) and is consumed lazily,
+        so heavier images are only built when an earlier stage falls short.
+        `find` returns (value, start, end) for a match in the text, or None.
+        A match is accepted when its word confidence reaches
+        `min_confidence` (or is unknown); otherwise the most confident match
+        seen is returned once all stages are exhausted.
+        """
+        best = None
+        stages = iter(stages)
+        while True:
+            # Stage images are built lazily, so advancing is the preprocessing.
+            with STEP_SECONDS.time(step="preprocess"):
+                stage_args = next(stages, None)
+            if stage_args is None:
+                break
+            stage, image, psm, whitelist = stage_args
+            with STEP_SECONDS.time(step="recognize"):
+                ocr_text = self.recognizer.image_to_data(image, psm=psm, whitelist=whitelist)
+            with STEP_SECONDS.time(step="extract"):
+                found = find(ocr_text.text)
+            if not found:
+                continue
+            value, start, end = found
+            confidence = ocr_text.confidence(start, end)
+            result = {
+                "data": value,
+                "confidence": None if confidence is None else round(confidence, 1),
+                "stage": stage,
+            }
+            if confidence is None or confidence >= self.min_confidence:
+                return result
+            if best is None or confidence > best["confidence"]:
+                best = result
+        return best or {"data": None, "confidence": None, "stage": None}
 
     def preprocess_image_for_licence_ocr(self):
         """Preprocess the image for better OCR results."""
-        if not self.image_path:
-            raise ValueError("Image path is not provided.")
-        image = cv2.imread(self.image_path)
-        brightness = 10
-        contrast = 2
-        image2 = cv2.addWeighted(
-            image, contrast, np.zeros(image.shape, image.dtype), 0, brightness
-        )
-        gray = cv2.cvtColor(image2, cv2.COLOR_BGR2GRAY)
-        return gray
+        return apply_lut(self.load_gray())
 
-    def licence_ocr_model(self, gray_img):
-        """Perform OCR on the preprocessed image."""
-        result = pytesseract.image_to_string(gray_img)
-
-        pattern = re.compile(r"\d{1,2}/[A-Z ]+\(N\)[0-9O]{5,7}", re.IGNORECASE)
+    def locate_licence_regions(self, gray_img):
+        """Stack candidate text lines into one small image, or None if none found."""
+        boxes = find_text_lines(gray_img, max_regions=OCR_ROI_MAX_REGIONS)
+        return stack_regions(gray_img, boxes)
 
-        match = pattern.search(result)
+    def find_nrc(self, text):
+        """Find a cleaned NRC number in recognized text as (nrc, start, end)."""
+        match = NRC_PATTERN.search(text)
         if match:
-            nrc = match.group()
-            clean_nrc = re.sub(r"O", "O", nrc)
-            clean_nrc = re.sub(r" ", "", clean_nrc)
-            return clean_nrc
+            prefix, number = match.group().rsplit(")", 1)
+            # Letter O misread in the number part is a zero.
+            clean_nrc = prefix.replace(" ", "") + ")" + number.upper().replace("O", "0")
+            return clean_nrc, match.start(), match.end()
         return None
 
+    def licence_stages(self, gray_img, rotation: int = 0):
+        """Yield licence OCR stages from cheapest to heaviest."""
+        gray_img = rotate(gray_img, rotation)
+        if self.use_roi:
+            regions = self.locate_licence_regions(gray_img)
+            if regions is not None:
+                yield "roi", regions, PSM_BLOCK, NRC_WHITELIST
+                yield "roi_binary", binarise(regions), PSM_BLOCK, NRC_WHITELIST
+        yield "full", gray_img, None, None
+        yield "full_binary", binarise_adaptive(gray_img), PSM_SPARSE, None
+        hires = self.load_hires_gray()
+        if hires is not None:
+            yield "hires", apply_lut(rotate(hires, rotation)), None, None
+
+    def licence_ocr(self, gray_img, rotation: int = 0, max_stages: int = None):
+        """Run the licence cascade; returns data, confidence and stage."""
+        stages = itertools.islice(self.licence_stages(gray_img, rotation), max_stages)
+        return self.run_cascade(stages, self.find_nrc)
+
+    def licence_ocr_model(self, gray_img):
+        """Perform OCR on the preprocessed image."""
+        return self.licence_ocr(gray_img)["data"]
+
     def preprocess_image_for_passport_ocr(self):
         """Preprocess the image for better OCR results."""
-        if not self.image_path:
-            raise ValueError("Image path is not provided.")
-        image = cv2.imread(self.image_path)
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-        return gray
+        return self.load_gray()
+
+    def locate_passport_regions(self, gray_img):
+        """Crop the machine-readable zone, or None if it is not found."""
+        band = find_mrz_band(gray_img)
+        return None if band is None else crop_region(gray_img, band, MRZ_HEIGHT)
+
+    def find_passport_number(self, text):
+        """Find a passport number in recognized text as (number, start, end)."""
+        match = PASSPORT_PATTERN.search(text)
+        return (match.group(), match.start(), match.end()) if match else None
+
+    def find_mrz_passport_number(self, text):
+        """Find the MRZ line 2 document number if its check digit holds.
+
+        Returns (number, start, end) with the span of the whole MRZ line.
+        """
+        start = 0
+        for line in text.splitlines(keepends=True):
+            match = MRZ_NUMBER_PATTERN.search(line.replace(" ", ""))
+            if match and mrz_check_digit(match.group(1)) == match.group(2):
+                number = match.group(1).rstrip("<")
+                if PASSPORT_NUMBER_PATTERN.fullmatch(number):
+                    return number, start, start + len(line.rstrip())
+            start += len(line)
+        return None
+
+    def find_passport(self, text):
+        """Prefer a checksummed MRZ number, else any passport-shaped token."""
+        return self.find_mrz_passport_number(text) or self.find_passport_number(text)
+
+    def passport_stages(self, gray_img, rotation: int = 0):
+        """Yield passport OCR stages from cheapest to heaviest."""
+        gray_img = rotate(gray_img, rotation)
+        if self.use_roi:
+            mrz = self.locate_passport_regions(gray_img)
+            if mrz is not None:
+                yield "roi", mrz, PSM_BLOCK, MRZ_WHITELIST
+                yield "roi_binary", binarise(mrz), PSM_BLOCK, MRZ_WHITELIST
+        yield "full", gray_img, None, None
+        yield "full_binary", binarise_adaptive(gray_img), PSM_SPARSE, None
+        hires = self.load_hires_gray()
+        if hires is not None:
+            yield "hires", rotate(hires, rotation), None, None
+
+    def passport_ocr(self, gray_img, rotation: int = 0, max_stages: int = None):
+        """Run the passport cascade; returns data, confidence and stage."""
+        stages = itertools.islice(self.passport_stages(gray_img, rotation), max_stages)
+        return self.run_cascade(stages, self.find_passport)
 
     def passport_ocr_model(self, gray_img):
         """Perform OCR on the preprocessed image."""
-        result = pytesseract.image_to_string(gray_img)
-        pattern = r"\b[A-Z]{1,2}[0-9]{6,8}\b"
-        matches = re.findall(pattern, result)
-        return matches[0] if matches else None
+        return self.passport_ocr(gray_img)["data"]
+
+    def preprocess_image_for_auto_ocr(self):
+        """Preprocess the image when the document type is not known."""
+        return self.load_gray()
+
+    def find_document(self, text):
+        """Apply every extractor to one text as ((document_type, value), start, end).
+
+        A checksummed MRZ is the strongest evidence, then the NRC pattern,
+        then a bare passport-shaped token.
+        """
+        extractors = (
+            ("passport", self.find_mrz_passport_number),
+            ("licence", self.find_nrc),
+            ("passport", self.find_passport_number),
+        )
+        for document_type, find in extractors:
+            found = find(text)
+            if found:
+                value, start, end = found
+                return (document_type, value), start, end
+        return None
+
+    def auto_stages(self, gray_img, rotation: int = 0):
+        """Yield stages that suit both document types, cheapest first."""
+        gray_img = rotate(gray_img, rotation)
+        if self.use_roi:
+            # Text-line detection also picks up MRZ lines.
+            regions = self.locate_licence_regions(gray_img)
+            if regions is not None:
+                yield "roi", regions, PSM_BLOCK, AUTO_WHITELIST
+                yield "roi_binary", binarise(regions), PSM_BLOCK, AUTO_WHITELIST
+        yield "full", gray_img, None, None
+        yield "full_binary", binarise_adaptive(gray_img), PSM_SPARSE, None
+        hires = self.load_hires_gray()
+        if hires is not None:
+            yield "hires", rotate(hires, rotation), None, None
+
+    def auto_ocr(self, gray_img, rotation: int = 0, max_stages: int = None):
+        """Run one cascade for an unknown document; also returns document_type."""
+        stages = itertools.islice(self.auto_stages(gray_img, rotation), max_stages)
+        result = self.run_cascade(stages, self.find_document)
+        document_type, result["data"] = result["data"] or (None, None)
+        return {**result, "document_type": document_type}
@@ -0,0 +1,223 @@
+"""Process-pool executor for running OCR off the request threads."""
+
+import asyncio
+import multiprocessing
+import os
+import pickle
+import threading
+import time
+from concurrent.futures import Future, InvalidStateError, ProcessPoolExecutor
+
+import cv2
+import numpy as np
+from ocr_metrics import REGISTRY
+from ocr_model import OCR_Model
+from recognizer import get_recognizer
+
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", os.cpu_count() or 1))
+OCR_THREADS_PER_WORKER = int(os.getenv("OCR_THREADS_PER_WORKER", "1"))
+OCR_QUEUE_SIZE = int(os.getenv("OCR_QUEUE_SIZE", str(2 * OCR_WORKERS)))
+OCR_TIMEOUT = float(os.getenv("OCR_TIMEOUT", "30"))
+OCR_RETRY_AFTER = int(os.getenv("OCR_RETRY_AFTER", "1"))
+OCR_WARMUP = os.getenv("OCR_WARMUP", "1") == "1"
+OCR_WARMUP_TIMEOUT = float(os.getenv("OCR_WARMUP_TIMEOUT", "120"))
+
+WARMUP_CLASSES = ("licence", "passport", "auto")
+WARMUP_LINES = (
+    (0.18, "NRC No. 12/ABC(N)123456"),
+    (0.32, "Passport No. MA1234567"),
+    (0.82, "P<MMRDOE<<JOHN<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<"),
+    (0.92, "MA12345672MMR9001011M3001019<<<<<<<<<<<<<<02"),
+)
+
+_warmup_barrier = None
+_warmup_image = None
+
+
+class OCRQueueFullError(Exception):
+    """Raised when the OCR admission queue has no free slot."""
+
+
+def _init_worker(thread_limit: int, warmup_barrier=None):
+    """Cap tesseract/OpenMP and OpenCV threads, then warm this worker's engine.
+
+    The environment variable only reaches pytesseract's subprocesses; the
+    in-process tesserocr engine took its limit from recognizer.py at import.
+    """
+    global _warmup_barrier
+    _warmup_barrier = warmup_barrier
+    os.environ["OMP_THREAD_LIMIT"] = str(thread_limit)
+    cv2.setNumThreads(thread_limit)
+    REGISTRY.reset()  # drop values inherited from the parent on fork
+    get_recognizer().warm_up()
+
+
+def _call_with_deadline(deadline: float, fn, *args):
+    """Skip work whose deadline already passed while it sat in the queue.
+
+    Returns the result with the metrics this worker recorded since its last
+    job, for the parent to merge; errors carry them as `worker_metrics`.
+    """
+    if time.monotonic() > deadline:
+        raise TimeoutError("OCR deadline exceeded before processing started.")
+    try:
+        return fn(*args), REGISTRY.drain()
+    except Exception as e:
+        # Errors travel back to the parent pickled; one that cannot be rebuilt
+        # there (e.g. pytesseract.TesseractNotFoundError) breaks the whole pool.
+        try:
+            pickle.loads(pickle.dumps(e))
+        except Exception:
+            e = RuntimeError(f"{type(e).__name__}: {e}")
+        e.worker_metrics = REGISTRY.drain()
+        raise e from None
+
+
+def run_ocr(image_bytes: bytes, class_name: str):
+    """Run the OCR cascade for one document inside a worker process.
+
+    Returns a dict with the extracted `data`, its `confidence`, the cascade
+    `stage` that produced it and the `rotation` applied to the photo. With
+    `class_name="auto"` it also reports the detected `document_type`.
+    """
+    ocr = OCR_Model(image_bytes=image_bytes)
+    if class_name == "auto":
+        gray = ocr.preprocess_image_for_auto_ocr()
+        return ocr.run_oriented(ocr.auto_ocr, gray)
+    if class_name == "passport":
+        gray = ocr.preprocess_image_for_passport_ocr()
+        return ocr.run_oriented(ocr.passport_ocr, gray)
+    gray = ocr.preprocess_image_for_licence_ocr()
+    return ocr.run_oriented(ocr.licence_ocr, gray)
+
+
+def warmup_image() -> bytes:
+    """A synthetic card with NRC, passport number and MRZ text, JPEG-encoded."""
+    global _warmup_image
+    if _warmup_image is None:
+        image = np.full((630, 1000, 3), 235, np.uint8)
+        for top, line in WARMUP_LINES:
+            cv2.putText(image, line, (40, int(630 * top)), cv2.FONT_HERSHEY_SIMPLEX, 0.9,
+                        (20, 20, 20), 2, cv2.LINE_AA)
+        _warmup_image = cv2.imencode(".jpg", image)[1].tobytes()
+    return _warmup_image
+
+
+def warm_up(fn=run_ocr, classes=WARMUP_CLASSES):
+    """Run the synthetic card through each pipeline; returns seconds per class.
+
+    The first call pays for tesseract's language data and OpenCV's lazy
+    initialisation, so real requests do not.
+    """
+    timings = {}
+    for class_name in classes:
+        started = time.perf_counter()
+        fn(warmup_image(), class_name)
+        timings[class_name] = round(time.perf_counter() - started, 3)
+    return timings
+
+
+def _warm_up_worker(fn, classes, timeout: float):
+    """Warm this worker, then wait at the barrier so every worker gets one job.
+
+    The barrier breaks when another worker fails or is too slow. That does
+    not change this worker's own outcome, so the error is ignored and the
+    barrier reset for the next warm-up.
+    """
+    try:
+        return os.getpid(), warm_up(fn, classes)
+    finally:
+        try:
+            _warmup_barrier.wait(timeout)
+        except threading.BrokenBarrierError:
+            _warmup_barrier.reset()
+
+
+class OCRExecutor:
+    """Bounded process pool: at most `workers + queue_size` jobs are admitted."""
+
+    def __init__(
+        self,
+        workers: int = OCR_WORKERS,
+        threads_per_worker: int = OCR_THREADS_PER_WORKER,
+        queue_size: int = OCR_QUEUE_SIZE,
+        timeout: float = OCR_TIMEOUT,
+    ):
+        self.workers = workers
+        self.capacity = workers + queue_size
+        self.timeout = timeout
+        self.in_flight = 0
+        self._lock = threading.Lock()
+        self._pool = ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(threads_per_worker, multiprocessing.Barrier(workers)),
+        )
+
+    def _release(self, _future):
+        with self._lock:
+            self.in_flight -= 1
+
+    def _relay(self, worker_future, future):
+        """Release the slot, merge worker metrics and pass the result on."""
+        self._release(worker_future)
+        try:
+            if worker_future.cancelled():
+                future.cancel()
+            elif worker_future.exception() is not None:
+                error = worker_future.exception()
+                REGISTRY.merge(getattr(error, "worker_metrics", {}))
+                future.set_exception(error)
+            else:
+                result, metrics = worker_future.result()
+                REGISTRY.merge(metrics)
+                future.set_result(result)
+        except InvalidStateError:  # the caller cancelled after a timeout
+            pass
+
+    def submit(self, fn, *args, timeout: float = None):
+        """Admit a job or raise OCRQueueFullError; returns a concurrent future."""
+        timeout = self.timeout if timeout is None else timeout
+        with self._lock:
+            if self.in_flight >= self.capacity:
+                raise OCRQueueFullError("OCR queue is full, retry later.")
+            self.in_flight += 1
+        try:
+            worker_future = self._pool.submit(
+                _call_with_deadline, time.monotonic() + timeout, fn, *args
+            )
+        except Exception:
+            self._release(None)
+            raise
+        # The slot is held until the worker is actually done, even after a
+        # timed-out caller has gone away, so admission reflects real load.
+        future = Future()
+        worker_future.add_done_callback(lambda f: self._relay(f, future))
+        future.add_done_callback(lambda f: f.cancelled() and worker_future.cancel())
+        return future
+
+    async def run(self, fn, *args, timeout: float = None):
+        """Run `fn(*args)` in the pool, raising TimeoutError past the deadline."""
+        timeout = self.timeout if timeout is None else timeout
+        future = self.submit(fn, *args, timeout=timeout)
+        return await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+
+    def warm_up(self, fn=run_ocr, classes=WARMUP_CLASSES, timeout: float = OCR_WARMUP_TIMEOUT):
+        """Warm every worker process; returns one future of (pid, timings) per worker.
+
+        Each job holds its worker at a barrier until all are warm, so no
+        worker runs two of them while another stays cold.
+        """
+        return [
+            self.submit(_warm_up_worker, fn, classes, timeout, timeout=timeout)
+            for _ in range(self.workers)
+        ]
+
+    async def warm_up_async(self, fn=run_ocr, classes=WARMUP_CLASSES, timeout: float = OCR_WARMUP_TIMEOUT):
+        """Like `warm_up`, but awaits the workers; returns {pid: timings}."""
+        futures = [asyncio.wrap_future(future) for future in self.warm_up(fn, classes, timeout)]
+        return dict(await asyncio.gather(*futures))
+
+    def shutdown(self):
+        """Stop the worker processes, dropping jobs that have not started."""
+        self._pool.shutdown(wait=True, cancel_futures=True)
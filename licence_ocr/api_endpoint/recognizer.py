@@ -0,0 +1,225 @@
+"""Pluggable text recognizers used by the OCR model."""
+
+import os
+import threading
+from abc import ABC, abstractmethod
+
+import pytesseract
+
+# libtesseract's OpenMP runtime reads the thread limit once, when tesserocr is
+# imported. Workers fork after that, so the per-worker cap is set here first.
+os.environ.setdefault("OMP_THREAD_LIMIT", os.getenv("OCR_THREADS_PER_WORKER", "1"))
+
+try:
+    import tesserocr
+except ImportError:  # optional: falls back to the pytesseract subprocess backend
+    tesserocr = None
+
+OCR_ENGINE = os.getenv("OCR_ENGINE", "auto")
+OCR_LANG = os.getenv("OCR_LANG", "eng")
+
+
+class OCRText:
+    """Recognized text plus the confidence (0-100) of each word in it."""
+
+    def __init__(self, lines):
+        """Build from lines of (word, confidence) pairs."""
+        self._spans = []
+        parts = []
+        offset = 0
+        for line in lines:
+            for i, (word, confidence) in enumerate(line):
+                if i:
+                    parts.append(" ")
+                    offset += 1
+                self._spans.append((offset, offset + len(word), confidence))
+                parts.append(word)
+                offset += len(word)
+            parts.append("\n")
+            offset += 1
+        self.text = "".join(parts)
+
+    @classmethod
+    def from_string(cls, text: str, confidence: float = None):
+        """Wrap plain text whose word confidences are unknown."""
+        return cls([[(word, confidence) for word in line.split()] for line in text.splitlines()])
+
+    def confidence(self, start: int = 0, end: int = None):
+        """Mean confidence of the words overlapping text[start:end], or None."""
+        end = len(self.text) if end is None else end
+        scores = [
+            conf
+            for word_start, word_end, conf in self._spans
+            if word_start < end and word_end > start and conf is not None
+        ]
+        return sum(scores) / len(scores) if scores else None
+
+
+class Recognizer(ABC):
+    """Turn a grayscale image into text."""
+
+    name = "base"
+
+    @abstractmethod
+    def image_to_string(self, gray_img, psm: int = None, whitelist: str = None):
+        """Recognize all text in the image."""
+
+    def image_to_data(self, gray_img, psm: int = None, whitelist: str = None):
+        """Recognize text with word confidences; unknown unless overridden."""
+        return OCRText.from_string(self.image_to_string(gray_img, psm, whitelist))
+
+    def detect_rotation(self, gray_img):
+        """Clockwise degrees that make the text upright, or None if unknown."""
+        return None
+
+    def warm_up(self):
+        """Load language data ahead of the first request."""
+
+
+class PytesseractRecognizer(Recognizer):
+    """Runs a tesseract subprocess per call; slow but needs only the binary."""
+
+    name = "pytesseract"
+
+    def __init__(self, lang: str = OCR_LANG):
+        self.lang = lang
+
+    @staticmethod
+    def build_config(psm: int = None, whitelist: str = None):
+        """Translate recognizer options into tesseract command-line flags."""
+        config = []
+        if psm is not None:
+            config.append(f"--psm {psm}")
+        if whitelist:
+            config.append(f"-c tessedit_char_whitelist={whitelist}")
+        return " ".join(config)
+
+    def image_to_string(self, gray_img, psm: int = None, whitelist: str = None):
+        """Recognize all text in the image."""
+        return pytesseract.image_to_string(
+            gray_img, lang=self.lang, config=self.build_config(psm, whitelist)
+        )
+
+    def image_to_data(self, gray_img, psm: int = None, whitelist: str = None):
+        """Recognize text with word confidences."""
+        data = pytesseract.image_to_data(
+            gray_img,
+            lang=self.lang,
+            config=self.build_config(psm, whitelist),
+            output_type=pytesseract.Output.DICT,
+        )
+        lines = {}
+        for i, word in enumerate(data["text"]):
+            confidence = float(data["conf"][i])
+            if word.strip() and confidence >= 0:
+                key = (data["block_num"][i], data["par_num"][i], data["line_num"][i])
+                lines.setdefault(key, []).append((word, confidence))
+        return OCRText(lines.values())
+
+    def detect_rotation(self, gray_img):
+        """Clockwise degrees that make the text upright, or None if unknown."""
+        try:
+            osd = pytesseract.image_to_osd(gray_img, output_type=pytesseract.Output.DICT)
+        except pytesseract.TesseractError:  # too little text, or no osd data
+            return None
+        return osd["rotate"] % 360
+
+
+class TesserocrRecognizer(Recognizer):
+    """Keeps one warm tesseract engine per thread and feeds it raw pixels.
+
+    Language data is loaded once, and images are passed through the C API
+    without a temp file or a process spawn.
+    """
+
+    name = "tesserocr"
+
+    def __init__(self, lang: str = OCR_LANG):
+        if tesserocr is None:
+            raise ImportError("tesserocr is not installed.")
+        self.lang = lang
+        self._local = threading.local()
+
+    def _api(self):
+        api = getattr(self._local, "api", None)
+        if api is None:
+            api = tesserocr.PyTessBaseAPI(lang=self.lang)
+            self._local.api = api
+        return api
+
+    def _osd_api(self):
+        api = getattr(self._local, "osd_api", None)
+        if api is None:
+            api = tesserocr.PyTessBaseAPI(lang="osd", psm=tesserocr.PSM.OSD_ONLY)
+            self._local.osd_api = api
+        return api
+
+    def _set_image(self, gray_img, psm: int = None, whitelist: str = None):
+        api = self._api()
+        api.SetPageSegMode(tesserocr.PSM.AUTO if psm is None else psm)
+        api.SetVariable("tessedit_char_whitelist", whitelist or "")
+        height, width = gray_img.shape[:2]
+        api.SetImageBytes(gray_img.tobytes(), width, height, 1, width)
+        return api
+
+    def image_to_string(self, gray_img, psm: int = None, whitelist: str = None):
+        """Recognize all text in the image."""
+        return self._set_image(gray_img, psm, whitelist).GetUTF8Text()
+
+    def image_to_data(self, gray_img, psm: int = None, whitelist: str = None):
+        """Recognize text with word confidences."""
+        api = self._set_image(gray_img, psm, whitelist)
+        api.Recognize()
+        lines = []
+        iterator = api.GetIterator()
+        level = tesserocr.RIL.WORD
+        for word in tesserocr.iterate_level(iterator, level):
+            text = word.GetUTF8Text(level)
+            if not text:
+                continue
+            if not lines or word.IsAtBeginningOf(tesserocr.RIL.TEXTLINE):
+                lines.append([])
+            lines[-1].append((text, word.Confidence(level)))
+        return OCRText(lines)
+
+    def detect_rotation(self, gray_img):
+        """Clockwise degrees that make the text upright, or None if unknown."""
+        try:
+            api = self._osd_api()
+        except RuntimeError:  # osd.traineddata is not installed
+            return None
+        height, width = gray_img.shape[:2]
+        api.SetImageBytes(gray_img.tobytes(), width, height, 1, width)
+        osd = api.DetectOrientationScript()
+        if not osd:
+            return None
+        return (360 - osd["orient_deg"]) % 360
+
+    def warm_up(self):
+        """Load language data ahead of the first request."""
+        self._api()
+
+
+RECOGNIZERS = {
+    PytesseractRecognizer.name: PytesseractRecognizer,
+    TesserocrRecognizer.name: TesserocrRecognizer,
+}
+
+_recognizer = None
+
+
+def create_recognizer(engine: str = OCR_ENGINE) -> Recognizer:
+    """Build a recognizer by name; `auto` prefers tesserocr when installed."""
+    if engine == "auto":
+        engine = TesserocrRecognizer.name if tesserocr else PytesseractRecognizer.name
+    if engine not in RECOGNIZERS:
+        raise ValueError(f"Unknown OCR engine: {engine}")
+    return RECOGNIZERS[engine]()
+
+
+def get_recognizer() -> Recognizer:
+    """Return the process-wide recognizer, creating it on first use."""
+    global _recognizer
+    if _recognizer is None:
+        _recognizer = create_recognizer()
+    return _recognizer
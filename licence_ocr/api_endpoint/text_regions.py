@@ -0,0 +1,122 @@
+"""Locate candidate text regions so tesseract only sees small crops."""
+
+import cv2
+import numpy as np
+
+DETECT_WIDTH = 800
+LINE_HEIGHT = 48
+LINE_GAP = 16
+
+
+def _detection_image(gray):
+    """Downscale for detection; returns the small image and its scale factor."""
+    scale = min(1.0, DETECT_WIDTH / gray.shape[1])
+    if scale < 1.0:
+        gray = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    return gray, scale
+
+
+def _gradient_mask(small, close_kernel):
+    """Highlight dark text strokes and merge characters into line blobs."""
+    rect_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (13, 5))
+    blackhat = cv2.morphologyEx(small, cv2.MORPH_BLACKHAT, rect_kernel)
+    grad = np.absolute(cv2.Sobel(blackhat, cv2.CV_32F, 1, 0, ksize=-1))
+    grad = cv2.normalize(grad, None, 0, 255, cv2.NORM_MINMAX).astype(np.uint8)
+    grad = cv2.morphologyEx(grad, cv2.MORPH_CLOSE, close_kernel)
+    _, mask = cv2.threshold(grad, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)
+    return mask
+
+
+def _to_full_res(box, scale, shape, pad):
+    """Map a detection-scale box back onto the full-resolution image."""
+    x, y, w, h = (int(round(v / scale)) for v in box)
+    pad = int(h * pad)
+    x0, y0 = max(x - pad, 0), max(y - pad, 0)
+    x1, y1 = min(x + w + pad, shape[1]), min(y + h + pad, shape[0])
+    return x0, y0, x1 - x0, y1 - y0
+
+
+def find_text_lines(gray, max_regions: int = 8, pad: float = 0.3):
+    """Return up to `max_regions` line-shaped text boxes as (x, y, w, h).
+
+    Boxes are in full-resolution coordinates and sorted top to bottom.
+    """
+    small, scale = _detection_image(gray)
+    close_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (21, 3))
+    mask = _gradient_mask(small, close_kernel)
+    mask = cv2.dilate(cv2.erode(mask, None, iterations=1), None, iterations=1)
+    contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+    boxes = []
+    for contour in contours:
+        x, y, w, h = cv2.boundingRect(contour)
+        if h >= 6 and w >= 2 * h and w < small.shape[1] * 0.98:
+            boxes.append((x, y, w, h))
+    boxes.sort(key=lambda box: box[2] * box[3], reverse=True)
+    boxes = [_to_full_res(box, scale, gray.shape, pad) for box in boxes[:max_regions]]
+    return sorted(boxes, key=lambda box: (box[1], box[0]))
+
+
+def find_mrz_band(gray, pad: float = 0.15):
+    """Return the passport machine-readable zone as (x, y, w, h), or None.
+
+    The MRZ is two or three wide lines of OCR-B text at the bottom of the
+    data page, so the lowest line spanning most of the page is taken along
+    with the wide lines directly above it.
+    """
+    small, scale = _detection_image(gray)
+    mask = _gradient_mask(small, cv2.getStructuringElement(cv2.MORPH_RECT, (13, 5)))
+    square_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (13, 13))
+    mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, square_kernel)
+    mask = cv2.erode(mask, None, iterations=2)
+    contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+    lines = []
+    for contour in contours:
+        x, y, w, h = cv2.boundingRect(contour)
+        if h and w / h > 5 and w / small.shape[1] > 0.6:
+            lines.append((x, y, w, h))
+    if not lines:
+        return None
+
+    lines.sort(key=lambda box: box[1] + box[3], reverse=True)
+    band = list(lines[0])
+    for x, y, w, h in lines[1:3]:
+        if band[1] - (y + h) > 3 * h:
+            break
+        x0, y0 = min(band[0], x), y
+        x1 = max(band[0] + band[2], x + w)
+        band = [x0, y0, x1 - x0, band[1] + band[3] - y0]
+    return _to_full_res(band, scale, gray.shape, pad)
+
+
+def crop_region(gray, box, height: int):
+    """Crop a box and resample it to `height` pixels, keeping the aspect ratio."""
+    x, y, w, h = box
+    crop = gray[y : y + h, x : x + w]
+    if crop.size == 0:
+        return None
+    width = max(1, int(round(w * height / h)))
+    interpolation = cv2.INTER_AREA if h > height else cv2.INTER_CUBIC
+    return cv2.resize(crop, (width, height), interpolation=interpolation)
+
+
+def stack_regions(gray, boxes, line_height: int = LINE_HEIGHT, gap: int = LINE_GAP):
+    """Crop boxes, scale them to one text height and stack them into one image.
+
+    Stacking lets a single recognizer call read every candidate line, which
+    matters for backends that pay a fixed cost per call.
+    """
+    lines = [crop_region(gray, box, line_height) for box in boxes]
+    lines = [line for line in lines if line is not None]
+    if not lines:
+        return None
+
+    canvas_width = max(line.shape[1] for line in lines) + 2 * gap
+    canvas = np.full(
+        (len(lines) * (line_height + gap) + gap, canvas_width), 255, np.uint8
+    )
+    for i, line in enumerate(lines):
+        top = gap + i * (line_height + gap)
+        canvas[top : top + line_height, gap : gap + line.shape[1]] = line
+    return canvas
@@ -0,0 +1,296 @@
+"""
+Load generator for the REST and gRPC OCR services.
+
+Drives `POST /ocr` or `AddLicenceOCR`/`AddLicencePassport` with a weighted
+mix of synthetic documents, one step per load level, and reports latency
+percentiles, error and rejection rates and throughput as a table and JSON.
+Throughput that stops growing while p95 climbs marks the saturation point.
+
+Closed loop (`--concurrency`): each virtual user sends its next request as
+soon as the previous one returns. Open loop (`--rps`): requests start on a
+fixed schedule whether or not earlier ones have finished.
+
+    python load_test.py rest --url http://localhost:5001 --concurrency 1,4,16
+    python load_test.py grpc --target localhost:50051 --rps 2,5,10 --duration 60
+    python load_test.py rest --spawn --service-workers 4 --concurrency 2,8
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from urllib.parse import urlsplit
+
+from run_benchmarks import environment, summarise
+from services import (
+    GRPC_DIR,
+    AsyncRestClient,
+    free_port,
+    grpc_ready,
+    grpc_server,
+    rest_ready,
+    rest_server,
+    wait_until_ready,
+)
+from synthetic import make_cases
+
+sys.path.insert(0, GRPC_DIR)
+
+OK, REJECTED, TIMEOUT, ERROR, DROPPED = "ok", "rejected", "timeout", "error", "dropped"
+
+
+def parse_weights(spec: str, cast=str):
+    """Parse "800=3,1600=1" (weights default to 1) into {value: weight}."""
+    weights = {}
+    for item in filter(None, spec.split(",")):
+        value, _, weight = item.partition("=")
+        weights[cast(value)] = float(weight or 1)
+    return weights
+
+
+def document_mix(sizes, classes, seed: int = 0):
+    """Synthetic documents and sampling weights for every size/class pair."""
+    cases = make_cases(seed, widths=tuple(sizes), rotations=(0,), noise_levels=(0,), blur_levels=(0,))
+    cases = [case for case in cases if case.class_name in classes]
+    weights = [sizes[case.params["width"]] * classes[case.class_name] for case in cases]
+    return cases, weights
+
+
+class Recorder:
+    """Outcomes and latencies of requests started inside the measured window."""
+
+    def __init__(self, measure_from: float):
+        self.measure_from = measure_from
+        self.latencies = []
+        self.outcomes = {}
+        self.details = {}
+
+    def record(self, started: float, seconds: float, outcome: str, detail: str = None):
+        if started < self.measure_from:
+            return
+        if outcome == OK:
+            self.latencies.append(seconds)
+        self.outcomes[outcome] = self.outcomes.get(outcome, 0) + 1
+        detail = detail or outcome
+        self.details[detail] = self.details.get(detail, 0) + 1
+
+    def results(self, elapsed: float):
+        total = sum(self.outcomes.values())
+
+        def rate(*names):
+            return round(sum(self.outcomes.get(name, 0) for name in names) / total, 4) if total else 0
+
+        return {
+            "requests": total,
+            "offered_rps": round(total / elapsed, 3),
+            "throughput": round(self.outcomes.get(OK, 0) / elapsed, 3),
+            "latency": summarise(self.latencies),
+            "error_rate": rate(ERROR, TIMEOUT, DROPPED),
+            "rejection_rate": rate(REJECTED),
+            "outcomes": self.outcomes,
+            "details": self.details,
+        }
+
+
+async def _timed(send, case, recorder: Recorder):
+    started = time.perf_counter()
+    try:
+        outcome, detail = await send(case)
+    except asyncio.TimeoutError:
+        outcome, detail = TIMEOUT, "client_timeout"
+    except Exception as e:
+        outcome, detail = ERROR, type(e).__name__
+    recorder.record(started, time.perf_counter() - started, outcome, detail)
+
+
+async def closed_loop(send, cases, weights, concurrency: int, duration: float, warmup: float, rng):
+    """`concurrency` users each keep one request in flight until time is up."""
+    started = time.perf_counter()
+    recorder = Recorder(started + warmup)
+    stop_at = started + warmup + duration
+
+    async def user():
+        while time.perf_counter() < stop_at:
+            await _timed(send, rng.choices(cases, weights)[0], recorder)
+
+    await asyncio.gather(*(user() for _ in range(concurrency)))
+    return recorder.results(duration)
+
+
+async def open_loop(send, cases, weights, rps: float, duration: float, warmup: float, rng, max_in_flight: int):
+    """Start `rps` requests per second; beyond `max_in_flight` they are dropped."""
+    started = time.perf_counter()
+    recorder = Recorder(started + warmup)
+    tasks = set()
+    interval = 1 / rps
+    for i in range(int((warmup + duration) * rps)):
+        due = started + i * interval
+        await asyncio.sleep(max(0.0, due - time.perf_counter()))
+        if len(tasks) >= max_in_flight:
+            recorder.record(due, 0.0, DROPPED)
+            continue
+        task = asyncio.ensure_future(_timed(send, rng.choices(cases, weights)[0], recorder))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+    if tasks:
+        await asyncio.wait(tasks)
+    return recorder.results(duration)
+
+
+def rest_sender(client: AsyncRestClient):
+    async def send(case):
+        status, _body = await client.ocr(case.image_bytes, case.class_name)
+        if status == 200:
+            return OK, None
+        if status == 429:
+            return REJECTED, "http_429"
+        if status == 504:
+            return TIMEOUT, "http_504"
+        return ERROR, f"http_{status}"
+
+    return send
+
+
+def grpc_sender(client):
+    import grpc
+
+    async def send(case):
+        try:
+            await client.ocr(case.image_bytes, case.class_name)
+        except grpc.RpcError as e:
+            code = e.code()
+            if code == grpc.StatusCode.RESOURCE_EXHAUSTED:
+                return REJECTED, code.name.lower()
+            if code == grpc.StatusCode.DEADLINE_EXCEEDED:
+                return TIMEOUT, code.name.lower()
+            return ERROR, code.name.lower()
+        return OK, None
+
+    return send
+
+
+async def run_steps(args, cases, weights, address):
+    """Run one load step per level against `address` and return their results."""
+    rng = random.Random(args.seed)
+    if args.service == "rest":
+        host, port = address
+        client = AsyncRestClient(host, port, timeout=args.timeout)
+        send = rest_sender(client)
+    else:
+        from ocr_client import AsyncOCRClient
+
+        # No client retries or hedging: every rejection shows up in the results.
+        client = AsyncOCRClient(address, channels=args.channels, timeout=args.timeout, retries=0, hedge_delay=0)
+        send = grpc_sender(client)
+
+    mode = "rps" if args.rps else "concurrency"
+    levels = [float(level) for level in args.rps.split(",")] if args.rps else [
+        int(level) for level in args.concurrency.split(",")
+    ]
+    steps = []
+    try:
+        for level in levels:
+            if mode == "rps":
+                result = await open_loop(send, cases, weights, level, args.duration, args.warmup, rng,
+                                         args.max_in_flight)
+            else:
+                result = await closed_loop(send, cases, weights, level, args.duration, args.warmup, rng)
+            steps.append({"mode": mode, "level": level, **result})
+            print(format_row(args.service, steps[-1]), flush=True)
+    finally:
+        await client.close()
+    return steps
+
+
+TABLE_HEADER = (
+    f"{'service':<8}{'mode':<12}{'level':>7}{'requests':>10}{'ok/s':>9}"
+    f"{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'err %':>8}{'rej %':>8}"
+)
+
+
+def format_row(service: str, step) -> str:
+    latency = step["latency"]
+
+    def ms(name):
+        return f"{latency[name] * 1000:.0f}" if name in latency else "-"
+
+    return (
+        f"{service:<8}{step['mode']:<12}{step['level']:>7g}{step['requests']:>10}{step['throughput']:>9.2f}"
+        f"{ms('p50'):>9}{ms('p95'):>9}{ms('p99'):>9}"
+        f"{step['error_rate'] * 100:>8.1f}{step['rejection_rate'] * 100:>8.1f}"
+    )
+
+
+def peak(steps):
+    """The step with the highest successful throughput."""
+    best = max(steps, key=lambda step: step["throughput"], default=None)
+    return {"level": best["level"], "throughput": best["throughput"]} if best else None
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("service", choices=("rest", "grpc"))
+    parser.add_argument("--url", default="http://localhost:5001", help="REST base URL")
+    parser.add_argument("--target", default="localhost:50051", help="gRPC host:port")
+    parser.add_argument("--spawn", action="store_true", help="start a local server instead of using --url/--target")
+    parser.add_argument("--service-workers", type=int, default=2, help="OCR_WORKERS for a --spawn server")
+    load = parser.add_mutually_exclusive_group()
+    load.add_argument("--concurrency", default="1,2,4,8", help="closed-loop users per step")
+    load.add_argument("--rps", help="open-loop request rates per step, e.g. 2,5,10")
+    parser.add_argument("--duration", type=float, default=30, help="measured seconds per step")
+    parser.add_argument("--warmup", type=float, default=5, help="unmeasured seconds before each step")
+    parser.add_argument("--max-in-flight", type=int, default=256, help="open-loop cap; excess requests are dropped")
+    parser.add_argument("--timeout", type=float, default=60, help="per-request deadline in seconds")
+    parser.add_argument("--channels", type=int, default=2, help="gRPC channels")
+    parser.add_argument("--sizes", default="800=1,1600=2,3200=1", help="image widths and their weights")
+    parser.add_argument("--classes", default="licence=1,passport=1", help="document types and their weights")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="load_report.json")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    sizes = parse_weights(args.sizes, int)
+    classes = parse_weights(args.classes)
+    cases, weights = document_mix(sizes, classes, args.seed)
+    if not cases:
+        raise SystemExit("The --sizes/--classes mix selects no documents")
+
+    print(TABLE_HEADER)
+    if args.spawn:
+        port = free_port()
+        env = {"OCR_CACHE_BACKEND": "none", "OCR_WORKERS": str(args.service_workers), "SENTRY_DSN": ""}
+        serve = rest_server(port, env) if args.service == "rest" else grpc_server(port, env)
+        address = ("127.0.0.1", port) if args.service == "rest" else f"127.0.0.1:{port}"
+        with serve:
+            steps = asyncio.run(run_steps(args, cases, weights, address))
+    else:
+        if args.service == "rest":
+            url = urlsplit(args.url)
+            if url.scheme != "http":
+                raise SystemExit("Only http:// URLs are supported")
+            address = (url.hostname, url.port or 80)
+            wait_until_ready(lambda: rest_ready(*address))
+        else:
+            address = args.target
+            wait_until_ready(lambda: grpc_ready(address))
+        steps = asyncio.run(run_steps(args, cases, weights, address))
+
+    report = {
+        "environment": environment(),
+        "config": vars(args),
+        "documents": [{"name": case.name, "bytes": len(case.image_bytes)} for case in cases],
+        "steps": steps,
+        "peak": peak(steps),
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Report written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,347 @@
+"""
+Benchmark the OCR pipeline on synthetic documents.
+
+Measures per-stage latency, throughput per worker count and peak memory
+for OCR_Model called directly, through the REST endpoint and through the
+gRPC server, and writes a JSON report checked against regression
+thresholds. Everything runs locally; no network access is needed.
+
+    python run_benchmarks.py --quick
+    python run_benchmarks.py --modes direct,workers --workers 1,2,4 --output report.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import resource
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+from services import GRPC_DIR, RestClient, free_port, grpc_server, peak_rss_mb, rest_server
+from synthetic import make_cases
+
+sys.path.insert(0, GRPC_DIR)
+
+from ocr_metrics import REGISTRY, STEP_SECONDS  # noqa: E402
+from ocr_worker import OCRExecutor, run_ocr  # noqa: E402
+
+MODES = ("direct", "workers", "rest", "grpc")
+THRESHOLDS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "thresholds.json")
+QUICK_GRID = {"widths": (800, 1600), "rotations": (0,), "noise_levels": (0, 12), "blur_levels": (0,)}
+# Services run without the result cache so repeated images are really processed.
+SERVICE_ENV = {"OCR_CACHE_BACKEND": "none", "SENTRY_DSN": ""}
+
+
+def summarise(samples):
+    """Count, mean and tail percentiles of a list of seconds."""
+    if not samples:
+        return {"count": 0}
+    values = np.asarray(samples, dtype=float)
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {
+        "count": len(samples),
+        "mean": round(float(values.mean()), 4),
+        "p50": round(float(p50), 4),
+        "p95": round(float(p95), 4),
+        "p99": round(float(p99), 4),
+        "max": round(float(values.max()), 4),
+    }
+
+
+def normalise(value) -> str:
+    return "".join(str(value or "").split()).upper()
+
+
+def is_correct(result, expected: str) -> bool:
+    data = result.get("data") if isinstance(result, dict) else result
+    return normalise(data) == normalise(expected)
+
+
+def environment():
+    """Versions and hardware the numbers were measured on."""
+    info = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "opencv": cv2.__version__,
+        "numpy": np.__version__,
+    }
+    try:
+        import pytesseract
+
+        info["tesseract"] = str(pytesseract.get_tesseract_version())
+    except Exception as e:
+        info["tesseract"] = None
+        info["tesseract_error"] = f"{type(e).__name__}: {e}"
+    return info
+
+
+def _step_seconds(drained):
+    """Per-step time recorded since the last drain, from ocr_step_seconds."""
+    return {key[0]: total for key, (_counts, total, _count) in drained.get(STEP_SECONDS.name, {}).items()}
+
+
+def traced_peak_mb(cases):
+    """Peak Python heap while reading each case once.
+
+    tracemalloc slows every allocation, so this runs as its own pass after
+    the timed ones.
+    """
+    tracemalloc.start()
+    try:
+        for case in cases:
+            try:
+                run_ocr(case.image_bytes, case.class_name)
+            except Exception:
+                pass
+        _current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    REGISTRY.drain()
+    return round(peak / 2**20, 1)
+
+
+def bench_direct(cases, repeat: int = 1):
+    """Run OCR in this process, one document at a time."""
+    REGISTRY.drain()
+    latencies, stages = [], {}
+    correct = errors = 0
+    error_types = {}
+    for _ in range(repeat):
+        for case in cases:
+            started = time.perf_counter()
+            try:
+                result = run_ocr(case.image_bytes, case.class_name)
+            except Exception as e:
+                result = None
+                errors += 1
+                error_types[type(e).__name__] = error_types.get(type(e).__name__, 0) + 1
+            latencies.append(time.perf_counter() - started)
+            correct += result is not None and is_correct(result, case.expected)
+            for step, seconds in _step_seconds(REGISTRY.drain()).items():
+                stages.setdefault(step, []).append(seconds)
+    # ru_maxrss is in KiB on Linux; read it before tracemalloc adds its own overhead
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    total = len(latencies)
+    return {
+        "latency": summarise(latencies),
+        "stages": {step: summarise(samples) for step, samples in sorted(stages.items())},
+        "accuracy": round(correct / total, 4) if total else 0,
+        "errors": errors,
+        "error_rate": round(errors / total, 4) if total else 0,
+        "error_types": error_types,
+        "python_peak_mb": traced_peak_mb(cases),
+        "peak_rss_mb": round(peak_rss, 1),
+    }
+
+
+def bench_workers(cases, worker_counts, repeat: int = 1):
+    """Throughput of the process pool for each worker count."""
+    report = {}
+    jobs = [case for _ in range(repeat) for case in cases]
+    for workers in worker_counts:
+        executor = OCRExecutor(workers=workers, queue_size=len(jobs), timeout=600)
+        try:
+            # Warm the pool so worker start-up is not counted.
+            for future in [executor.submit(sum, ()) for _ in range(workers)]:
+                future.result()
+            started = time.perf_counter()
+            submitted = [(executor.submit(run_ocr, c.image_bytes, c.class_name), time.perf_counter())
+                         for c in jobs]
+            latencies, errors = [], 0
+            for future, submitted_at in submitted:
+                try:
+                    future.result()
+                except Exception:
+                    errors += 1
+                latencies.append(time.perf_counter() - submitted_at)
+            elapsed = time.perf_counter() - started
+            rss = peak_rss_mb(os.getpid())
+        finally:
+            executor.shutdown()
+        report[str(workers)] = {
+            "throughput": round(len(jobs) / elapsed, 3),
+            "latency": summarise(latencies),
+            "errors": errors,
+            "peak_rss_mb": rss,
+        }
+    return report
+
+
+def _drive(call, cases, concurrency: int, repeat: int):
+    """Send every case `repeat` times from `concurrency` threads.
+
+    `call(case)` returns an outcome label; anything but "ok" counts as an error.
+    """
+    jobs = [case for _ in range(repeat) for case in cases]
+    latencies, outcomes = [], {}
+
+    def timed(case):
+        started = time.perf_counter()
+        try:
+            label = call(case)
+        except Exception as e:
+            label = type(e).__name__
+        return time.perf_counter() - started, label
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for seconds, label in pool.map(timed, jobs):
+            latencies.append(seconds)
+            outcomes[label] = outcomes.get(label, 0) + 1
+    elapsed = time.perf_counter() - started
+    errors = len(jobs) - outcomes.get("ok", 0)
+    return {
+        "throughput": round(len(jobs) / elapsed, 3),
+        "latency": summarise(latencies),
+        "errors": errors,
+        "error_rate": round(errors / len(jobs), 4) if jobs else 0,
+        "outcomes": outcomes,
+    }
+
+
+def bench_rest(cases, concurrency: int, workers: int, repeat: int = 1):
+    """End-to-end latency through `POST /ocr` on a local uvicorn server."""
+    port = free_port()
+    with tempfile.TemporaryDirectory() as tmp:
+        env = {**SERVICE_ENV, "OCR_WORKERS": str(workers),
+               "OCR_JOBS_PATH": os.path.join(tmp, "jobs.sqlite3")}
+        with rest_server(port, env) as server:
+            local, clients = threading.local(), []
+
+            def call(case):
+                if not hasattr(local, "client"):
+                    local.client = RestClient("127.0.0.1", port)
+                    clients.append(local.client)
+                status, _body = local.client.ocr(case.image_bytes, case.class_name)
+                return "ok" if status == 200 else f"http_{status}"
+
+            report = _drive(call, cases, concurrency, repeat)
+            report["peak_rss_mb"] = peak_rss_mb(server.pid)
+            for client in clients:
+                client.close()
+    return report
+
+
+def bench_grpc(cases, concurrency: int, workers: int, repeat: int = 1, mode: str = "aio"):
+    """End-to-end latency through the gRPC server."""
+    import grpc
+    from ocr_client import OCRClient
+
+    port = free_port()
+    env = {**SERVICE_ENV, "OCR_WORKERS": str(workers), "GRPC_MODE": mode}
+    with grpc_server(port, env) as server:
+        with OCRClient(f"127.0.0.1:{port}", retries=0, timeout=600) as client:
+
+            def call(case):
+                try:
+                    client.ocr(case.image_bytes, case.class_name)
+                except grpc.RpcError as e:
+                    return e.code().name.lower()
+                return "ok"
+
+            report = _drive(call, cases, concurrency, repeat)
+        report["peak_rss_mb"] = peak_rss_mb(server.pid)
+    return report
+
+
+def lookup(report, path: str):
+    """Value at a dotted path such as "rest.latency.p95"; KeyError if absent."""
+    value = report
+    for part in path.split("."):
+        value = value[part]
+    return value
+
+
+def check_thresholds(report, thresholds):
+    """Compare report values with {"dotted.path": {"min": x, "max": y}} bounds.
+
+    Paths under a mode that was not run are skipped; a missing value in a
+    mode that did run is a failure.
+    """
+    failures, skipped = [], []
+    for path, bounds in thresholds.items():
+        if path.split(".", 1)[0] not in report:
+            skipped.append(path)
+            continue
+        try:
+            value = lookup(report, path)
+        except (KeyError, TypeError):
+            failures.append(f"{path}: missing from report")
+            continue
+        if "min" in bounds and value < bounds["min"]:
+            failures.append(f"{path}: {value} < min {bounds['min']}")
+        if "max" in bounds and value > bounds["max"]:
+            failures.append(f"{path}: {value} > max {bounds['max']}")
+    return {"passed": not failures, "failures": failures, "skipped": skipped}
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modes", default=",".join(MODES), help="comma-separated subset of " + ", ".join(MODES))
+    parser.add_argument("--workers", default="1,2", help="worker counts for the throughput sweep")
+    parser.add_argument("--service-workers", type=int, default=2, help="OCR_WORKERS for the REST and gRPC servers")
+    parser.add_argument("--concurrency", type=int, default=4, help="client threads for REST and gRPC")
+    parser.add_argument("--grpc-mode", choices=("sync", "aio"), default="aio")
+    parser.add_argument("--repeat", type=int, default=1, help="passes over the case set")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--quick", action="store_true", help="small case grid for smoke runs")
+    parser.add_argument("--output", default="benchmark_report.json")
+    parser.add_argument("--thresholds", default=THRESHOLDS_PATH, help="JSON bounds file, or '' to skip")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    modes = [mode for mode in args.modes.split(",") if mode]
+    unknown = set(modes) - set(MODES)
+    if unknown:
+        raise SystemExit(f"Unknown modes: {', '.join(sorted(unknown))}")
+
+    cases = make_cases(args.seed, **(QUICK_GRID if args.quick else {}))
+    report = {
+        "environment": environment(),
+        "config": {**vars(args), "cases": len(cases)},
+    }
+    print(f"{len(cases)} synthetic documents, seed {args.seed}")
+    if "direct" in modes:
+        report["direct"] = bench_direct(cases, args.repeat)
+        print("direct:", json.dumps(report["direct"]["latency"]))
+    if "workers" in modes:
+        counts = [int(count) for count in args.workers.split(",")]
+        report["workers"] = bench_workers(cases, counts, args.repeat)
+        for count, result in report["workers"].items():
+            print(f"workers={count}: {result['throughput']} docs/s")
+    if "rest" in modes:
+        report["rest"] = bench_rest(cases, args.concurrency, args.service_workers, args.repeat)
+        print("rest:", json.dumps(report["rest"]["latency"]))
+    if "grpc" in modes:
+        report["grpc"] = bench_grpc(cases, args.concurrency, args.service_workers, args.repeat, args.grpc_mode)
+        print("grpc:", json.dumps(report["grpc"]["latency"]))
+
+    if args.thresholds:
+        with open(args.thresholds) as f:
+            report["thresholds"] = check_thresholds(report, json.load(f))
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Report written to {args.output}")
+
+    checked = report.get("thresholds")
+    if checked and not checked["passed"]:
+        print("Regression thresholds failed:")
+        for failure in checked["failures"]:
+            print("  " + failure)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,282 @@
+"""
+Start the REST and gRPC services as subprocesses and talk to them.
+"""
+
+import asyncio
+import http.client
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import uuid
+from contextlib import contextmanager
+
+API_ENDPOINT_DIR = os.path.abspath(
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "api_endpoint")
+)
+GRPC_DIR = os.path.join(API_ENDPOINT_DIR, "gRPC")
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_port(port: int, process=None, timeout: float = 60):
+    """Block until something accepts connections on `port`."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process is not None and process.poll() is not None:
+            raise RuntimeError(f"Server exited with code {process.returncode}")
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise TimeoutError(f"Nothing listening on port {port} after {timeout}s")
+
+
+def rest_ready(host: str, port: int) -> bool:
+    """Whether the REST service's workers are warm; raises if warm-up failed.
+
+    Servers without `/readyz` count as ready.
+    """
+    connection = http.client.HTTPConnection(host, port, timeout=5)
+    try:
+        connection.request("GET", "/readyz")
+        response = connection.getresponse()
+        payload = response.read()
+    except (OSError, http.client.HTTPException):
+        return False
+    finally:
+        connection.close()
+    if response.status == 503:
+        try:
+            warmup = json.loads(payload)
+        except ValueError:
+            return False
+        if warmup.get("status") == "failed":
+            raise RuntimeError(f"OCR warm-up failed: {warmup.get('error')}")
+    return response.status in (200, 404)
+
+
+def grpc_ready(target: str) -> bool:
+    """Whether the gRPC server's health service reports SERVING.
+
+    Without grpcio-health-checking, on either side, an open port counts as ready.
+    """
+    import grpc
+
+    try:
+        from grpc_health.v1 import health_pb2, health_pb2_grpc
+    except ImportError:
+        return True
+    with grpc.insecure_channel(target) as channel:
+        try:
+            response = health_pb2_grpc.HealthStub(channel).Check(health_pb2.HealthCheckRequest(), timeout=5)
+        except grpc.RpcError as e:
+            return e.code() == grpc.StatusCode.UNIMPLEMENTED
+    return response.status == health_pb2.HealthCheckResponse.SERVING
+
+
+def wait_until_ready(ready, process=None, timeout: float = 300):
+    """Block until `ready()` is true, so measurements never queue behind warm-up."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process is not None and process.poll() is not None:
+            raise RuntimeError(f"Server exited with code {process.returncode}")
+        if ready():
+            return
+        time.sleep(0.5)
+    raise TimeoutError(f"Server not ready after {timeout}s")
+
+
+@contextmanager
+def _serve(args, cwd, port, env, ready):
+    process = subprocess.Popen(
+        args, cwd=cwd, env={**os.environ, **env},
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_for_port(port, process)
+        wait_until_ready(ready, process)
+        yield process
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def rest_server(port: int, env=None):
+    """Run `uvicorn main:app` on `port` for the duration of the `with` block, once `/readyz` is 200."""
+    args = [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port)]
+    return _serve(args, API_ENDPOINT_DIR, port, env or {}, lambda: rest_ready("127.0.0.1", port))
+
+
+def grpc_server(port: int, env=None):
+    """Run the gRPC server on `port` for the duration of the `with` block, once it is SERVING."""
+    env = {"GRPC_PORT": str(port), "GRPC_METRICS_PORT": "0", **(env or {})}
+    return _serve([sys.executable, "ocr_server.py"], GRPC_DIR, port, env, lambda: grpc_ready(f"127.0.0.1:{port}"))
+
+
+def _children(pid: int):
+    children = []
+    for task in os.listdir(f"/proc/{pid}/task"):
+        try:
+            with open(f"/proc/{pid}/task/{task}/children") as f:
+                children.extend(int(child) for child in f.read().split())
+        except OSError:
+            pass
+    return children
+
+
+def peak_rss_mb(pid: int) -> float:
+    """Sum of peak resident memory (VmHWM) over a process and its descendants.
+
+    Linux only; returns 0 where /proc is unavailable.
+    """
+    total_kb = 0
+    pending = [pid]
+    while pending:
+        current = pending.pop()
+        try:
+            with open(f"/proc/{current}/status") as f:
+                for line in f:
+                    if line.startswith("VmHWM:"):
+                        total_kb += int(line.split()[1])
+            pending.extend(_children(current))
+        except OSError:
+            continue
+    return round(total_kb / 1024, 1)
+
+
+def encode_multipart(fields: dict, files: dict):
+    """Encode form fields and {name: (filename, bytes)} files; returns (body, content type)."""
+    boundary = uuid.uuid4().hex
+    parts = []
+    for name, value in fields.items():
+        parts.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode()
+        )
+    for name, (filename, data) in files.items():
+        parts.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; '
+            f'filename="{filename}"\r\nContent-Type: application/octet-stream\r\n\r\n'.encode()
+        )
+        parts.append(data)
+        parts.append(b"\r\n")
+    parts.append(f"--{boundary}--\r\n".encode())
+    return b"".join(parts), f"multipart/form-data; boundary={boundary}"
+
+
+class RestClient:
+    """Keep-alive HTTP client for `POST /ocr`; one per thread."""
+
+    def __init__(self, host: str, port: int, timeout: float = 60):
+        self._connection = http.client.HTTPConnection(host, port, timeout=timeout)
+
+    def ocr(self, image_bytes: bytes, class_name: str):
+        """Return (status code, parsed JSON body)."""
+        body, content_type = encode_multipart(
+            {"class_name": class_name}, {"file": ("image.jpg", image_bytes)}
+        )
+        try:
+            self._connection.request("POST", "/ocr", body, {"Content-Type": content_type})
+            response = self._connection.getresponse()
+            payload = response.read()
+        except (OSError, http.client.HTTPException):
+            self._connection.close()  # reconnect on the next request
+            raise
+        try:
+            return response.status, json.loads(payload)
+        except ValueError:
+            return response.status, None
+
+    def close(self):
+        self._connection.close()
+
+
+class AsyncRestClient:
+    """asyncio `POST /ocr` client over a pool of keep-alive HTTP/1.1 connections.
+
+    Uses only the standard library, so load tests need no extra packages.
+    """
+
+    def __init__(self, host: str, port: int, timeout: float = 60):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self._idle = []
+
+    async def _exchange(self, reader, writer, request: bytes):
+        writer.write(request)
+        await writer.drain()
+        status_line = await reader.readline()
+        if not status_line:
+            raise ConnectionResetError("Server closed the connection")
+        status = int(status_line.split()[1])
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            chunks = []
+            while True:
+                size = int((await reader.readline()).split(b";")[0], 16)
+                chunks.append(await reader.readexactly(size + 2))
+                if size == 0:
+                    break
+            payload = b"".join(chunk[:-2] for chunk in chunks)
+        else:
+            payload = await reader.readexactly(int(headers.get("content-length", 0)))
+        return status, headers, payload
+
+    async def _request(self, request: bytes):
+        # An idle connection may have been closed by the server's keep-alive
+        # timeout; retry those once on a fresh connection.
+        while True:
+            reused = bool(self._idle)
+            reader, writer = self._idle.pop() if reused else await asyncio.open_connection(self.host, self.port)
+            try:
+                status, headers, payload = await self._exchange(reader, writer, request)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                writer.close()
+                if reused:
+                    continue
+                raise
+            except BaseException:
+                writer.close()
+                raise
+            if headers.get("connection", "").lower() == "close":
+                writer.close()
+            else:
+                self._idle.append((reader, writer))
+            return status, payload
+
+    async def ocr(self, image_bytes: bytes, class_name: str):
+        """Return (status code, parsed JSON body)."""
+        body, content_type = encode_multipart(
+            {"class_name": class_name}, {"file": ("image.jpg", image_bytes)}
+        )
+        head = (
+            f"POST /ocr HTTP/1.1\r\nHost: {self.host}:{self.port}\r\n"
+            f"Content-Type: {content_type}\r\nContent-Length: {len(body)}\r\n\r\n"
+        )
+        status, payload = await asyncio.wait_for(self._request(head.encode() + body), self.timeout)
+        try:
+            return status, json.loads(payload)
+        except ValueError:
+            return status, None
+
+    async def close(self):
+        while self._idle:
+            _reader, writer = self._idle.pop()
+            writer.close()
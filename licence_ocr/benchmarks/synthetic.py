@@ -0,0 +1,141 @@
+"""
+Synthetic NRC cards and passport data pages for offline benchmarks.
+
+Every image is rendered from a seeded random generator, so a given seed
+always produces the same documents and ground truth.
+"""
+
+import itertools
+import os
+import string
+import sys
+from collections import namedtuple
+
+import cv2
+import numpy as np
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "api_endpoint")
+)
+
+from ocr_model import mrz_check_digit  # noqa: E402
+
+Case = namedtuple("Case", "name class_name expected image_bytes params")
+
+WIDTHS = (800, 1600, 3200)
+ROTATIONS = (0, 180)
+NOISE_LEVELS = (0, 12)
+BLUR_LEVELS = (0, 5)
+
+ID1_ASPECT = 85.6 / 53.98  # NRC card
+TD3_ASPECT = 125 / 88  # passport data page
+FONT = cv2.FONT_HERSHEY_DUPLEX
+MRZ_FONT = cv2.FONT_HERSHEY_SIMPLEX
+
+
+def random_nrc(rng) -> str:
+    """An NRC number such as 12/ABC(N)123456."""
+    region = int(rng.integers(1, 15))
+    township = "".join(rng.choice(list(string.ascii_uppercase), 3))
+    return f"{region}/{township}(N){int(rng.integers(0, 1_000_000)):06d}"
+
+
+def random_passport_number(rng) -> str:
+    """A passport number such as MA1234567."""
+    return "M" + str(rng.choice(list("ABCD"))) + f"{int(rng.integers(0, 10_000_000)):07d}"
+
+
+def mrz_lines(number: str, surname: str = "DOE", given: str = "JOHN", nationality: str = "MMR"):
+    """The two 44-character TD3 MRZ lines for a passport number, with check digits."""
+    line1 = f"P<{nationality}{surname}<<{given}".ljust(44, "<")[:44]
+    number = number.ljust(9, "<")
+    birth, expiry, personal = "900101", "300101", "<" * 14
+    fields = [
+        number + mrz_check_digit(number),
+        birth + mrz_check_digit(birth),
+        expiry + mrz_check_digit(expiry),
+        personal + mrz_check_digit(personal),
+    ]
+    composite = mrz_check_digit("".join(fields))
+    line2 = fields[0] + nationality + fields[1] + "M" + fields[2] + fields[3] + composite
+    return line1, line2
+
+
+def _put_lines(image, lines, top: float, scale: float, font=FONT):
+    """Draw left-aligned lines from `top` (fraction of height) downwards."""
+    height, width = image.shape[:2]
+    thickness = max(1, round(scale * 1.6))
+    y = int(height * top)
+    for line in lines:
+        cv2.putText(image, line, (int(width * 0.05), y), font, scale, (20, 20, 20), thickness, cv2.LINE_AA)
+        y += int(42 * scale)
+
+
+def render_licence(nrc: str, width: int = 1600):
+    """Render an NRC card with the number among a few other text lines."""
+    height = int(width / ID1_ASPECT)
+    image = np.full((height, width, 3), (236, 228, 214), np.uint8)
+    scale = width / 1000
+    _put_lines(image, ["REPUBLIC OF THE UNION OF MYANMAR", "CITIZENSHIP SCRUTINY CARD"], 0.12, scale)
+    _put_lines(image, [f"NRC No. {nrc}", "Name U AUNG AUNG", "Date of Birth 01-01-1990"], 0.45, scale)
+    return image
+
+
+def render_passport(number: str, width: int = 1600):
+    """Render a passport data page with a printed number and a TD3 MRZ."""
+    height = int(width / TD3_ASPECT)
+    image = np.full((height, width, 3), (242, 238, 232), np.uint8)
+    scale = width / 1100
+    _put_lines(image, ["PASSPORT", "Type P  Code MMR", f"Passport No. {number}"], 0.1, scale)
+    _put_lines(image, ["Surname DOE", "Given names JOHN", "Nationality MYANMAR"], 0.42, scale * 0.8)
+
+    # OCR-B is monospaced; draw one character per fixed-pitch cell.
+    pitch = width * 0.9 / 44
+    mrz_scale = pitch / 22
+    thickness = max(1, round(mrz_scale * 1.8))
+    for row, line in enumerate(mrz_lines(number)):
+        y = int(height * (0.84 + 0.08 * row))
+        for i, char in enumerate(line):
+            x = int(width * 0.05 + i * pitch)
+            cv2.putText(image, char, (x, y), MRZ_FONT, mrz_scale, (20, 20, 20), thickness, cv2.LINE_AA)
+    return image
+
+
+def degrade(image, rng, rotation: int = 0, noise: float = 0, blur: int = 0):
+    """Apply a photo-like rotation, Gaussian blur and sensor noise."""
+    if rotation:
+        image = cv2.rotate(image, {90: cv2.ROTATE_90_CLOCKWISE, 180: cv2.ROTATE_180,
+                                   270: cv2.ROTATE_90_COUNTERCLOCKWISE}[rotation])
+    if blur:
+        image = cv2.GaussianBlur(image, (blur, blur), 0)
+    if noise:
+        grain = rng.normal(0, noise, image.shape)
+        image = np.clip(image.astype(np.float32) + grain, 0, 255).astype(np.uint8)
+    return image
+
+
+def make_cases(
+    seed: int = 0,
+    widths=WIDTHS,
+    rotations=ROTATIONS,
+    noise_levels=NOISE_LEVELS,
+    blur_levels=BLUR_LEVELS,
+    quality: int = 90,
+):
+    """Build one licence and one passport case per combination of conditions."""
+    rng = np.random.default_rng(seed)
+    cases = []
+    grid = itertools.product(("licence", "passport"), widths, rotations, noise_levels, blur_levels)
+    for class_name, width, rotation, noise, blur in grid:
+        if class_name == "licence":
+            expected = random_nrc(rng)
+            image = render_licence(expected, width)
+        else:
+            expected = random_passport_number(rng)
+            image = render_passport(expected, width)
+        image = degrade(image, rng, rotation, noise, blur)
+        image_bytes = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, quality])[1].tobytes()
+        params = {"width": width, "rotation": rotation, "noise": noise, "blur": blur}
+        name = f"{class_name}-w{width}-r{rotation}-n{noise}-b{blur}"
+        cases.append(Case(name, class_name, expected, image_bytes, params))
+    return cases
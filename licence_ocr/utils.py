@@ -2,7 +2,12 @@
 OCR Model calls
 """
 
-from licence_ocr.api_endpoint.ocr_model import OCR_Model
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "api_endpoint"))
+
+from ocr_model import OCR_Model  # noqa: E402
 
 ocr = OCR_Model(image_path="f28c917b-7483-4249-b761-1ec60101f9c8.jpeg")
 
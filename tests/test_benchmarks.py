@@ -0,0 +1,177 @@
+"""
+Unit tests for the benchmark suite and load generator.
+"""
+
+import asyncio
+import json
+import os
+import random
+import sys
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "licence_ocr", "benchmarks"))
+)
+
+from load_test import OK, REJECTED, closed_loop, document_mix, open_loop, parse_weights  # noqa: E402
+from run_benchmarks import check_thresholds, summarise  # noqa: E402
+from services import AsyncRestClient, rest_ready, wait_until_ready  # noqa: E402
+from synthetic import make_cases, mrz_lines  # noqa: E402
+from ocr_model import OCR_Model  # noqa: E402
+
+SMALL_GRID = {"widths": (400,), "rotations": (0, 180), "noise_levels": (0, 8), "blur_levels": (0,)}
+
+
+class TestSyntheticDocuments(unittest.TestCase):
+    """Tests for the generated benchmark images."""
+
+    def test_same_seed_same_documents(self):
+        """A seed always yields byte-identical images and ground truth."""
+        first, second = make_cases(3, **SMALL_GRID), make_cases(3, **SMALL_GRID)
+        self.assertEqual(len(first), 8)
+        self.assertEqual(first, second)
+        self.assertNotEqual(
+            [case.expected for case in first], [case.expected for case in make_cases(4, **SMALL_GRID)]
+        )
+
+    def test_mrz_lines_validate(self):
+        """Rendered MRZ lines carry check digits the extractor accepts."""
+        line1, line2 = mrz_lines("MA1234567")
+        self.assertEqual((len(line1), len(line2)), (44, 44))
+        found = OCR_Model().find_mrz_passport_number(f"{line1}\n{line2}")
+        self.assertEqual(found[0], "MA1234567")
+
+
+class TestReport(unittest.TestCase):
+    """Tests for summarising samples and checking thresholds."""
+
+    def test_summarise(self):
+        """Percentiles are taken over all samples."""
+        summary = summarise([float(i) for i in range(1, 101)])
+        self.assertEqual((summary["count"], summary["max"]), (100, 100.0))
+        self.assertAlmostEqual(summary["p50"], 50.5)
+        self.assertEqual(summarise([]), {"count": 0})
+
+    def test_check_thresholds(self):
+        """Out-of-range and missing values fail; modes that were not run are skipped."""
+        report = {"direct": {"latency": {"p95": 2.0}, "accuracy": 0.9}}
+        checked = check_thresholds(report, {
+            "direct.latency.p95": {"max": 1.0},
+            "direct.accuracy": {"min": 0.8},
+            "direct.peak_rss_mb": {"max": 500},
+            "rest.latency.p95": {"max": 1.0},
+        })
+        self.assertFalse(checked["passed"])
+        self.assertEqual(checked["failures"], [
+            "direct.latency.p95: 2.0 > max 1.0", "direct.peak_rss_mb: missing from report",
+        ])
+        self.assertEqual(checked["skipped"], ["rest.latency.p95"])
+
+
+class TestLoadGenerator(unittest.TestCase):
+    """Tests for the load steps and the asyncio REST client."""
+
+    def test_document_mix(self):
+        """Each size/class pair gets the product of its weights."""
+        cases, weights = document_mix(parse_weights("400=3,600", int), parse_weights("licence"))
+        self.assertEqual([case.params["width"] for case in cases], [400, 600])
+        self.assertEqual(weights, [3.0, 1.0])
+
+    def test_closed_loop_counts_rejections(self):
+        """Rejected requests are rated separately and excluded from latency."""
+        calls = []
+
+        async def send(case):
+            calls.append(case)
+            await asyncio.sleep(0.01)
+            return (OK, None) if len(calls) % 2 else (REJECTED, "http_429")
+
+        result = asyncio.run(closed_loop(send, ["doc"], [1], 2, 0.2, 0, random.Random(0)))
+        self.assertGreater(result["requests"], 10)
+        self.assertAlmostEqual(result["rejection_rate"], 0.5, delta=0.1)
+        self.assertEqual(result["latency"]["count"], result["outcomes"][OK])
+
+    def test_open_loop_drops_past_limit(self):
+        """Requests beyond max_in_flight are dropped instead of queued."""
+
+        async def send(case):
+            await asyncio.sleep(0.3)
+            return OK, None
+
+        result = asyncio.run(open_loop(send, ["doc"], [1], 50, 0.2, 0, random.Random(0), max_in_flight=2))
+        self.assertEqual(result["outcomes"][OK], 2)
+        self.assertEqual(result["outcomes"]["dropped"], 8)
+
+    def test_async_rest_client_keeps_alive(self):
+        """Sequential requests reuse one connection and parse the JSON body."""
+        peers = []
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                peers.append(self.client_address)
+                self.rfile.read(int(self.headers["Content-Length"]))
+                body = json.dumps({"data": "12/ABC(N)123456"}).encode()
+                self.send_response(200)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+        async def run():
+            client = AsyncRestClient("127.0.0.1", server.server_port, timeout=5)
+            results = [await client.ocr(b"image", "licence") for _ in range(3)]
+            await client.close()
+            return results
+
+        try:
+            results = asyncio.run(run())
+        finally:
+            server.shutdown()
+        self.assertEqual(results[-1], (200, {"data": "12/ABC(N)123456"}))
+        self.assertEqual(len(set(peers)), 1)
+
+    def test_waits_for_readyz(self):
+        """Spawned services are measured only once /readyz turns 200; a failed warm-up stops the run."""
+        warmup = [{"status": "warming_up"}] * 2 + [{"status": "ready"}]
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                state = warmup.pop(0) if len(warmup) > 1 else warmup[0]
+                body = json.dumps(state).encode()
+                self.send_response(200 if state["status"] == "ready" else 503)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            probes = []
+
+            def ready():
+                probes.append(rest_ready("127.0.0.1", server.server_port))
+                return probes[-1]
+
+            wait_until_ready(ready, timeout=10)
+            self.assertEqual(probes, [False, False, True])
+            warmup[:] = [{"status": "failed", "error": "RuntimeError: no tesseract"}]
+            with self.assertRaises(RuntimeError):
+                rest_ready("127.0.0.1", server.server_port)
+        finally:
+            server.shutdown()
+
+
+if __name__ == "__main__":
+    unittest.main()
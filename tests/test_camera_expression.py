@@ -0,0 +1,88 @@
+"""
+Unit tests for the landmark-based smile detector.
+"""
+
+import os
+import sys
+import unittest
+
+import numpy as np
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "camera_detect", "api_endpoint"))
+)
+
+from expression import SmileDetector, mouth_features  # noqa: E402
+
+
+def mouth(width=50.0, lift=0.0, opening=6.0, mirrored=False, roll=0.0):
+    """MOUTH_LANDMARKS for a face with eye corners 90px apart, in image coordinates."""
+    points = np.array([
+        [-45.0, 0.0], [45.0, 0.0],
+        [-width / 2, 60.0 - lift], [width / 2, 60.0 - lift],
+        [0.0, 60.0 - opening / 2], [0.0, 60.0 + opening / 2],
+    ])
+    if mirrored:
+        points[:, 0] = -points[:, 0]
+    c, s = np.cos(roll), np.sin(roll)
+    return points @ np.array([[c, s], [-s, c]]) + (320.0, 200.0)
+
+
+class TestMouthFeatures(unittest.TestCase):
+    """Tests for the geometry the classifier works on."""
+
+    def test_features(self):
+        width, lift, mar = mouth_features(mouth(width=54, lift=4.5, opening=9))
+        self.assertAlmostEqual(width, 0.6)
+        self.assertAlmostEqual(lift, 0.05)
+        self.assertAlmostEqual(mar, 9 / 54)
+
+    def test_invariant_to_mirroring_and_roll(self):
+        expected = mouth_features(mouth(lift=3))
+        for points in (mouth(lift=3, mirrored=True), mouth(lift=3, roll=0.4), mouth(lift=3, mirrored=True, roll=-0.3)):
+            np.testing.assert_allclose(mouth_features(points), expected, atol=1e-9)
+
+
+class TestSmileDetector(unittest.TestCase):
+    """Tests for smile decisions against the adaptive neutral baseline."""
+
+    def test_smile_against_neutral(self):
+        detector = SmileDetector()
+        self.assertFalse(detector.update(mouth()))
+        self.assertTrue(detector.update(mouth(width=60, lift=4)))
+        self.assertFalse(detector.update(mouth()))
+
+    def test_rejects_partial_or_open_mouth(self):
+        """A wider mouth without lifted corners, or a wide open one, is not a smile."""
+        detector = SmileDetector()
+        detector.update(mouth())
+        self.assertFalse(detector.update(mouth(width=60)))
+        self.assertFalse(detector.update(mouth(width=60, lift=4, opening=45)))
+
+    def test_hysteresis(self):
+        """A slightly relaxed smile is held, so the login hold timer keeps running."""
+        detector = SmileDetector()
+        detector.update(mouth())
+        self.assertFalse(detector.update(mouth(width=54, lift=1.5)))
+        self.assertTrue(detector.update(mouth(width=60, lift=4)))
+        self.assertTrue(detector.update(mouth(width=54, lift=1.5)))
+
+    def test_baseline_adapts_to_neutral(self):
+        """Starting mid-smile, the baseline settles on the neutral mouth and smiles register."""
+        detector = SmileDetector()
+        detector.update(mouth(width=60, lift=4))
+        for _ in range(30):
+            detector.update(mouth())
+        self.assertAlmostEqual(detector.baseline[0], 50 / 90, places=2)
+        self.assertTrue(detector.update(mouth(width=60, lift=4)))
+
+    def test_baseline_frozen_when_not_frontal(self):
+        detector = SmileDetector()
+        detector.update(mouth())
+        baseline = list(detector.baseline)
+        detector.update(mouth(width=40, lift=-3), frontal=False)
+        self.assertEqual(detector.baseline, baseline)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,127 @@
+"""
+Unit tests for the camera frame pipeline and fan-out buffer.
+"""
+
+import asyncio
+import os
+import sys
+import threading
+import time
+import unittest
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "camera_detect", "api_endpoint"))
+)
+
+from frame_hub import FrameBuffer  # noqa: E402
+from frame_pipeline import DropOldestQueue, FramePipeline  # noqa: E402
+
+
+class FakeCamera:
+    """Delivers numbered frames at `fps`, then reports end of stream."""
+
+    def __init__(self, count, fps=200):
+        self.frames = iter(range(count))
+        self.interval = 1 / fps
+
+    def read(self):
+        time.sleep(self.interval)
+        frame = next(self.frames, None)
+        return frame is not None, frame
+
+
+class TestFrameBuffer(unittest.TestCase):
+    """Tests for publishing frames to many subscribers."""
+
+    def test_fan_out_from_thread(self):
+        """Every subscriber sees the frames, and slow ones skip to the latest."""
+        frames = FrameBuffer()
+
+        def produce():
+            for i in range(1, 31):
+                frames.publish(i)
+                time.sleep(0.005)
+            frames.close()
+
+        async def subscribe(delay):
+            seen, seq = [], 0
+            while True:
+                item = await frames.next(seq, timeout=2)
+                if item is None:
+                    return seen
+                seq, frame = item
+                seen.append(frame)
+                await asyncio.sleep(delay)
+
+        async def run():
+            readers = asyncio.gather(subscribe(0), subscribe(0.03))
+            await asyncio.sleep(0.05)
+            threading.Thread(target=produce).start()
+            return await readers
+
+        fast, slow = asyncio.run(run())
+        self.assertEqual(fast[-1], 30)
+        self.assertGreater(len(fast), len(slow))
+        self.assertEqual(slow, sorted(set(slow)))
+
+    def test_latest_and_timeout(self):
+        """`latest` never blocks; `next` times out when nothing new arrives."""
+        frames = FrameBuffer()
+        frames.publish(b"jpeg")
+        self.assertEqual(frames.latest(), (1, b"jpeg"))
+        with self.assertRaises(asyncio.TimeoutError):
+            asyncio.run(frames.next(1, timeout=0.05))
+
+
+class TestFramePipeline(unittest.TestCase):
+    """Tests for the capture, inference and encode stages."""
+
+    def test_drop_oldest(self):
+        """A full queue keeps the newest items and counts the dropped ones."""
+        queue = DropOldestQueue(2)
+        for i in range(5):
+            queue.put(i)
+        self.assertEqual((queue.get(), queue.get(), queue.dropped), (3, 4, 3))
+        queue.close()
+        self.assertIsNone(queue.get())
+
+    def test_slow_inference_drops_frames(self):
+        """Inference paced to the target FPS skips frames instead of queueing them."""
+        published, ended = [], threading.Event()
+
+        def process(frame):
+            time.sleep(0.01)
+            return frame
+
+        pipeline = FramePipeline(
+            FakeCamera(60).read, process, lambda frame: f"jpeg{frame}", published.append,
+            on_end=ended.set, target_fps=20,
+        )
+        pipeline.add_viewer()
+        pipeline.start()
+        self.assertTrue(ended.wait(5))
+        pipeline.stop()
+        stats = pipeline.stats()
+        self.assertEqual(stats["captured"], 60)
+        self.assertLess(len(published), 20)
+        dropped = stats["dropped_before_process"] + stats["dropped_before_encode"]
+        self.assertEqual(len(published) + dropped, 60)
+        self.assertEqual(published, sorted(published, key=lambda name: int(name[4:])))
+
+    def test_pauses_without_viewers(self):
+        """Capture stops reading once no viewer has been attached for idle_timeout."""
+        camera = FakeCamera(10_000)
+        pipeline = FramePipeline(camera.read, lambda f: f, lambda f: b"", lambda data: None, idle_timeout=0.05)
+        pipeline.start()
+        time.sleep(0.2)
+        paused_at = pipeline.stats()["captured"]
+        time.sleep(0.1)
+        self.assertEqual(pipeline.stats()["captured"], paused_at)
+        pipeline.add_viewer()
+        time.sleep(0.1)
+        self.assertGreater(pipeline.stats()["captured"], paused_at)
+        pipeline.stop()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+"""
+Unit tests for the head-pose engine, using landmarks projected from the face model.
+"""
+
+import math
+import os
+import sys
+import unittest
+from types import SimpleNamespace
+
+import cv2
+import numpy as np
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "camera_detect", "api_endpoint"))
+)
+
+from head_pose import FACE_MODEL, POSE_LANDMARKS, HeadPoseEngine, landmark_points, primary_face  # noqa: E402
+
+WIDTH, HEIGHT = 640, 480
+
+
+def project(yaw=0.0, pitch=0.0, offset=(0.0, 0.0), distance=60.0):
+    """Pixel positions of the six pose landmarks for a head turned by yaw/pitch degrees."""
+    turn = cv2.Rodrigues(np.array([0.0, math.radians(-yaw), 0.0]))[0]
+    tilt = cv2.Rodrigues(np.array([math.radians(-pitch), 0.0, 0.0]))[0]
+    rvec = cv2.Rodrigues(tilt @ turn)[0]
+    tvec = np.array([offset[0], offset[1], distance], dtype=np.float64)
+    camera = np.array([[WIDTH, 0, WIDTH / 2], [0, WIDTH, HEIGHT / 2], [0, 0, 1]], dtype=np.float64)
+    points, _ = cv2.projectPoints(FACE_MODEL, rvec, tvec, camera, None)
+    return points.reshape(-1, 2)
+
+
+class TestHeadPoseEngine(unittest.TestCase):
+    """Tests for yaw/pitch estimation and pose labels."""
+
+    def test_labels(self):
+        """Turns past the thresholds map to the login sequence's pose names."""
+        cases = [
+            ((-25, 0), "Looking Left"),
+            ((25, 0), "Looking Right"),
+            ((0, 20), "Looking Up"),
+            ((0, -20), "Unknown"),
+            ((5, 5), "Unknown"),
+        ]
+        for (yaw, pitch), label in cases:
+            engine = HeadPoseEngine(yaw_threshold=15, pitch_threshold=10)
+            (pose,) = engine.estimate([project(yaw, pitch)], WIDTH, HEIGHT)
+            self.assertEqual(pose.label, label)
+            self.assertAlmostEqual(pose.yaw, yaw, delta=0.5)
+            self.assertAlmostEqual(pose.pitch, pitch, delta=0.5)
+
+    def test_tracking_follows_motion(self):
+        """Refining from the previous frame stays accurate, including after a fast turn."""
+        engine = HeadPoseEngine()
+        rng = np.random.default_rng(0)
+        for i in range(60):
+            yaw, pitch = 20 * math.sin(i / 10), 8 * math.cos(i / 15)
+            (pose,) = engine.estimate([project(yaw, pitch) + rng.normal(0, 0.3, (6, 2))], WIDTH, HEIGHT)
+            self.assertAlmostEqual(pose.yaw, yaw, delta=4)
+            self.assertAlmostEqual(pose.pitch, pitch, delta=4)
+        (pose,) = engine.estimate([project(-40, 15)], WIDTH, HEIGHT)
+        self.assertAlmostEqual(pose.yaw, -40, delta=1)
+
+    def test_several_faces(self):
+        """Each face keeps its own track and the nearest one is the primary face."""
+        engine = HeadPoseEngine()
+        for _ in range(3):
+            near = project(-25, 0, offset=(-15, 0), distance=50)
+            far = project(25, 0, offset=(20, 0), distance=90)
+            poses = engine.estimate([far, near], WIDTH, HEIGHT)
+        self.assertEqual([pose.label for pose in poses], ["Looking Right", "Looking Left"])
+        self.assertEqual(primary_face(poses).label, "Looking Left")
+        self.assertIsNone(primary_face(engine.estimate([], WIDTH, HEIGHT)))
+
+    def test_intrinsics_cached_per_resolution(self):
+        engine = HeadPoseEngine()
+        self.assertIs(engine.camera_matrix(640, 480), engine.camera_matrix(640, 480))
+        self.assertEqual(tuple(engine.camera_matrix(1280, 720)[:2, 2]), (640, 360))
+
+    def test_landmark_points(self):
+        """Only the requested landmarks are gathered, scaled to pixels."""
+        landmarks = SimpleNamespace(
+            landmark=[SimpleNamespace(x=i / 1000, y=i / 2000, z=0.0) for i in range(468)]
+        )
+        points = landmark_points(landmarks, POSE_LANDMARKS, WIDTH, HEIGHT)
+        self.assertEqual(points.shape, (6, 2))
+        self.assertEqual(tuple(points[0]), (33 / 1000 * WIDTH, 33 / 2000 * HEIGHT))
+
+
+if __name__ == "__main__":
+    unittest.main()
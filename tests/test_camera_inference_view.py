@@ -0,0 +1,87 @@
+"""
+Unit tests for the inference view: downscaling, face crops and mapping landmarks back.
+"""
+
+import os
+import sys
+import unittest
+from types import SimpleNamespace
+
+import numpy as np
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "camera_detect", "api_endpoint"))
+)
+
+from head_pose import POSE_LANDMARKS, landmark_points  # noqa: E402
+from inference_view import InferenceFramer  # noqa: E402
+
+FRAME_W, FRAME_H = 1280, 720
+
+
+def face_points(centre=(640.0, 360.0), eye_distance=100.0):
+    """POSE_LANDMARKS in frame pixels for an upright face."""
+    x, y = centre
+    half = eye_distance / 2
+    return np.array([
+        [x - half, y - 40], [x + half, y - 40], [x, y],
+        [x - 30, y + 45], [x + 30, y + 45], [x, y + 100],
+    ])
+
+
+def detected(points, view):
+    """FaceMesh-style landmarks for frame points, normalised to the view they were found in."""
+    landmarks = [SimpleNamespace(x=0.0, y=0.0, z=0.0) for _ in range(468)]
+    for (x, y), index in zip(points, POSE_LANDMARKS):
+        landmarks[index] = SimpleNamespace(x=(x - view.origin[0]) / view.width, y=(y - view.origin[1]) / view.height, z=0.0)
+    return SimpleNamespace(landmark=landmarks)
+
+
+class TestInferenceFramer(unittest.TestCase):
+    """Tests for the image detection runs on."""
+
+    def frame(self):
+        return np.zeros((FRAME_H, FRAME_W, 3), dtype=np.uint8)
+
+    def test_downscales_whole_frame(self):
+        view = InferenceFramer(inference_width=320, crop=False).view(self.frame())
+        self.assertEqual(view.image.shape[:2], (180, 320))
+        self.assertEqual((view.origin, view.width, view.height), ((0, 0), FRAME_W, FRAME_H))
+        full = InferenceFramer(inference_width=0, crop=False).view(self.frame())
+        self.assertEqual(full.image.shape[:2], (FRAME_H, FRAME_W))
+
+    def test_landmarks_map_back_to_frame(self):
+        """Points found in a scaled crop land on the same frame pixels."""
+        framer = InferenceFramer(inference_width=320, crop=True)
+        points = face_points(centre=(900.0, 300.0))
+        for _ in range(2):
+            view = framer.view(self.frame())
+            mapped = landmark_points(detected(points, view), POSE_LANDMARKS, view.width, view.height, view.origin)
+            np.testing.assert_allclose(mapped, points)
+            framer.track(mapped, FRAME_W, FRAME_H)
+        self.assertNotEqual(view.origin, (0, 0))
+        self.assertEqual(view.image.shape[1], 320)
+
+    def test_crop_follows_face(self):
+        framer = InferenceFramer(inference_width=320, crop=True)
+        framer.track(face_points(), FRAME_W, FRAME_H)
+        x, y, w, h = framer.region
+        self.assertEqual((w, h), (500, 281))
+        self.assertTrue(x < 640 < x + w and y < 380 < y + h)
+
+        framer.track(face_points(centre=(660.0, 370.0)), FRAME_W, FRAME_H)
+        self.assertEqual(framer.region, (x, y, w, h))
+        framer.track(face_points(centre=(1100.0, 370.0)), FRAME_W, FRAME_H)
+        self.assertEqual(framer.region[0] + framer.region[2], FRAME_W)
+
+        framer.track(None, FRAME_W, FRAME_H)
+        self.assertEqual(framer.view(self.frame()).width, FRAME_W)
+
+    def test_close_face_uses_whole_frame(self):
+        framer = InferenceFramer(inference_width=320, crop=True)
+        framer.track(face_points(eye_distance=300.0), FRAME_W, FRAME_H)
+        self.assertIsNone(framer.region)
+
+
+if __name__ == "__main__":
+    unittest.main()
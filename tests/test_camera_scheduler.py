@@ -0,0 +1,126 @@
+"""
+Unit tests for the detection scheduler.
+"""
+
+import os
+import sys
+import time
+import unittest
+
+import numpy as np
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "camera_detect", "api_endpoint"))
+)
+
+from scheduler import DetectionScheduler  # noqa: E402
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def still_frame():
+    return np.full((480, 640, 3), 90, dtype=np.uint8)
+
+
+class TestDetectionScheduler(unittest.TestCase):
+    """Tests for choosing which frames get full inference."""
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.calls = []
+
+    def infer(self, frame):
+        self.calls.append(frame)
+        return f"pose{len(self.calls)}"
+
+    def scheduler(self, **kwargs):
+        options = {"every": 3, "max_staleness": 10.0, "target_fps": 0, "clock": self.clock}
+        return DetectionScheduler(**{**options, **kwargs})
+
+    def test_cadence_on_still_scene(self):
+        """A still scene is inferred every `every` frames; the rest reuse the result."""
+        scheduler = self.scheduler()
+        results = [scheduler.run(still_frame(), self.infer) for _ in range(9)]
+        self.assertEqual(len(self.calls), 3)
+        self.assertEqual(results[:4], ["pose1", "pose1", "pose1", "pose2"])
+        self.assertEqual(scheduler.stats()["reused"], 6)
+
+    def test_motion_triggers_inference(self):
+        scheduler = self.scheduler(every=100)
+        scheduler.run(still_frame(), self.infer)
+        scheduler.run(still_frame(), self.infer)
+        moved = still_frame()
+        moved[100:300, 200:400] = 220
+        self.assertEqual(scheduler.run(moved, self.infer), "pose2")
+        self.assertEqual(scheduler.run(moved, self.infer), "pose2")
+        self.assertEqual(scheduler.stats()["motion"], 1)
+
+    def test_sensor_noise_is_not_motion(self):
+        scheduler = self.scheduler(every=100)
+        rng = np.random.default_rng(0)
+        for _ in range(20):
+            noise = rng.integers(-6, 7, size=(480, 640, 3))
+            scheduler.run((still_frame() + noise).astype(np.uint8), self.infer)
+        self.assertEqual(len(self.calls), 1)
+
+    def test_max_staleness(self):
+        scheduler = self.scheduler(every=100, max_staleness=0.25)
+        scheduler.run(still_frame(), self.infer)
+        self.clock.now = 0.1
+        scheduler.run(still_frame(), self.infer)
+        self.clock.now = 0.3
+        scheduler.run(still_frame(), self.infer)
+        self.assertEqual(len(self.calls), 2)
+        self.assertEqual(scheduler.stats()["stale"], 1)
+
+    def test_staleness_overrides_stride(self):
+        """A stale result is refreshed even when the stride would skip the frame."""
+        scheduler = self.scheduler(every=100, max_staleness=0.25)
+        scheduler.run(still_frame(), self.infer)
+        scheduler.stride = 4
+        self.clock.now = 0.3
+        self.assertEqual(scheduler.run(still_frame(), self.infer), "pose2")
+        self.assertEqual(scheduler.stats()["stale"], 1)
+
+    def test_stride_follows_observed_frame_interval(self):
+        """Frames arriving slower than target_fps leave room for inference on each of them."""
+
+        def slow(frame):
+            time.sleep(0.03)
+            return self.infer(frame)
+
+        scheduler = self.scheduler(every=1, target_fps=100, max_stride=4)
+        for i in range(8):
+            self.clock.now = i * 0.2
+            scheduler.run(np.full((48, 64, 3), i * 20, dtype=np.uint8), slow)
+        self.assertEqual(scheduler.stride, 1)
+        self.assertEqual(len(self.calls), 8)
+
+    def test_stride_grows_when_inference_is_slow(self):
+        """Inference slower than the frame budget spaces runs out, even with motion."""
+
+        def slow(frame):
+            time.sleep(0.03)
+            return self.infer(frame)
+
+        scheduler = self.scheduler(every=1, target_fps=100, max_stride=4)
+        for i in range(12):
+            scheduler.run(np.full((48, 64, 3), i * 20, dtype=np.uint8), slow)
+        self.assertEqual(scheduler.stride, 4)
+        self.assertLessEqual(len(self.calls), 5)
+
+    def test_reset(self):
+        scheduler = self.scheduler()
+        scheduler.run(still_frame(), self.infer)
+        scheduler.reset()
+        self.assertEqual(scheduler.run(still_frame(), self.infer), "pose2")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,227 @@
+"""
+Unit tests for liveness sessions, the session manager and the shared model pool.
+"""
+
+import math
+import os
+import sys
+import threading
+import time
+import unittest
+from types import SimpleNamespace
+
+import cv2
+import numpy as np
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "camera_detect", "api_endpoint"))
+)
+
+from head_pose import FACE_MODEL, POSE_LANDMARKS  # noqa: E402
+from sessions import LivenessSession, ModelPool, SessionLimitError, SessionManager  # noqa: E402
+
+WIDTH, HEIGHT = 640, 480
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def face_landmarks(yaw):
+    """FaceMesh-style result for one face turned by `yaw` degrees in a 640x480 frame."""
+    rvec = np.array([0.0, math.radians(-yaw), 0.0])
+    camera = np.array([[WIDTH, 0, WIDTH / 2], [0, WIDTH, HEIGHT / 2], [0, 0, 1]], dtype=np.float64)
+    points, _ = cv2.projectPoints(FACE_MODEL, rvec, np.array([0.0, 0.0, 60.0]), camera, None)
+    landmarks = [SimpleNamespace(x=0.5, y=0.5, z=0.0) for _ in range(468)]
+    for (x, y), index in zip(points.reshape(-1, 2), POSE_LANDMARKS):
+        landmarks[index] = SimpleNamespace(x=x / WIDTH, y=y / HEIGHT, z=0.0)
+    mouth_y = (landmarks[61].y + landmarks[291].y) / 2
+    landmarks[13] = SimpleNamespace(x=landmarks[1].x, y=mouth_y - 0.005, z=0.0)
+    landmarks[14] = SimpleNamespace(x=landmarks[1].x, y=mouth_y + 0.005, z=0.0)
+    return SimpleNamespace(landmark=landmarks)
+
+
+class FakeFaceMesh:
+    def __init__(self, yaw=-25.0, delay=0.0):
+        self.yaw = yaw
+        self.delay = delay
+        self.calls = 0
+        self.resets = 0
+
+    def process(self, image):
+        self.calls += 1
+        time.sleep(self.delay)
+        return SimpleNamespace(multi_face_landmarks=[face_landmarks(self.yaw)])
+
+    def reset(self):
+        self.resets += 1
+
+
+def frame():
+    return np.zeros((HEIGHT, WIDTH, 3), dtype=np.uint8)
+
+
+class TestModelPool(unittest.TestCase):
+    """Tests for sharing FaceMesh instances between sessions."""
+
+    def test_sticky_affinity(self):
+        """Sessions get their own model back and new models are only made up to the pool size."""
+        pool = ModelPool(FakeFaceMesh, size=2)
+        with pool.acquire("a") as first:
+            with pool.acquire("b") as second:
+                self.assertIsNot(first, second)
+        for _ in range(3):
+            with pool.acquire("b") as model:
+                self.assertIs(model, second)
+            with pool.acquire("a") as model:
+                self.assertIs(model, first)
+        stats = pool.stats()
+        self.assertEqual((stats["created"], stats["sticky"]), (2, 6))
+        self.assertEqual((first.resets, second.resets), (0, 0))
+
+    def test_borrowed_model_reset(self):
+        """A model handed to another session is reset, so it detects rather than tracks."""
+        pool = ModelPool(FakeFaceMesh, size=1)
+        with pool.acquire("a") as model:
+            pass
+        with pool.acquire("a"):
+            pass
+        self.assertEqual(model.resets, 0)
+        with pool.acquire("b"):
+            pass
+        self.assertEqual(model.resets, 1)
+
+    def test_loads_outside_lock(self):
+        """Other sessions acquire and release free models while a new one is loading."""
+        loading, loaded = threading.Event(), threading.Event()
+
+        def factory():
+            if pool.stats()["created"]:
+                loading.set()
+                loaded.wait(5)
+            return FakeFaceMesh()
+
+        pool = ModelPool(factory, size=2)
+        with pool.acquire("a"):
+            pass
+
+        def load():
+            with pool.acquire("b"):
+                pass
+
+        thread = threading.Thread(target=load)
+        thread.start()
+        self.assertTrue(loading.wait(5))
+        try:
+            started = time.monotonic()
+            with pool.acquire("a"):
+                pass
+            self.assertLess(time.monotonic() - started, 1)
+        finally:
+            loaded.set()
+            thread.join()
+        self.assertEqual(pool.stats()["created"], 2)
+
+    def test_waits_when_all_busy(self):
+        pool = ModelPool(FakeFaceMesh, size=1)
+        order = []
+
+        def borrow(owner):
+            with pool.acquire(owner):
+                order.append(owner)
+                time.sleep(0.05)
+
+        threads = [threading.Thread(target=borrow, args=(owner,)) for owner in ("a", "b", "c")]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(sorted(order), ["a", "b", "c"])
+        self.assertEqual(pool.stats()["created"], 1)
+        self.assertGreaterEqual(pool.stats()["waited"], 1)
+
+
+class TestSessionManager(unittest.TestCase):
+    """Tests for session ids, the session cap and idle expiry."""
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.manager = SessionManager(ModelPool(FakeFaceMesh), max_sessions=2, idle_timeout=60, clock=self.clock)
+
+    def test_cap(self):
+        first = self.manager.create()
+        second = self.manager.create()
+        self.assertNotEqual(first.id, second.id)
+        with self.assertRaises(SessionLimitError):
+            self.manager.create()
+        self.assertTrue(self.manager.delete(first.id))
+        self.manager.create()
+        self.assertFalse(self.manager.delete("missing"))
+
+    def test_pinned_outside_cap(self):
+        """The camera session leaves the full cap to client sessions."""
+        self.manager.create("default", pinned=True)
+        self.manager.create()
+        self.manager.create()
+        with self.assertRaises(SessionLimitError):
+            self.manager.create()
+
+    def test_scheduler_budget(self):
+        """Client sessions budget by their upload interval; options can set a target rate."""
+        client = self.manager.create()
+        camera = self.manager.create("default", pinned=True, target_fps=20)
+        self.assertEqual(client.scheduler.frame_budget, 0.0)
+        self.assertAlmostEqual(camera.scheduler.frame_budget, 0.05)
+
+    def test_idle_expiry(self):
+        """Unused sessions expire, used ones stay, and pinned ones never expire."""
+        pinned = self.manager.create("default", pinned=True)
+        idle = self.manager.create()
+        self.clock.now = 61
+        self.assertEqual(self.manager.expire(), [idle.id])
+        with self.assertRaises(KeyError):
+            self.manager.get(idle.id)
+        self.assertIs(self.manager.get("default"), pinned)
+
+        used = self.manager.create()
+        self.clock.now = 100
+        self.manager.get(used.id)
+        self.clock.now = 150
+        self.assertIs(self.manager.get(used.id), used)
+
+
+class TestLivenessSession(unittest.TestCase):
+    """Tests for per-session challenge state fed with client frames."""
+
+    def test_sessions_progress_independently(self):
+        manager = SessionManager(ModelPool(lambda: FakeFaceMesh(yaw=-25)), hold_time=0)
+        looking_left, other = manager.create(), manager.create()
+        # The frame is mirrored before detection, but the fake landmarks are fixed
+        for _ in range(2):
+            status = looking_left.submit_frame(frame())
+        self.assertEqual(status["pose"], "Looking Left")
+        self.assertEqual(status["current_step"], 1)
+        self.assertEqual(other.status()["current_step"], 0)
+
+        other.reset()
+        self.assertEqual(looking_left.status()["current_step"], 1)
+        looking_left.reset()
+        self.assertEqual(looking_left.status()["current_step"], 0)
+
+    def test_frames_only_encoded_for_viewers(self):
+        session = LivenessSession("s", ModelPool(FakeFaceMesh))
+        session.submit_frame(frame())
+        self.assertEqual(session.frames.seq, 0)
+        session.viewers = 1
+        session.submit_frame(frame())
+        seq, data = session.frames.latest()
+        self.assertEqual(seq, 1)
+        self.assertTrue(data.startswith(b"\xff\xd8"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+"""
+Unit tests for decode-time image normalisation.
+"""
+
+import os
+import struct
+import sys
+import unittest
+
+import cv2
+import numpy as np
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "licence_ocr", "api_endpoint"))
+)
+
+from image_normalise import (  # noqa: E402
+    apply_lut,
+    brightness_contrast_lut,
+    decode_gray,
+    read_image_size,
+    reduction_factor,
+)
+
+
+class TestImageNormalise(unittest.TestCase):
+    """Tests for header parsing, reduced decoding and the LUT."""
+
+    def setUp(self):
+        """Build a large colour page."""
+        self.image = np.full((3000, 4000, 3), 180, np.uint8)
+
+    def test_read_image_size(self):
+        """JPEG and PNG dimensions are read from the header."""
+        for ext in (".jpg", ".png"):
+            data = cv2.imencode(ext, self.image)[1].tobytes()
+            self.assertEqual(read_image_size(data), (4000, 3000))
+        self.assertIsNone(read_image_size(b"GIF89a"))
+
+    def test_reduction_factor(self):
+        """The decoder reduction never drops below the target width."""
+        self.assertEqual(reduction_factor(4000, 1600), 2)
+        self.assertEqual(reduction_factor(8000, 1000), 8)
+        self.assertEqual(reduction_factor(1000, 1600), 1)
+
+    def test_decode_gray(self):
+        """Large uploads decode to grayscale at the target width."""
+        data = cv2.imencode(".jpg", self.image)[1].tobytes()
+        gray = decode_gray(data, target_width=1600)
+        self.assertEqual(gray.shape, (1200, 1600))
+        with self.assertRaises(ValueError):
+            decode_gray(b"\xff\xd8junk")
+
+    def test_small_images_not_upscaled(self):
+        """Pages narrower than the target width keep their size."""
+        data = cv2.imencode(".png", np.full((300, 400), 180, np.uint8))[1].tobytes()
+        self.assertEqual(decode_gray(data, target_width=1600).shape, (300, 400))
+
+    def test_exif_orientation(self):
+        """A sideways-stored portrait photo is sized and reduced by its upright width."""
+        entry = struct.pack(">HHIHH", 0x0112, 3, 1, 6, 0)
+        tiff = b"MM\x00\x2a" + struct.pack(">IH", 8, 1) + entry + struct.pack(">I", 0)
+        app1 = b"Exif\0\0" + tiff
+        jpeg = cv2.imencode(".jpg", self.image)[1].tobytes()
+        data = jpeg[:2] + b"\xff\xe1" + struct.pack(">H", len(app1) + 2) + app1 + jpeg[2:]
+        self.assertEqual(read_image_size(data), (3000, 4000))
+        self.assertEqual(decode_gray(data, target_width=1600).shape, (2133, 1600))
+
+    def test_lut_matches_blend(self):
+        """The lookup table reproduces the saturating addWeighted blend."""
+        gray = np.arange(256, dtype=np.uint8).reshape(16, 16)
+        blend = cv2.addWeighted(gray, 2, np.zeros_like(gray), 0, 10)
+        np.testing.assert_array_equal(apply_lut(gray, brightness_contrast_lut(2, 10)), blend)
+
+
+if __name__ == "__main__":
+    unittest.main()
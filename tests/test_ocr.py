@@ -5,10 +5,16 @@ Unit tests for the OCR model.
 import os
 import sys
 import unittest
-from licence_ocr.api_endpoint.ocr_model import OCR_Model
 
-sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import cv2
+import numpy as np
 
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "licence_ocr", "api_endpoint"))
+)
+
+from ocr_model import OCR_Model  # noqa: E402
+from recognizer import OCRText, PytesseractRecognizer, Recognizer, create_recognizer  # noqa: E402
 
 
 class TestLicenceOCR(unittest.TestCase):
@@ -53,5 +59,198 @@ class TestPassportOCR(unittest.TestCase):
         self.assertRegex(passport_number, r"\b[A-Z]{1,2}[0-9]{6,8}\b")
 
 
+class TestInMemoryDecode(unittest.TestCase):
+    """Tests for decoding uploads without touching the filesystem."""
+
+    def setUp(self):
+        """Encode a synthetic colour image to JPEG bytes."""
+        image = np.full((120, 200, 3), 255, np.uint8)
+        cv2.putText(image, "12/ABC", (10, 70), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 0), 2)
+        self.image_bytes = cv2.imencode(".jpg", image)[1].tobytes()
+
+    def test_preprocess_from_bytes(self):
+        """Both preprocessors accept in-memory image bytes."""
+        ocr_model = OCR_Model(image_bytes=self.image_bytes)
+        gray_img = ocr_model.preprocess_image_for_licence_ocr()
+        self.assertEqual(gray_img.shape, (120, 200))  # narrower than the target, so not upscaled
+        self.assertEqual(ocr_model.preprocess_image_for_passport_ocr().shape, (120, 200))
+
+    def test_invalid_bytes(self):
+        """Undecodable uploads raise ValueError instead of crashing in OpenCV."""
+        with self.assertRaises(ValueError):
+            OCR_Model(image_bytes=b"not an image").load_gray()
+
+
+class FakeRecognizer(Recognizer):
+    """Recognizer returning canned text, so extraction runs without tesseract."""
+
+    def __init__(self, text):
+        self.text = text
+
+    def image_to_string(self, gray_img, psm=None, whitelist=None):
+        return self.text
+
+
+class TestRecognizerBackend(unittest.TestCase):
+    """Tests for the pluggable recognizer interface."""
+
+    def test_model_uses_injected_recognizer(self):
+        """Extraction runs on whatever text the recognizer returns."""
+        gray_img = np.zeros((10, 10), np.uint8)
+        licence = OCR_Model(recognizer=FakeRecognizer("NRC 12/AB C(N)123456\n"))
+        self.assertEqual(licence.licence_ocr_model(gray_img), "12/ABC(N)123456")
+        passport = OCR_Model(recognizer=FakeRecognizer("P MA1234567 MMR"))
+        self.assertEqual(passport.passport_ocr_model(gray_img), "MA1234567")
+
+    def test_pytesseract_config(self):
+        """Recognizer options map onto tesseract command-line flags."""
+        config = PytesseractRecognizer.build_config(psm=7, whitelist="0123")
+        self.assertEqual(config, "--psm 7 -c tessedit_char_whitelist=0123")
+
+    def test_unknown_engine(self):
+        """Unknown engine names are rejected."""
+        with self.assertRaises(ValueError):
+            create_recognizer("paddle")
+
+
+class ScriptedRecognizer(Recognizer):
+    """Returns one scripted (text, confidence) reading per call."""
+
+    def __init__(self, readings):
+        self.readings = list(readings)
+        self.calls = 0
+
+    def image_to_data(self, gray_img, psm=None, whitelist=None):
+        text, confidence = self.readings[min(self.calls, len(self.readings) - 1)]
+        self.calls += 1
+        return OCRText.from_string(text, confidence)
+
+    def image_to_string(self, gray_img, psm=None, whitelist=None):
+        return self.image_to_data(gray_img, psm, whitelist).text
+
+
+class TestOCRCascade(unittest.TestCase):
+    """Tests for the cheap-first OCR cascade."""
+
+    def setUp(self):
+        """A blank page: no text regions, so the cascade starts at the full pass."""
+        self.gray_img = np.full((200, 300), 255, np.uint8)
+
+    def test_early_exit(self):
+        """A confident first match stops the cascade."""
+        recognizer = ScriptedRecognizer([("12/ABC(N)123456", 95.0)])
+        result = OCR_Model(recognizer=recognizer).licence_ocr(self.gray_img)
+        self.assertEqual(result, {"data": "12/ABC(N)123456", "confidence": 95.0, "stage": "full"})
+        self.assertEqual(recognizer.calls, 1)
+
+    def test_escalates_on_low_confidence(self):
+        """Low confidence or no match escalates to heavier stages."""
+        recognizer = ScriptedRecognizer([("12/ABC(N)123455", 30.0), ("MA1234567", 80.0)])
+        result = OCR_Model(recognizer=recognizer).passport_ocr(self.gray_img)
+        self.assertEqual(result["stage"], "full_binary")
+        self.assertEqual(result["data"], "MA1234567")
+
+    def test_returns_best_when_all_weak(self):
+        """The most confident weak match is kept when no stage is confident."""
+        recognizer = ScriptedRecognizer([("12/AB(N)111111", 40.0), ("12/AB(N)222222", 50.0)])
+        result = OCR_Model(recognizer=recognizer).licence_ocr(self.gray_img)
+        self.assertEqual(result["data"], "12/AB(N)222222")
+        self.assertEqual(result["confidence"], 50.0)
+
+
+class UpsideDownRecognizer(Recognizer):
+    """Reads the NRC only when the dark marker ends up bottom-right."""
+
+    def __init__(self, detected=None):
+        self.detected = detected
+        self.shapes = []
+
+    def image_to_string(self, gray_img, psm=None, whitelist=None):
+        self.shapes.append(gray_img.shape)
+        return "12/ABC(N)123456" if gray_img[-1, -1] < 128 else ""
+
+    def detect_rotation(self, gray_img):
+        return self.detected
+
+
+class TestOrientation(unittest.TestCase):
+    """Tests for reading rotated document photos."""
+
+    def setUp(self):
+        """A blank page with a dark square marker in the top-left corner."""
+        self.gray_img = np.full((200, 300), 255, np.uint8)
+        self.gray_img[:10, :10] = 0
+
+    def test_upright_skips_rotation(self):
+        """Upright matches report rotation 0."""
+        ocr_model = OCR_Model(recognizer=FakeRecognizer("12/ABC(N)123456"))
+        result = ocr_model.run_oriented(ocr_model.licence_ocr, self.gray_img)
+        self.assertEqual(result["rotation"], 0)
+
+    def test_finds_upside_down(self):
+        """Candidate rotations are tried until one matches."""
+        ocr_model = OCR_Model(recognizer=UpsideDownRecognizer())
+        result = ocr_model.run_oriented(ocr_model.licence_ocr, self.gray_img)
+        self.assertEqual(result["data"], "12/ABC(N)123456")
+        self.assertEqual(result["rotation"], 180)
+
+    def test_detected_rotation_first(self):
+        """Orientation detection picks the first rotation, so no other rotation is read."""
+        recognizer = UpsideDownRecognizer(detected=180)
+        ocr_model = OCR_Model(recognizer=recognizer)
+        result = ocr_model.run_oriented(ocr_model.licence_ocr, self.gray_img)
+        self.assertEqual(result["rotation"], 180)
+        self.assertNotIn((300, 200), recognizer.shapes)  # neither 90 nor 270 was read
+
+    def test_orientation_disabled(self):
+        """With orientation off, a miss stays a miss."""
+        ocr_model = OCR_Model(recognizer=UpsideDownRecognizer(detected=180), orientation=False)
+        result = ocr_model.run_oriented(ocr_model.licence_ocr, self.gray_img)
+        self.assertIsNone(result["data"])
+
+
+class CountingRecognizer(FakeRecognizer):
+    """FakeRecognizer that counts recognition passes."""
+
+    calls = 0
+
+    def image_to_string(self, gray_img, psm=None, whitelist=None):
+        self.calls += 1
+        return self.text
+
+
+class TestAutoDocumentType(unittest.TestCase):
+    """Tests for reading a document whose type the client did not give."""
+
+    def setUp(self):
+        """A blank page: the cascade starts at the full pass."""
+        self.gray_img = np.full((200, 300), 255, np.uint8)
+
+    def auto_ocr(self, text):
+        recognizer = CountingRecognizer(text)
+        result = OCR_Model(recognizer=recognizer).auto_ocr(self.gray_img)
+        self.assertEqual(recognizer.calls, 1)  # one pass serves both extractors
+        return result
+
+    def test_detects_licence(self):
+        """NRC text is reported as a licence, with O read as 0 in the number."""
+        result = self.auto_ocr("NRC 12/AB C(N)12345O\n")
+        self.assertEqual((result["document_type"], result["data"]), ("licence", "12/ABC(N)123450"))
+
+    def test_detects_passport_mrz(self):
+        """A checksummed MRZ line is reported as a passport."""
+        result = self.auto_ocr(
+            "P<MMRDOE<<JOHN<<<<<<<<<<<<<<<<<<<<<<<<<<<<<\n"
+            "MA12345672MMR8001014M3001012<<<<<<<<<<<<<<02\n"
+        )
+        self.assertEqual((result["document_type"], result["data"]), ("passport", "MA1234567"))
+
+    def test_no_match(self):
+        """Unreadable pages report no document type."""
+        result = OCR_Model(recognizer=FakeRecognizer("hello")).auto_ocr(self.gray_img)
+        self.assertIsNone(result["data"])
+        self.assertIsNone(result["document_type"])
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,129 @@
+"""
+Endpoint tests for the OCR REST service, with a fake executor in place of the worker pool.
+"""
+
+import asyncio
+import io
+import json
+import os
+import sys
+import unittest
+import zipfile
+from concurrent.futures import Future
+
+from fastapi.testclient import TestClient
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "licence_ocr", "api_endpoint"))
+)
+
+import main  # noqa: E402
+import ocr_cache  # noqa: E402
+from ocr_cache import MemoryCacheBackend, OCRCache  # noqa: E402
+
+
+class FakeExecutor:
+    """Completes every job at once with the size of the document it was given."""
+
+    workers = 2
+    timeout = 5
+
+    def submit(self, fn, image_bytes, class_name):
+        future = Future()
+        future.set_result({"data": {"size": len(image_bytes)}, "confidence": 90.0})
+        return future
+
+
+class TestBatchEndpoint(unittest.TestCase):
+    """Tests for /ocr/batch, which streams results after the request has been read."""
+
+    def setUp(self):
+        main.ocr_executor["OCRExecutor"] = FakeExecutor()
+        self.cache = ocr_cache._cache
+        ocr_cache._cache = OCRCache(MemoryCacheBackend())
+        self.client = TestClient(main.app)
+
+    def tearDown(self):
+        main.ocr_executor.clear()
+        ocr_cache._cache = self.cache
+
+    def lines(self, response):
+        self.assertEqual(response.status_code, 200)
+        return sorted((json.loads(line) for line in response.text.splitlines()), key=lambda line: line["index"])
+
+    def test_files(self):
+        """Every uploaded file is read in full, even though the response streams."""
+        files = [("files", ("a.jpg", b"a" * 10, "image/jpeg")), ("files", ("b.jpg", b"b" * 20, "image/jpeg"))]
+        response = self.client.post("/ocr/batch", files=files, data={"class_name": ["licence", "passport"]})
+        lines = self.lines(response)
+        self.assertEqual([(line["filename"], line["data"]["size"]) for line in lines], [("a.jpg", 10), ("b.jpg", 20)])
+        self.assertEqual(lines[1]["class_name"], "passport")
+
+    def test_archive(self):
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, "w") as archive:
+            archive.writestr("passport/p.jpg", b"p" * 30)
+            archive.writestr("l.jpg", b"l" * 40)
+        files = {"archive": ("docs.zip", buffer.getvalue(), "application/zip")}
+        lines = self.lines(self.client.post("/ocr/batch", files=files, data={"class_name": "licence"}))
+        self.assertEqual(
+            [(line["class_name"], line["data"]["size"]) for line in lines], [("passport", 30), ("licence", 40)]
+        )
+
+    def test_bad_archive(self):
+        files = {"archive": ("docs.zip", b"not an archive", "application/zip")}
+        response = self.client.post("/ocr/batch", files=files, data={"class_name": "licence"})
+        self.assertEqual(response.status_code, 400)
+
+
+class WarmingExecutor:
+    """Stands in for the worker pool's warm-up, checking /readyz while it runs."""
+
+    def __init__(self, client, error=None):
+        self.client = client
+        self.error = error
+        self.during = None
+
+    async def warm_up_async(self):
+        self.during = self.client.get("/readyz")
+        if self.error is not None:
+            raise self.error
+        return {123: {"licence": 0.5, "passport": 0.4}}
+
+
+class TestReadiness(unittest.TestCase):
+    """Tests for /readyz as the worker pool warms up."""
+
+    def setUp(self):
+        self.warmup = dict(main.ocr_warmup)
+        main.ocr_warmup.clear()
+        main.ocr_warmup.update(status="starting")
+        self.client = TestClient(main.app)
+
+    def tearDown(self):
+        main.ocr_warmup.clear()
+        main.ocr_warmup.update(self.warmup)
+
+    def test_ready_after_warm_up(self):
+        """503 before and during warm-up, 200 with worker timings once it is done."""
+        self.assertEqual(self.client.get("/readyz").status_code, 503)
+        executor = WarmingExecutor(self.client)
+        asyncio.run(main.warm_up(executor))
+        self.assertEqual(executor.during.status_code, 503)
+        self.assertEqual(executor.during.json()["status"], "warming_up")
+        response = self.client.get("/readyz")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["workers"], {"123": {"licence": 0.5, "passport": 0.4}})
+        self.assertEqual(self.client.get("/healthz").status_code, 200)
+
+    def test_failed_warm_up(self):
+        """A failed warm-up keeps the service unready and reports why."""
+        asyncio.run(main.warm_up(WarmingExecutor(self.client, RuntimeError("tesseract is not installed"))))
+        response = self.client.get("/readyz")
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.json()["status"], "failed")
+        self.assertEqual(response.json()["error"], "RuntimeError: tesseract is not installed")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,96 @@
+"""
+Unit tests for batch OCR archive handling.
+"""
+
+import asyncio
+import io
+import json
+import os
+import sys
+import tarfile
+import unittest
+import zipfile
+from concurrent.futures import Future
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "licence_ocr", "api_endpoint"))
+)
+
+from ocr_batch import iter_archive, stream_batch  # noqa: E402
+
+
+class TestIterArchive(unittest.TestCase):
+    """Tests for reading batch items out of uploaded archives."""
+
+    def test_zip_class_from_folder(self):
+        """Members under passport/ or licence/ take that class, others the default."""
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, "w") as archive:
+            archive.writestr("passport/a.jpg", b"a")
+            archive.writestr("scans/b.jpg", b"b")
+        items = list(iter_archive(buffer, "batch.zip", "licence"))
+        self.assertEqual(
+            items, [("passport/a.jpg", "passport", b"a"), ("scans/b.jpg", "licence", b"b")]
+        )
+
+    def test_tar_archive(self):
+        """Compressed tar archives are read member by member."""
+        buffer = io.BytesIO()
+        with tarfile.open(fileobj=buffer, mode="w:gz") as archive:
+            info = tarfile.TarInfo("licence/c.jpg")
+            info.size = 1
+            archive.addfile(info, io.BytesIO(b"c"))
+        items = list(iter_archive(buffer, "batch.tar.gz", "passport"))
+        self.assertEqual(items, [("licence/c.jpg", "licence", b"c")])
+
+    def test_rejects_unknown_format(self):
+        """Non-archive uploads fail before streaming starts."""
+        with self.assertRaises(ValueError):
+            iter_archive(io.BytesIO(b"junk"), "batch.zip", "licence")
+
+    def test_zip_size_limits(self):
+        """Zips over the per-image or total uncompressed limit are rejected before streaming."""
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+            archive.writestr("a.jpg", b"\0" * 1000)
+            archive.writestr("b.jpg", b"\0" * 1000)
+        self.assertLess(len(buffer.getvalue()), 1000)
+        with self.assertRaises(ValueError):
+            iter_archive(buffer, "batch.zip", "licence", max_image=999)
+        with self.assertRaises(ValueError):
+            iter_archive(buffer, "batch.zip", "licence", max_total=1999)
+        self.assertEqual(len(list(iter_archive(buffer, "batch.zip", "licence", max_total=2000))), 2)
+
+    def test_tar_size_limit_ends_batch(self):
+        """A tar member over the limit is never read and ends the batch with an error line."""
+        buffer = io.BytesIO()
+        with tarfile.open(fileobj=buffer, mode="w:gz") as archive:
+            for name, size in (("a.jpg", 10), ("b.jpg", 1000), ("c.jpg", 10)):
+                info = tarfile.TarInfo(name)
+                info.size = size
+                archive.addfile(info, io.BytesIO(b"\0" * size))
+        items = iter_archive(buffer, "batch.tar.gz", "licence", max_image=100)
+        self.assertEqual(next(items)[0], "a.jpg")
+        with self.assertRaises(ValueError):
+            next(items)
+
+        class Executor:
+            workers = 1
+            timeout = 5
+
+            def submit(self, fn, image_bytes, class_name):
+                future = Future()
+                future.set_result({"data": None})
+                return future
+
+        async def collect():
+            items = iter_archive(buffer, "batch.tar.gz", "licence", max_image=100)
+            return [json.loads(line) async for line in stream_batch(Executor(), items)]
+
+        lines = sorted(asyncio.run(collect()), key=lambda line: line["index"])
+        self.assertEqual([line["index"] for line in lines], [0, 1])
+        self.assertIn("over the 100 byte limit", lines[1]["error"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,129 @@
+"""
+Unit tests for the OCR result cache.
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "licence_ocr", "api_endpoint"))
+)
+
+from ocr_cache import (  # noqa: E402
+    MISSING,
+    DiskCacheBackend,
+    MemoryCacheBackend,
+    OCRCache,
+    cache_key,
+)
+
+
+class TestMemoryCacheBackend(unittest.TestCase):
+    """Tests for the in-process LRU backend."""
+
+    def test_lru_eviction(self):
+        """The least recently used entry is evicted past max_entries."""
+        backend = MemoryCacheBackend(ttl=60, max_entries=2)
+        backend.set("a", 1)
+        backend.set("b", 2)
+        backend.get("a")
+        backend.set("c", 3)
+        self.assertIs(backend.get("b"), MISSING)
+        self.assertEqual(backend.get("a"), 1)
+
+    def test_ttl_and_memory_cap(self):
+        """Entries expire after the TTL and the byte cap bounds the size."""
+        backend = MemoryCacheBackend(ttl=0.01, max_entries=100, max_bytes=40)
+        backend.set("a", "x" * 10)
+        backend.set("b", "y" * 10)
+        self.assertLessEqual(backend.size, 40)
+        time.sleep(0.02)
+        self.assertIs(backend.get("b"), MISSING)
+
+
+class TestDiskCacheBackend(unittest.TestCase):
+    """Tests for the SQLite backend."""
+
+    def test_shared_between_instances(self):
+        """Two backends on the same file see each other's entries."""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "cache.sqlite3")
+            DiskCacheBackend(path, ttl=60).set("k", {"data": None})
+            self.assertEqual(DiskCacheBackend(path, ttl=60).get("k"), {"data": None})
+
+
+class TestOCRCache(unittest.TestCase):
+    """Tests for counters and single-flight deduplication."""
+
+    def test_key_includes_doc_type(self):
+        """The same image under two document types gets two keys."""
+        self.assertNotEqual(cache_key(b"img", "licence"), cache_key(b"img", "passport"))
+
+    def test_single_flight_threads(self):
+        """Concurrent identical lookups run compute once."""
+        cache = OCRCache(MemoryCacheBackend())
+        calls = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.1)
+            return "12/ABC(N)123456"
+
+        threads = [
+            threading.Thread(target=cache.get_or_compute, args=("k", compute))
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(cache.get_or_compute("k", compute), "12/ABC(N)123456")
+        self.assertEqual(cache.stats()["hits"], 1)
+
+    def test_single_flight_async(self):
+        """Concurrent identical coroutines share one computation."""
+        cache = OCRCache(MemoryCacheBackend())
+        calls = []
+
+        async def compute():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return "MA1234567"
+
+        async def main():
+            return await asyncio.gather(
+                *(cache.get_or_compute_async("k", compute) for _ in range(5))
+            )
+
+        self.assertEqual(asyncio.run(main()), ["MA1234567"] * 5)
+        self.assertEqual(len(calls), 1)
+
+    def test_cancelled_leader_async(self):
+        """Cancelling the first caller does not cancel the callers sharing its result."""
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = OCRCache(DiskCacheBackend(os.path.join(tmp, "cache.sqlite3")))
+
+            async def compute():
+                await asyncio.sleep(0.05)
+                return {"data": "MA1234567"}
+
+            async def main():
+                leader = asyncio.ensure_future(cache.get_or_compute_async("k", compute))
+                await asyncio.sleep(0)
+                follower = asyncio.ensure_future(cache.get_or_compute_async("k", compute))
+                await asyncio.sleep(0.01)
+                leader.cancel()
+                return await follower
+
+            self.assertEqual(asyncio.run(main()), {"data": "MA1234567"})
+            self.assertEqual(cache.get("k"), {"data": "MA1234567"})
+
+
+if __name__ == "__main__":
+    unittest.main()
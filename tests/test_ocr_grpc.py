@@ -0,0 +1,298 @@
+"""
+Unit tests for the gRPC servicers.
+"""
+
+import asyncio
+import io
+import os
+import sys
+import threading
+import time
+import unittest
+from concurrent import futures
+
+import grpc
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "licence_ocr", "api_endpoint", "gRPC"))
+)
+
+import ocr_pb2  # noqa: E402
+import ocr_pb2_grpc  # noqa: E402
+from chunked_upload import UploadBuffer, iter_upload, receive_upload  # noqa: E402
+from ocr_client import AsyncOCRClient, OCRClient, _BaseClient  # noqa: E402
+from ocr_server import AsyncNrcOcrService, error_status, warm_up_threads  # noqa: E402
+import ocr_cache  # noqa: E402
+from ocr_cache import MemoryCacheBackend, OCRCache, cache_key  # noqa: E402
+from ocr_worker import OCRQueueFullError, run_ocr  # noqa: E402
+
+
+class FakeExecutor:
+    """Runs the OCR job in the event loop instead of a process pool."""
+
+    def __init__(self, results):
+        self.results = results
+        self.max_in_flight = 0
+        self.in_flight = 0
+
+    async def run(self, fn, image_bytes, class_name, timeout=None):
+        self.fn = fn
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+        result = self.results[image_bytes]
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+
+async def _requests(messages):
+    for message in messages:
+        yield message
+
+
+class TestErrorStatus(unittest.TestCase):
+    """Tests for mapping pipeline errors onto status codes."""
+
+    def test_mapping(self):
+        """Each error type maps to a distinct status."""
+        self.assertEqual(error_status(ValueError()), grpc.StatusCode.INVALID_ARGUMENT)
+        self.assertEqual(error_status(OCRQueueFullError()), grpc.StatusCode.RESOURCE_EXHAUSTED)
+        self.assertEqual(error_status(TimeoutError()), grpc.StatusCode.DEADLINE_EXCEEDED)
+        self.assertEqual(error_status(RuntimeError()), grpc.StatusCode.INTERNAL)
+
+
+class TestStreamDocumentOCR(unittest.TestCase):
+    """Tests for the asyncio streaming RPC."""
+
+    def test_correlation_ids_and_errors(self):
+        """Every request gets a response carrying its id; failures set `error`."""
+        executor = FakeExecutor(
+            {
+                b"grpc-stream-a": {"data": "12/ABC(N)123456", "confidence": 91.0},
+                b"grpc-stream-b": ValueError("Image could not be decoded."),
+                b"grpc-stream-c": {"data": "MA1234567", "confidence": 88.0},
+            }
+        )
+        messages = [
+            ocr_pb2.AddDocumentOCR(correlation_id=image.decode(), class_name="licence", image=image)
+            for image in executor.results
+        ]
+
+        async def collect():
+            service = AsyncNrcOcrService(executor)
+            return [r async for r in service.StreamDocumentOCR(_requests(messages), None)]
+
+        responses = {r.correlation_id: r for r in asyncio.run(collect())}
+        self.assertEqual(len(responses), 3)
+        self.assertEqual(responses["grpc-stream-a"].output, "12/ABC(N)123456")
+        self.assertEqual(responses["grpc-stream-b"].error, "Image could not be decoded.")
+        self.assertEqual(responses["grpc-stream-c"].output, "MA1234567")
+        self.assertGreater(executor.max_in_flight, 1)  # documents overlap
+
+
+class TestUnaryOCR(unittest.TestCase):
+    """Tests for the unary RPCs on the shared OCR pipeline."""
+
+    def test_runs_worker_pipeline(self):
+        """The REST pipeline runs in the pool and the RPC answers with its data."""
+        executor = FakeExecutor({b"grpc-unary": {"data": "MA1234567", "confidence": 88.0, "stage": "full"}})
+
+        class Context:
+            def time_remaining(self):
+                return 5
+
+        async def call():
+            service = AsyncNrcOcrService(executor)
+            return await service.AddLicencePassport(ocr_pb2.AddLICENCEPASSPORT(passport=b"grpc-unary"), Context())
+
+        self.assertEqual(asyncio.run(call()).output_nrc, "MA1234567")
+        self.assertIs(executor.fn, run_ocr)
+
+    def test_shares_rest_cache_entries(self):
+        """A document already read through REST is answered from the cache."""
+        cache = OCRCache(MemoryCacheBackend())
+        cache.set(cache_key(b"grpc-rest-retry", "licence"), {"data": "12/ABC(N)123456", "confidence": 90.0})
+        previous, ocr_cache._cache = ocr_cache._cache, cache
+        self.addCleanup(setattr, ocr_cache, "_cache", previous)
+        executor = FakeExecutor({})
+
+        async def call():
+            service = AsyncNrcOcrService(executor)
+            return await service.ocr_document(b"grpc-rest-retry", "licence")
+
+        self.assertEqual(asyncio.run(call())["data"], "12/ABC(N)123456")
+        self.assertFalse(hasattr(executor, "fn"))
+
+
+class TestSyncWarmUp(unittest.TestCase):
+    """Tests for warming the sync server's RPC threads."""
+
+    def test_every_thread_warmed(self):
+        """Each RPC thread runs one warm-up, so each gets its own engine."""
+        threads = set()
+        pool = futures.ThreadPoolExecutor(max_workers=3)
+        self.addCleanup(pool.shutdown)
+        warm_up_threads(pool, 3, lambda image, class_name: threads.add(threading.get_ident()), timeout=5)
+        self.assertEqual(len(threads), 3)
+
+
+class TestChunkedUpload(unittest.TestCase):
+    """Tests for reassembling client-streamed uploads."""
+
+    def test_round_trip(self):
+        """Chunks are reassembled into the original image with its header."""
+        image = bytes(range(256)) * 100
+        header, buffer = receive_upload(iter_upload(image, "passport", "id-1", chunk_size=1000))
+        self.assertEqual(bytes(buffer), image)
+        self.assertEqual((header.class_name, header.correlation_id), ("passport", "id-1"))
+        self.assertEqual(header.total_size, len(image))
+
+    def test_file_objects(self):
+        """In-memory files announce their remaining size; unseekable streams send it as unknown."""
+        image = bytes(range(256)) * 10
+        source = io.BytesIO(b"skip" + image)
+        source.seek(4)
+        header, buffer = receive_upload(iter_upload(source, "licence", chunk_size=1000))
+        self.assertEqual((header.total_size, bytes(buffer)), (len(image), image))
+
+        reader, writer = os.pipe()
+        os.write(writer, image)
+        os.close(writer)
+        with os.fdopen(reader, "rb", buffering=0) as pipe:
+            header, buffer = receive_upload(iter_upload(pipe, "licence", chunk_size=1000))
+        self.assertEqual((header.total_size, bytes(buffer)), (0, image))
+
+    def test_rejects_oversized(self):
+        """Uploads past the limit fail, whether announced or not."""
+        with self.assertRaises(ValueError):
+            UploadBuffer(total_size=11, max_bytes=10)
+        upload = UploadBuffer(max_bytes=10)
+        upload.write(b"12345")
+        with self.assertRaises(ValueError):
+            upload.write(b"123456")
+
+    def test_rejects_truncated_and_headerless(self):
+        """Short uploads and streams without a header are invalid."""
+        chunks = list(iter_upload(b"abcdef", "licence", chunk_size=2))
+        with self.assertRaises(ValueError):
+            receive_upload(chunks[:-1])
+        with self.assertRaises(ValueError):
+            receive_upload(chunks[1:])
+
+
+class FlakyService(ocr_pb2_grpc.nrc_ocr_serviceServicer):
+    """Fails the first `failures` calls, and stalls the first call for `stall` seconds."""
+
+    def __init__(self, failures=0, stall=0.0):
+        self.failures = failures
+        self.stall = stall
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def AddLicenceOCR(self, request, context):
+        with self.lock:
+            self.calls += 1
+            call = self.calls
+        if call <= self.failures:
+            context.abort(grpc.StatusCode.UNAVAILABLE, "try again")
+        if call == 1 and self.stall:
+            time.sleep(self.stall)
+        if request.licence == b"bad":
+            context.abort(grpc.StatusCode.INVALID_ARGUMENT, "Image could not be decoded.")
+        return ocr_pb2.AddOutputNRC(output_nrc=f"NRC-{request.licence.decode()}")
+
+
+class FailingHedgeService(FlakyService):
+    """Stalls the first call and fails the second, like a hedge landing on a sick server."""
+
+    def AddLicenceOCR(self, request, context):
+        with self.lock:
+            self.calls += 1
+            call = self.calls
+        if call == 2:
+            context.abort(grpc.StatusCode.UNAVAILABLE, "try again")
+        time.sleep(self.stall if call == 1 else 0)
+        return ocr_pb2.AddOutputNRC(output_nrc=f"NRC-{request.licence.decode()}")
+
+
+class TestOCRClient(unittest.TestCase):
+    """Tests for the retrying, hedging client library."""
+
+    def serve(self, service):
+        server = grpc.server(futures.ThreadPoolExecutor(max_workers=8))
+        ocr_pb2_grpc.add_nrc_ocr_serviceServicer_to_server(service, server)
+        port = server.add_insecure_port("127.0.0.1:0")
+        server.start()
+        self.addCleanup(server.stop, 0)
+        return f"127.0.0.1:{port}"
+
+    def test_retries_unavailable(self):
+        """Transient errors are retried within the deadline."""
+        service = FlakyService(failures=2)
+        with OCRClient(self.serve(service), retries=3, timeout=5) as client:
+            self.assertEqual(client.licence(b"1"), "NRC-1")
+        self.assertEqual(service.calls, 3)
+
+    def test_does_not_retry_invalid_argument(self):
+        """Permanent errors surface immediately."""
+        service = FlakyService()
+        with OCRClient(self.serve(service), timeout=5) as client:
+            with self.assertRaises(grpc.RpcError) as raised:
+                client.licence(b"bad")
+        self.assertEqual(raised.exception.code(), grpc.StatusCode.INVALID_ARGUMENT)
+        self.assertEqual(service.calls, 1)
+
+    def test_hedges_slow_attempt(self):
+        """A stalled attempt is overtaken by its hedge."""
+        target = self.serve(FlakyService(stall=2.0))
+        with OCRClient(target, hedge_delay=0.1, timeout=5) as client:
+            started = time.monotonic()
+            self.assertEqual(client.licence(b"1"), "NRC-1")
+        self.assertLess(time.monotonic() - started, 1.5)
+
+    def test_one_hedge_per_attempt(self):
+        """A failed hedge is not replaced while the first call is still running."""
+        service = FailingHedgeService(stall=0.5)
+        target = self.serve(service)
+
+        async def read_async():
+            async with AsyncOCRClient(target, hedge_delay=0.1, retries=0, timeout=5) as client:
+                return await client.licence(b"1")
+
+        self.assertEqual(asyncio.run(read_async()), "NRC-1")
+        self.assertEqual(service.calls, 2)
+
+    def test_no_hedge_past_deadline(self):
+        """No hedge is sent when the deadline runs out before the hedge delay."""
+        service = FlakyService(stall=1.0)
+        with OCRClient(self.serve(service), hedge_delay=0.5, timeout=0.3) as client:
+            with self.assertRaises(grpc.RpcError) as raised:
+                client.licence(b"1")
+        self.assertEqual(raised.exception.code(), grpc.StatusCode.DEADLINE_EXCEEDED)
+        self.assertEqual(service.calls, 1)
+
+    def test_base_client_is_abstract(self):
+        with self.assertRaises(TypeError):
+            _BaseClient()
+
+    def test_ocr_many_keeps_order(self):
+        """Sync and async ocr_many return results in input order."""
+        target = self.serve(FlakyService())
+        documents = [(str(i).encode(), "licence") for i in range(6)] + [(b"bad", "licence")]
+        expected = [f"NRC-{i}" for i in range(6)]
+        with OCRClient(target) as client:
+            results = client.ocr_many(documents, return_exceptions=True)
+        self.assertEqual(results[:6], expected)
+        self.assertIsInstance(results[6], grpc.RpcError)
+
+        async def read_async():
+            async with AsyncOCRClient(target, hedge_delay=0.5) as client:
+                return await client.ocr_many(documents[:6])
+
+        self.assertEqual(asyncio.run(read_async()), expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,178 @@
+"""
+Unit tests for the durable OCR job queue.
+"""
+
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "licence_ocr", "api_endpoint"))
+)
+
+from ocr_jobs import JobStore, OCRJobRunner, validate_callback_url  # noqa: E402
+
+
+class FakeExecutor:
+    """Returns a canned result, or raises for images starting with b"bad"."""
+
+    async def run(self, fn, image_bytes, class_name, timeout=None):
+        if image_bytes.startswith(b"bad"):
+            raise ValueError("Image could not be decoded.")
+        return {"data": image_bytes.decode(), "confidence": 90.0, "stage": "roi", "rotation": 0}
+
+
+class TestJobStore(unittest.TestCase):
+    """Tests for the SQLite job table."""
+
+    def setUp(self):
+        """Open a store in a throwaway directory."""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "jobs.sqlite3")
+        self.store = JobStore(self.path, lease=60)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_claim_in_order_once(self):
+        """Jobs are claimed oldest first, and each only once."""
+        first = self.store.enqueue(b"a", "licence")
+        second = self.store.enqueue(b"b", "passport")
+        self.assertEqual(self.store.claim()["id"], first)
+        self.assertEqual(self.store.claim()["id"], second)
+        self.assertIsNone(self.store.claim())
+
+    def test_survives_restart(self):
+        """Queued jobs, and jobs whose lease ran out, are picked up by a new store."""
+        queued = self.store.enqueue(b"a", "licence")
+        JobStore(self.path, lease=-1).claim()  # a worker that died mid-job
+        reopened = JobStore(self.path, lease=60)
+        job = reopened.claim()
+        self.assertEqual((job["id"], job["image"], job["attempts"]), (queued, b"a", 2))
+
+    def test_complete_drops_image(self):
+        """Finished jobs keep their result but not the upload."""
+        job_id = self.store.enqueue(b"a", "licence")
+        self.store.claim()
+        self.store.complete(job_id, {"data": "x"})
+        job = self.store.get(job_id)
+        self.assertEqual((job["status"], job["result"]), ("done", {"data": "x"}))
+        image = self.store._connect().execute(
+            "SELECT image FROM ocr_jobs WHERE id = ?", (job_id,)
+        ).fetchone()[0]
+        self.assertIsNone(image)
+
+    def test_callback_validation(self):
+        """Only http(s) callbacks on allowed hosts are accepted."""
+        validate_callback_url("https://kyc.internal/hook", allowed_hosts={"kyc.internal"})
+        with self.assertRaises(ValueError):
+            validate_callback_url("file:///etc/passwd")
+        with self.assertRaises(ValueError):
+            validate_callback_url("http://evil.example/hook", allowed_hosts={"kyc.internal"})
+
+    def test_callback_internal_addresses(self):
+        """Without an allow-list, only hosts with public addresses are accepted."""
+        validate_callback_url("https://93.184.216.34/hook", allowed_hosts=set())
+        for url in (
+            "http://127.0.0.1:8000/hook",
+            "http://10.0.0.5/hook",
+            "http://192.168.1.1/hook",
+            "http://169.254.169.254/latest/meta-data",
+            "http://[::1]/hook",
+            "http://localhost/hook",
+        ):
+            with self.assertRaises(ValueError, msg=url):
+                validate_callback_url(url, allowed_hosts=set())
+
+    def test_release_backoff(self):
+        """A job released with a delay is not claimed again until it has passed."""
+        job_id = self.store.enqueue(b"a", "licence")
+        self.store.claim()
+        self.store.release(job_id, delay=60)
+        self.assertIsNone(self.store.claim())
+        self.store.release(job_id, delay=0)
+        self.assertEqual(self.store.claim()["id"], job_id)
+
+
+class TestOCRJobRunner(unittest.TestCase):
+    """Tests for draining the queue in the background."""
+
+    def setUp(self):
+        """Start a local webhook receiver."""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = JobStore(os.path.join(self.tmp.name, "jobs.sqlite3"))
+        self.received = []
+        received = self.received
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                received.append(json.loads(self.rfile.read(int(self.headers["Content-Length"]))))
+                self.send_response(204)
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        self.server = HTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.callback_url = f"http://127.0.0.1:{self.server.server_port}/hook"
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.tmp.cleanup()
+
+    def test_drains_jobs_and_calls_back(self):
+        """Queued jobs complete or fail, and callbacks receive the finished job."""
+        good = self.store.enqueue(b"12/ABC(N)123456", "licence", self.callback_url)
+        bad = self.store.enqueue(b"bad", "licence")
+
+        async def drain():
+            runner = OCRJobRunner(
+                self.store, FakeExecutor(), poll_interval=0.05, webhook_hosts={"127.0.0.1"}
+            )
+            runner.start()
+            deadline = time.monotonic() + 5
+            while time.monotonic() < deadline:
+                job = self.store.get(good)
+                if job["callback_status"] and self.store.get(bad)["status"] == "failed":
+                    break
+                await asyncio.sleep(0.05)
+            await asyncio.sleep(0.1)
+            await runner.stop()
+            return runner.counts
+
+        self.assertEqual(asyncio.run(drain()), {"done": 1, "failed": 1})
+        job = self.store.get(good)
+        self.assertEqual(job["status"], "done")
+        self.assertEqual(job["result"]["data"], "12/ABC(N)123456")
+        self.assertEqual(job["callback_status"], "delivered")
+        self.assertEqual(self.received[0]["id"], good)
+        self.assertEqual(self.store.get(bad)["error"], "Image could not be decoded.")
+
+    def test_redelivers_after_restart(self):
+        """Finished jobs whose callback was never posted are delivered on the next start."""
+        job_id = self.store.enqueue(b"12/ABC(N)123456", "licence", self.callback_url)
+        self.store.claim()
+        self.store.complete(job_id, {"data": "12/ABC(N)123456"})  # stopped before the callback
+
+        async def restart():
+            runner = OCRJobRunner(self.store, FakeExecutor(), poll_interval=0.05, webhook_hosts={"127.0.0.1"})
+            runner.start()
+            deadline = time.monotonic() + 5
+            while not self.store.get(job_id)["callback_status"] and time.monotonic() < deadline:
+                await asyncio.sleep(0.05)
+            await runner.stop()
+
+        asyncio.run(restart())
+        self.assertEqual(self.store.get(job_id)["callback_status"], "delivered")
+        self.assertEqual([payload["id"] for payload in self.received], [job_id])
+
+
+if __name__ == "__main__":
+    unittest.main()
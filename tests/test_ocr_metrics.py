@@ -0,0 +1,91 @@
+"""
+Unit tests for the in-process metrics registry.
+"""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "licence_ocr", "api_endpoint"))
+)
+
+from ocr_metrics import REGISTRY, STEP_SECONDS, Registry, outcome  # noqa: E402
+from ocr_worker import OCRExecutor  # noqa: E402
+
+
+def observe_in_worker(seconds):
+    STEP_SECONDS.observe(seconds, step="worker-test")
+    return seconds
+
+
+class TestRegistry(unittest.TestCase):
+    """Tests for recording and rendering metrics."""
+
+    def setUp(self):
+        """A private registry with one metric of each kind."""
+        self.registry = Registry()
+        self.counter = self.registry.counter("docs_total", "Documents.", ["outcome"])
+        self.gauge = self.registry.gauge("in_flight", "In flight.")
+        self.histogram = self.registry.histogram("step_seconds", "Steps.", ["step"], buckets=(0.1, 1))
+
+    def test_render_prometheus_text(self):
+        """Histograms render cumulative buckets, sum and count."""
+        self.counter.inc(outcome="match")
+        self.gauge.set(3)
+        for value in (0.05, 0.5, 5):
+            self.histogram.observe(value, step="decode")
+        text = self.registry.render()
+        self.assertIn('docs_total{outcome="match"} 1\n', text)
+        self.assertIn("in_flight 3\n", text)
+        self.assertIn('step_seconds_bucket{step="decode",le="0.1"} 1\n', text)
+        self.assertIn('step_seconds_bucket{step="decode",le="1"} 2\n', text)
+        self.assertIn('step_seconds_bucket{step="decode",le="+Inf"} 3\n', text)
+        self.assertIn('step_seconds_sum{step="decode"} 5.55\n', text)
+        self.assertIn('step_seconds_count{step="decode"} 3\n', text)
+
+    def test_drain_and_merge(self):
+        """Drained counts move to another registry and leave gauges behind."""
+        self.counter.inc(2, outcome="error")
+        self.histogram.observe(0.5, step="recognize")
+        self.gauge.set(7)
+        drained = self.registry.drain()
+        self.assertEqual(set(drained), {"docs_total", "step_seconds"})
+
+        parent = Registry()
+        parent.counter("docs_total", "Documents.", ["outcome"]).inc(outcome="error")
+        parent.histogram("step_seconds", "Steps.", ["step"], buckets=(0.1, 1))
+        parent.merge(drained)
+        text = parent.render()
+        self.assertIn('docs_total{outcome="error"} 3\n', text)
+        self.assertIn('step_seconds_count{step="recognize"} 1\n', text)
+        self.assertEqual(self.registry.drain(), {})
+
+    def test_wrong_labels(self):
+        """Missing or unknown labels are rejected."""
+        with self.assertRaises(ValueError):
+            self.counter.inc()
+
+    def test_outcome(self):
+        """Results are classified by whether a value was found."""
+        self.assertEqual(outcome({"data": "MA1234567"}), "match")
+        self.assertEqual(outcome({"data": None}), "no_match")
+        self.assertEqual(outcome("12/ABC(N)123456"), "match")
+        self.assertEqual(outcome(error=ValueError()), "error")
+
+
+class TestWorkerMetrics(unittest.TestCase):
+    """Tests for metrics recorded inside pool workers."""
+
+    def test_executor_merges_worker_metrics(self):
+        """Observations made in a worker process reach the parent registry."""
+        executor = OCRExecutor(workers=1, queue_size=0, timeout=5)
+        try:
+            self.assertEqual(executor.submit(observe_in_worker, 0.2).result(), 0.2)
+        finally:
+            executor.shutdown()
+        self.assertIn('ocr_step_seconds_count{step="worker-test"} 1\n', REGISTRY.render())
+
+
+if __name__ == "__main__":
+    unittest.main()
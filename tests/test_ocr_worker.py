@@ -0,0 +1,107 @@
+"""
+Unit tests for the OCR process-pool executor.
+"""
+
+import asyncio
+import os
+import subprocess
+import sys
+import threading
+import time
+import unittest
+
+API_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "licence_ocr", "api_endpoint"))
+sys.path.insert(0, API_DIR)
+
+import ocr_worker  # noqa: E402
+from ocr_worker import OCRExecutor, OCRQueueFullError  # noqa: E402
+
+
+class UnpicklableError(Exception):
+    """Like pytesseract.TesseractNotFoundError: __init__ takes no arguments."""
+
+    def __init__(self):
+        super().__init__("tesseract is not installed")
+
+
+def raise_unpicklable():
+    raise UnpicklableError()
+
+
+def fake_pipeline(image_bytes, class_name):
+    return {"data": None, "class_name": class_name}
+
+
+class TestOCRExecutor(unittest.TestCase):
+    """Tests for admission control and deadlines."""
+
+    def setUp(self):
+        """Start a single worker with no extra queue slots."""
+        self.executor = OCRExecutor(workers=1, queue_size=0, timeout=5)
+
+    def tearDown(self):
+        """Stop the worker pool."""
+        self.executor.shutdown()
+
+    def test_rejects_when_full(self):
+        """A second job is rejected while the only slot is busy."""
+        future = self.executor.submit(time.sleep, 0.5)
+        with self.assertRaises(OCRQueueFullError):
+            self.executor.submit(time.sleep, 0)
+        future.result()
+
+    def test_run_times_out(self):
+        """Jobs running past their deadline raise TimeoutError."""
+        with self.assertRaises(TimeoutError):
+            asyncio.run(self.executor.run(time.sleep, 2, timeout=0.2))
+
+    def test_unpicklable_error_keeps_pool_alive(self):
+        """Worker errors that cannot be pickled come back as RuntimeError."""
+        with self.assertRaisesRegex(RuntimeError, "UnpicklableError"):
+            self.executor.submit(raise_unpicklable).result()
+        self.assertIsNone(self.executor.submit(time.sleep, 0).result())
+
+    def test_thread_limit_set_before_tesseract_import(self):
+        """OMP_THREAD_LIMIT follows OCR_THREADS_PER_WORKER as soon as the recognizer is imported."""
+        env = {k: v for k, v in os.environ.items() if k != "OMP_THREAD_LIMIT"}
+        env["OCR_THREADS_PER_WORKER"] = "3"
+        output = subprocess.check_output(
+            [sys.executable, "-c", "import os, recognizer; print(os.environ['OMP_THREAD_LIMIT'])"],
+            cwd=API_DIR, env=env, text=True,
+        )
+        self.assertEqual(output.strip(), "3")
+
+
+class TestWarmUp(unittest.TestCase):
+    """Tests for warming the worker pool."""
+
+    def test_every_worker_warms_once(self):
+        """One warm-up job runs in each worker process, for each pipeline."""
+        executor = OCRExecutor(workers=3, queue_size=0, timeout=5)
+        try:
+            workers = asyncio.run(executor.warm_up_async(fake_pipeline, ("licence", "passport")))
+        finally:
+            executor.shutdown()
+        self.assertEqual(len(workers), 3)
+        for timings in workers.values():
+            self.assertEqual(set(timings), {"licence", "passport"})
+
+    def test_broken_barrier_keeps_result(self):
+        """A worker that warmed up still reports success when the others never arrive."""
+        barrier = threading.Barrier(2)
+        self.addCleanup(setattr, ocr_worker, "_warmup_barrier", ocr_worker._warmup_barrier)
+        ocr_worker._warmup_barrier = barrier
+        pid, timings = ocr_worker._warm_up_worker(fake_pipeline, ("licence",), 0.05)
+        self.assertEqual((pid, set(timings)), (os.getpid(), {"licence"}))
+        self.assertFalse(barrier.broken)
+
+    def test_failed_warm_up_is_reported(self):
+        """The warm-up's own error surfaces, not the barrier's."""
+        self.addCleanup(setattr, ocr_worker, "_warmup_barrier", ocr_worker._warmup_barrier)
+        ocr_worker._warmup_barrier = threading.Barrier(2)
+        with self.assertRaises(UnpicklableError):
+            ocr_worker._warm_up_worker(lambda image_bytes, class_name: raise_unpicklable(), ("licence",), 0.05)
+
+
+if __name__ == "__main__":
+    unittest.main()
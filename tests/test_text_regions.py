@@ -0,0 +1,91 @@
+"""
+Unit tests for text region localisation.
+"""
+
+import os
+import sys
+import unittest
+
+import cv2
+import numpy as np
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "licence_ocr", "api_endpoint"))
+)
+
+from ocr_model import MRZ_WHITELIST, OCR_Model, mrz_check_digit  # noqa: E402
+from recognizer import Recognizer  # noqa: E402
+from text_regions import find_mrz_band, find_text_lines, stack_regions  # noqa: E402
+
+
+def synthetic_passport():
+    """Render a passport-like page with a two-line MRZ at the bottom."""
+    page = np.full((1250, 1800), 235, np.uint8)
+    cv2.putText(page, "PASSPORT", (100, 150), cv2.FONT_HERSHEY_SIMPLEX, 2, 0, 4)
+    cv2.putText(page, "P<MMRAUNG<<KYAW<<<<<<<<<<<<<<<<<<<<<<<<<", (60, 1050),
+                cv2.FONT_HERSHEY_PLAIN, 3.5, 0, 3)
+    cv2.putText(page, "MA12345672MMR9001011M3001015<<<<<<<<<<<02", (60, 1150),
+                cv2.FONT_HERSHEY_PLAIN, 3.5, 0, 3)
+    return page
+
+
+class MRZRecognizer(Recognizer):
+    """Returns MRZ text for whitelisted MRZ reads and noise otherwise."""
+
+    def __init__(self):
+        self.calls = []
+
+    def image_to_string(self, gray_img, psm=None, whitelist=None):
+        self.calls.append(gray_img.shape)
+        if whitelist == MRZ_WHITELIST:
+            return "P<MMRAUNG<<KYAW<<<<<<\nMA12345672MMR9001011M3001015<<<<02\n"
+        return ""
+
+
+class TestTextRegions(unittest.TestCase):
+    """Tests for line and MRZ detection."""
+
+    def test_find_text_lines(self):
+        """Each rendered line is found, top to bottom."""
+        card = np.full((900, 1600), 235, np.uint8)
+        for i, text in enumerate(["UNION OF MYANMAR", "12/MAYANA(N)123456", "NAME U AUNG"]):
+            cv2.putText(card, text, (100, 200 + 250 * i), cv2.FONT_HERSHEY_SIMPLEX, 2, 0, 4)
+        boxes = find_text_lines(card)
+        self.assertEqual(len(boxes), 3)
+        self.assertEqual([box[1] for box in boxes], sorted(box[1] for box in boxes))
+
+    def test_find_mrz_band(self):
+        """The MRZ band covers both bottom lines and not the header."""
+        x, y, w, h = find_mrz_band(synthetic_passport())
+        self.assertLess(y, 1010)
+        self.assertGreater(y + h, 1150)
+        self.assertGreater(y, 200)
+        self.assertIsNone(find_mrz_band(np.full((300, 400), 200, np.uint8)))
+
+    def test_stack_regions(self):
+        """Crops are scaled to one height and stacked with gaps."""
+        gray = np.zeros((500, 500), np.uint8)
+        stacked = stack_regions(gray, [(0, 0, 200, 100), (0, 200, 100, 25)], line_height=40, gap=10)
+        self.assertEqual(stacked.shape, (2 * 50 + 10, 160 + 20))
+        self.assertIsNone(stack_regions(gray, []))
+
+
+class TestPassportROI(unittest.TestCase):
+    """Tests for reading the passport number from the MRZ crop."""
+
+    def test_check_digit(self):
+        """ICAO 9303 check digits match the specimen values."""
+        self.assertEqual(mrz_check_digit("L898902C3"), "6")
+        self.assertEqual(mrz_check_digit("MA1234567"), "2")
+
+    def test_reads_mrz_crop_only(self):
+        """A valid MRZ read returns without a full-page recognizer pass."""
+        recognizer = MRZRecognizer()
+        ocr_model = OCR_Model(recognizer=recognizer, use_roi=True)
+        self.assertEqual(ocr_model.passport_ocr_model(synthetic_passport()), "MA1234567")
+        self.assertEqual(len(recognizer.calls), 1)
+        self.assertLess(recognizer.calls[0][0], 1250)
+
+
+if __name__ == "__main__":
+    unittest.main()